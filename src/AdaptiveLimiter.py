@@ -0,0 +1,73 @@
+
+import threading, time
+
+class AdaptiveLimiter:
+    """
+    Limit of the number of requests in flight of a client, adapted to the backend capacity with an AIMD scheme
+    (additive increase, multiplicative decrease): the limit grows by about one request per round of successful
+    requests, and is cut by `decrease_factor` when the backend throttles requests (ex: S3 SlowDown, 503, 429).
+    Requests above the limit wait for a slot.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, decrease_factor: float = 0.5):
+        """
+        @param `max_limit` maximum (and initial) number of requests in flight, usually the size of the connection pool
+        @param `min_limit` the limit never goes below this number of requests
+        @param `decrease_factor` the limit is multiplied by this factor when requests are throttled
+        """
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.decrease_factor = decrease_factor
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.throttled = 0 # Number of throttled requests
+        self._last_decrease = 0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> float:
+        """
+        Wait for a free slot and take it
+
+        @return the start time of the request, to pass to `release()`
+        """
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+            return time.monotonic()
+
+    def release(self, started: float, throttled: bool):
+        """Free the slot of a request that started at `started`, adapting the limit to its outcome"""
+        with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                self.throttled += 1
+                # The requests in flight when the limit was cut are throttled by the same overload, don't cut it again for them
+                if started >= self._last_decrease:
+                    self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                    self._last_decrease = time.monotonic()
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+class TokenBucket:
+    """Cap a request rate to `rate` requests per second, with bursts of up to `burst` requests"""
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = rate
+        self.burst = burst or max(rate, 1)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, waiting until one is available"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1 # Reserve the token, waiting requests are served in order
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
@@ -0,0 +1,143 @@
+
+import asyncio
+from typing import AsyncIterator
+
+from .ObjectStorageClient import ContainerInfo, ObjectInfo, SubdirInfo, ObjectStorageClient, DEFAULT_CHUNK_SIZE
+
+class AsyncObjectStorageClient:
+    """
+    Asynchronous counterpart of `ObjectStorageClient` for asyncio applications. Requests are sent on a
+    non-blocking HTTP stack with pooled keep-alive connections, so many requests can be in flight on a
+    single event loop. Subclass this class to support a new object storage backend.
+
+    The client owns network connections: use it as an async context manager or call `close()` when done.
+    """
+
+    container_name = None
+    download_chunk_size = DEFAULT_CHUNK_SIZE # Size of the chunks written by object_download()
+
+    #
+    #   Common implementation
+    #
+
+    # Same behavior as the synchronous client
+    get_container = ObjectStorageClient.get_container
+    object_path = ObjectStorageClient.object_path
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def use_container(self, container_name: str | None, create=False) -> bool:
+        """
+        Set the target container name
+
+        @param `container_name` name of the container to set (or None to clear the active container)
+        @param `create` create the container if it does not already exist
+        @return True on success, False if the container does not exist and cannot be created
+        """
+        if container_name is None:
+            self.container_name = container_name
+            return True
+
+        if await self.container_info(container_name) is not None:
+            self.container_name = container_name
+            return True
+        elif create and await self.container_create(container_name):
+            self.container_name = container_name
+            return True
+
+        return False
+
+    async def object_list(self,
+        fetch_metadata: bool = False,
+        prefix: str = None,
+        delimiter: str = None,
+        container_name: str = None,
+    ) -> list[ObjectInfo|SubdirInfo]:
+        """
+        List available objects in the specified container (see `ObjectStorageClient.object_list()`).
+        With `fetch_metadata`, the object HEAD requests are all sent concurrently.
+        """
+        container_name = self.get_container(container_name)
+        objects = [o async for o in self.object_iter(prefix=prefix, delimiter=delimiter, container_name=container_name)]
+
+        if fetch_metadata:
+            obj_indices = [i for i, obj in enumerate(objects) if isinstance(obj, ObjectInfo)]
+            infos = await asyncio.gather(
+                *(self.object_info(objects[i].name, container_name=container_name) for i in obj_indices),
+                return_exceptions=True
+            )
+            for i, info in zip(obj_indices, infos):
+                if isinstance(info, ObjectInfo):
+                    objects[i] = info # If object_info fails, keep the listed object
+
+        return objects
+
+    #
+    #   Abstract functions to implement when subclassing
+    #
+
+    async def close(self):
+        """Close the connections of the client"""
+        raise NotImplementedError
+
+    async def container_create(self, container_name: str) -> bool:
+        """
+        Create a new container
+
+        @return true on success, false on failure (ex: already exists)
+        """
+        raise NotImplementedError
+
+    async def container_info(self, container_name: str) -> ContainerInfo|None:
+        """
+        Fetch container information
+
+        @return ContainerInfo or None if the container does not exist
+        """
+        raise NotImplementedError
+
+    async def object_info(self, object_name: str, container_name: str = None) -> ObjectInfo|None:
+        """
+        Return an objet's info (including metadata)
+
+        @return ObjectInfo or None if the object does not exist
+        """
+        raise NotImplementedError
+
+    async def object_upload(self, stream, object_name: str, metadata: dict={}, container_name: str = None) -> bool:
+        """
+        Upload a stream (file object or bytes), optionally specifying some metadata to apply to the object
+
+        @return true on success, false on failure
+        """
+        raise NotImplementedError
+
+    async def object_download(self, object_name: str, stream, container_name: str = None, chunk_size: int = None) -> bool:
+        """
+        Download an object and write it to the output stream, `chunk_size` bytes at a time
+        (defaults to `download_chunk_size`)
+
+        @return true on success, false on failure (ex: the object does not exist)
+        """
+        raise NotImplementedError
+
+    def object_iter(self,
+        prefix: str = None,
+        delimiter: str = None,
+        start_after: str = None,
+        page_size: int = None,
+        container_name: str = None,
+    ) -> AsyncIterator[ObjectInfo|SubdirInfo]:
+        """
+        Asynchronously iterate over the objects of the specified container, pages being requested
+        as the iteration goes (see `ObjectStorageClient.object_iter()`)
+        """
+        raise NotImplementedError
+
+    async def object_delete(self, object_name: str, container_name: str = None) -> bool:
+        """Delete the specified object"""
+        raise NotImplementedError
@@ -0,0 +1,165 @@
+#!/bin/python
+#
+#   AWS S3 asyncio client (requires aiobotocore)
+#   API Reference: https://aiobotocore.aio-libs.org/
+#
+
+import botocore
+from aiobotocore.session import get_session
+from typing import AsyncIterator
+
+from .ObjectStorageClient import *
+from .AsyncObjectStorageClient import AsyncObjectStorageClient
+from .S3Client import _object_info_from_head, _object_info_from_listing
+
+class AsyncS3Client(AsyncObjectStorageClient):
+
+    def __init__(self, location, endpoint_url=None, verify_ssl=None, aws_access_key_id=None, aws_secret_access_key=None, max_connections: int = 100):
+        """
+        Initialize an asyncio S3 client (see `S3Client` for the parameters)
+
+        @param `max_connections` Size of the keep-alive connection pool, requests above that wait for a free connection
+        """
+        self._client_context = get_session().create_client(
+            service_name='s3',
+            endpoint_url=endpoint_url,
+            region_name=location,
+            aws_access_key_id=aws_access_key_id,
+            aws_secret_access_key=aws_secret_access_key,
+            config=botocore.config.Config(
+                request_checksum_calculation="when_required",
+                response_checksum_validation="when_required",
+                max_pool_connections=max_connections
+            ),
+            verify=verify_ssl
+        )
+        self.client = None
+
+        self.location = location
+        self.endpoint_url = endpoint_url
+
+    async def _client(self):
+        """Return the aiobotocore client, created on first use as it needs a running event loop"""
+        if self.client is None:
+            self.client = await self._client_context.__aenter__()
+        return self.client
+
+    async def close(self):
+        if self.client is not None:
+            await self._client_context.__aexit__(None, None, None)
+            self.client = None
+
+    async def container_create(self, container_name: str) -> bool:
+        client = await self._client()
+        try:
+            if self.location != 'auto':
+                res = await client.create_bucket(
+                    Bucket=container_name,
+                    CreateBucketConfiguration={"LocationConstraint": self.location}
+                )
+            else:
+                res = await client.create_bucket(Bucket=container_name)
+            return res.get('ResponseMetadata', {}).get('HTTPStatusCode') == 200
+        except botocore.exceptions.ClientError:
+            return False
+
+    async def container_info(self, container_name: str) -> ContainerInfo|None:
+        client = await self._client()
+        try:
+            result = await client.head_bucket(Bucket=container_name)
+        except botocore.exceptions.ClientError as e:
+            result = e.response
+
+        if result.get('ResponseMetadata', {}).get('HTTPStatusCode') == 200:
+            return ContainerInfo(container_name, None, None)
+        elif result.get('ResponseMetadata', {}).get('HTTPStatusCode') != 404:
+            print('AsyncS3Client: unknown error code:', result.get('ResponseMetadata', {}).get('HTTPStatusCode'))
+        return None
+
+    async def object_info(self, object_name: str, container_name: str = None) -> ObjectInfo|None:
+        client = await self._client()
+        try:
+            res = await client.head_object(Bucket=self.get_container(container_name), Key=object_name)
+        except botocore.exceptions.ClientError as e:
+            res = e.response
+
+        if res.get('ResponseMetadata', {}).get('HTTPStatusCode') == 200:
+            return _object_info_from_head(object_name, res)
+        elif res.get('ResponseMetadata', {}).get('HTTPStatusCode') != 404:
+            print(f"AsyncS3Client: object_info() status code: {res.get('ResponseMetadata', {}).get('HTTPStatusCode')}")
+        return None
+
+    async def object_upload(self, stream, object_name: str, metadata: dict={}, container_name: str = None) -> bool:
+        client = await self._client()
+        res = await client.put_object(
+            Body=stream,
+            Bucket=self.get_container(container_name),
+            Key=object_name,
+            Metadata=metadata
+        )
+
+        if res.get('ResponseMetadata', {}).get('HTTPStatusCode') == 200:
+            return True
+        else:
+            print(f"AsyncS3Client: object_upload() status code: {res.get('ResponseMetadata', {}).get('HTTPStatusCode')}")
+            return False
+
+    async def object_download(self, object_name: str, stream, container_name: str = None, chunk_size: int = None) -> bool:
+        client = await self._client()
+        try:
+            res = await client.get_object(Bucket=self.get_container(container_name), Key=object_name)
+        except botocore.exceptions.ClientError as e:
+            res = e.response
+
+        if res.get('ResponseMetadata', {}).get('HTTPStatusCode') == 200:
+            async with res['Body'] as body:
+                async for chunk in body.iter_chunks(chunk_size or self.download_chunk_size):
+                    stream.write(chunk)
+            return True
+        elif res.get('ResponseMetadata', {}).get('HTTPStatusCode') != 404:
+            print(f"AsyncS3Client: object_download() status code: {res.get('ResponseMetadata', {}).get('HTTPStatusCode')}")
+        return False
+
+    async def object_iter(self,
+        prefix: str = None,
+        delimiter: str = None,
+        start_after: str = None,
+        page_size: int = None,
+        container_name: str = None,
+    ) -> AsyncIterator[ObjectInfo|SubdirInfo]:
+        client = await self._client()
+
+        args = {"Bucket": self.get_container(container_name)}
+        if prefix: args['Prefix'] = prefix
+        if delimiter: args['Delimiter'] = delimiter
+        if start_after: args['StartAfter'] = start_after
+        if page_size: args['MaxKeys'] = page_size
+
+        while True:
+            res = await client.list_objects_v2(**args)
+
+            if res.get('ResponseMetadata', {}).get('HTTPStatusCode') != 200:
+                return
+
+            for o in res.get('Contents', []):
+                yield _object_info_from_listing(o)
+            for o in res.get('CommonPrefixes', []):
+                yield SubdirInfo(o['Prefix'])
+
+            if not res.get('IsTruncated'):
+                return
+            args['ContinuationToken'] = res['NextContinuationToken']
+
+    async def object_delete(self, object_name: str, container_name: str = None) -> bool:
+        client = await self._client()
+        try:
+            res = await client.delete_object(Bucket=self.get_container(container_name), Key=object_name)
+        except botocore.exceptions.ClientError as e:
+            res = e.response
+
+        status = res.get('ResponseMetadata', {}).get('HTTPStatusCode')
+        if status == 204 or status == 404:
+            return True
+        else:
+            print(f"AsyncS3Client: object_delete() status code: {status}")
+            return False
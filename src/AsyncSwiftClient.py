@@ -0,0 +1,234 @@
+#!/bin/python
+#
+#   OpenStack Swift asyncio client (requires aiohttp)
+#   API Reference: https://docs.openstack.org/api-ref/object-store/
+#
+
+import asyncio, io, time
+import aiohttp
+from typing import AsyncIterator
+
+from .ObjectStorageClient import *
+from .AsyncObjectStorageClient import AsyncObjectStorageClient
+from .SwiftClient import SwiftCredentials, _object_info_from_headers, _object_info_from_listing
+from .TokenCache import TokenCache, DEFAULT_TOKEN_CACHE_PATH
+
+class _RequestBody(io.RawIOBase):
+    """Request body over a stream that stays open when aiohttp closes the body, so that the request can be sent again"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        data = self.stream.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def read(self, size: int = -1) -> bytes:
+        return self.stream.read(size)
+
+class AsyncSwiftClient(SwiftCredentials, AsyncObjectStorageClient):
+
+    def __init__(self, region: str, credentials: dict = {}, max_connections: int = 100, token_cache: str|None = DEFAULT_TOKEN_CACHE_PATH) -> None:
+        """
+        Initialize an asyncio Swift client. Authentication happens on the first request.
+
+        @param `region` Swift storage region
+        @param `credentials` OpenStack credentials (read from the environment if not provided, see `SwiftClient`)
+        @param `max_connections` Size of the keep-alive connection pool, requests above that wait for a free connection
+        @param `token_cache` Path of the file where the auth tokens are saved to be reused until they expire (None to disable)
+        """
+        self.OBJECT_STORAGE_URL = None
+        self.OS_AUTH_TOKEN = None
+        self.token_expires_at = None
+        self.token_cache = TokenCache(token_cache) if token_cache else None
+        self.region = region
+        self.max_connections = max_connections
+        self.read_credentials_from_env(credentials)
+        self.session = None
+        self._auth_lock = None
+        self._refresh_at = None # Monotonic time at which the token is renewed in the background
+        self._refresh_task = None
+
+    async def close(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def authenticate(self) -> bool:
+        """Retreives a usable authentication token, from the token cache or from Keystone (see `SwiftClient.authenticate()`)"""
+        # The token cache file is read and written in a worker thread (its lock can be held by another process),
+        # and its lock is not held while waiting for Keystone
+        if self.token_cache is not None and await asyncio.to_thread(self._load_cached_token, self.OS_AUTH_TOKEN):
+            return True
+
+        auth_url, payload = self._auth_request()
+        async with self.session.post(auth_url, json=payload) as r:
+            if r.status != 201:
+                raise AuthorizationError(f"HttpResponseStatus={r.status} ResponseContent={await r.read()}")
+            self._read_auth_reply(r.headers.get('X-Subject-Token'), await r.json())
+
+        if self.token_cache is not None:
+            await asyncio.to_thread(self._save_cached_token)
+        return True
+
+    def _save_cached_token(self):
+        """Save the current token in the token cache, holding its lock (blocking)"""
+        with self.token_cache.locked():
+            self._save_token()
+
+    async def _renew_token(self, expired_token: str|None):
+        """Renew the token once, even when many requests find out at the same time that it expired"""
+        async with self._auth_lock:
+            if self.OS_AUTH_TOKEN == expired_token:
+                await self.authenticate()
+                delay = self._token_refresh_delay()
+                self._refresh_at = time.monotonic() + delay if delay is not None else None
+
+    async def _refresh_token(self):
+        """Renew the token before it expires, while the requests keep using the current one"""
+        try:
+            await self._renew_token(self.OS_AUTH_TOKEN)
+        except Exception as e:
+            print(f"AsyncSwiftClient: background token refresh failed: {e}")
+            self._refresh_at = None # Renewed on authentication failure instead
+
+    async def _request(self, method: str, path: str, headers: dict = {}, **kwargs) -> aiohttp.ClientResponse:
+        """
+        Send a request for `path` (relative to the storage URL) with the auth token, renewing the token and
+        replaying the request once on authentication failure (stream bodies are sent again from their starting
+        position, which fails if they are not seekable). The caller must release the returned response.
+        """
+        if self.session is None:
+            # Downloads are written as stored, like SwiftClient does
+            self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.max_connections), auto_decompress=False)
+            self._auth_lock = asyncio.Lock()
+        if self.OS_AUTH_TOKEN is None:
+            await self._renew_token(None)
+        elif self._refresh_at is not None and time.monotonic() >= self._refresh_at and self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_token())
+            self._refresh_task.add_done_callback(lambda task: setattr(self, '_refresh_task', None))
+
+        body, start = kwargs.get('data'), None
+        if hasattr(body, 'read'):
+            try:
+                position = body.tell()
+                size = body.seek(0, io.SEEK_END) - position
+                body.seek(position)
+                start = position
+            except (AttributeError, OSError):
+                pass # Not seekable, cannot be sent again
+            if start is not None and 'Content-Length' not in headers:
+                # Sent with its size rather than chunked, as aiohttp does for the streams it knows
+                headers = {**headers, 'Content-Length': str(size)}
+
+        auth_status_codes = [401, 403]
+        for attempt in range(2):
+            token = self.OS_AUTH_TOKEN
+            if hasattr(body, 'read'):
+                kwargs['data'] = _RequestBody(body)
+            r = await self.session.request(method, self.OBJECT_STORAGE_URL + path, headers={**headers, 'X-Auth-Token': token}, **kwargs)
+            if r.status not in auth_status_codes:
+                return r
+            r.release()
+            if attempt == 0:
+                await self._renew_token(token)
+                if hasattr(body, '__aiter__') or (hasattr(body, 'read') and start is None):
+                    raise AuthorizationError('The token expired while sending a body that cannot be sent again')
+                if hasattr(body, 'read'):
+                    body.seek(start) # Send the body again from its start
+        raise AuthorizationError
+
+    async def container_create(self, container_name: str) -> bool:
+        async with await self._request('PUT', f"/{container_name}") as r:
+            if r.status not in [201, 202]:
+                print('container_create() status code:', r.status)
+            return r.status == 201
+
+    async def container_info(self, container_name: str) -> ContainerInfo|None:
+        async with await self._request('HEAD', f"/{container_name}") as r:
+            if r.status == 204:
+                return ContainerInfo(
+                    name=container_name,
+                    count=int(r.headers.get('X-Container-Object-Count')),
+                    bytes=int(r.headers.get('X-Container-Bytes-Used')) if r.headers.get('X-Container-Bytes-Used') is not None else None
+                )
+            elif r.status != 404:
+                print(f"ERROR: container_info({container_name}) got status code: {r.status}")
+
+    async def object_info(self, object_name: str, container_name: str = None) -> ObjectInfo|None:
+        path = self.object_path(object_name, container_name)
+        async with await self._request('HEAD', path) as r:
+            if r.status == 200:
+                return _object_info_from_headers(object_name, r.headers)
+            elif r.status not in [204, 404]:
+                print(f"ERROR: object_info({object_name}) got status code: {r.status}")
+
+    async def object_upload(self, stream, object_name: str, metadata: dict={}, container_name: str = None) -> bool:
+        path = self.object_path(object_name, container_name)
+        headers = {}
+        for m in metadata:
+            headers[f'X-Object-Meta-{m}'] = metadata[m] # Add metadata
+        async with await self._request('PUT', path, headers=headers, data=stream) as r:
+            if r.status != 201:
+                print('Upload status code:', r.status)
+            return r.status == 201
+
+    async def object_download(self, object_name: str, stream, container_name: str = None, chunk_size: int = None) -> bool:
+        path = self.object_path(object_name, container_name)
+        async with await self._request('GET', path) as r:
+            if r.status != 200:
+                return False # Could not download
+            async for chunk in r.content.iter_chunked(chunk_size or self.download_chunk_size):
+                stream.write(chunk)
+            return True
+
+    async def object_iter(self,
+        prefix: str = None,
+        delimiter: str = None,
+        start_after: str = None,
+        page_size: int = None,
+        container_name: str = None,
+    ) -> AsyncIterator[ObjectInfo|SubdirInfo]:
+        path = f"/{self.get_container(container_name)}"
+        params = {"format":"json"}
+        if prefix: params['prefix'] = prefix
+        if delimiter: params['delimiter'] = delimiter
+        if start_after: params['marker'] = start_after
+        if page_size: params['limit'] = page_size
+
+        while True:
+            async with await self._request('GET', path, params=params) as r:
+                if r.status != 200:
+                    return # 204 when there is nothing (left) to list
+                objects = await r.json()
+
+            for o in objects:
+                yield _object_info_from_listing(o)
+
+            # Keep going from the last entry until a page comes back short or empty
+            if len(objects) == 0 or (page_size and len(objects) < page_size):
+                return
+            params['marker'] = objects[-1].get('subdir') or objects[-1].get('name')
+
+    async def object_delete(self, object_name: str, container_name: str = None) -> bool:
+        """Delete the specified object. The segments of a Static Large Object are deleted along with its manifest."""
+        path = self.object_path(object_name, container_name)
+        # Deletes the segments along with an SLO manifest, and deletes other objects as a plain DELETE would (see `SwiftClient.object_delete()`)
+        async with await self._request('DELETE', path, params={'multipart-manifest': 'delete'}, headers={'Accept': 'application/json'}) as r:
+            if r.status != 200:
+                # 204 when the cluster has no SLO middleware
+                return r.status == 204 or r.status == 404
+            # The SLO middleware replies 200 with a bulk delete report
+            status = (await r.json()).get('Response Status', '').split(' ')[0]
+
+        if status == '400':
+            # Older SLO middlewares refuse to delete objects that are not manifests this way
+            async with await self._request('DELETE', path) as r:
+                return r.status == 204 or r.status == 404
+        return status in ['200', '404']
@@ -0,0 +1,440 @@
+
+import contextlib, hashlib, io, json, os, shutil, tempfile, threading, time
+from typing import Iterable, Iterator
+
+from .ObjectStorageClient import *
+from .MetadataCache import MetadataCache
+from .Metrics import Metrics
+from .Codec import metadata_codec
+
+DEFAULT_OBJECT_CACHE_PATH = os.path.join(os.getenv('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'obs_client', 'objects')
+DEFAULT_OBJECT_CACHE_SIZE = 10 * 1024 ** 3 # 10 GiB
+
+class DiskCache:
+    """
+    Size-bounded directory of object bodies. Entries are files named after the hash of their key and
+    written atomically (a temporary file renamed in place), so that several processes can share the
+    directory. The least recently used entries (oldest modification time, updated on each hit) are
+    removed when the directory holds more than `max_bytes` bytes.
+    """
+
+    def __init__(self, directory: str = DEFAULT_OBJECT_CACHE_PATH, max_bytes: int = DEFAULT_OBJECT_CACHE_SIZE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self._size = sum(size for _, _, size in self._entries())
+
+    @staticmethod
+    def key(*fields) -> str:
+        return hashlib.sha256(json.dumps(fields).encode()).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key: str) -> str|None:
+        """
+        Look up an entry and mark it as recently used
+
+        @return the path of the entry file, or None on a miss
+        """
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def create(self) -> tuple[object, str]:
+        """
+        Create the temporary file of a new entry, to pass to `commit()` or `discard()` once written
+
+        @return (binary file open for writing, temporary file path)
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        return os.fdopen(fd, 'wb'), tmp_path
+
+    def commit(self, tmp_path: str, key: str):
+        """Move a written temporary file in place as the entry `key`, then evict entries if needed"""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._size += size
+            over = self._size > self.max_bytes
+        if over:
+            self._evict()
+
+    def discard(self, tmp_path: str):
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+
+    def _entries(self) -> Iterator[tuple[str, float, int]]:
+        """Yield the (path, last use time, size) of the entries"""
+        for sub in os.scandir(self.directory):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                with contextlib.suppress(FileNotFoundError):
+                    stat = entry.stat()
+                    yield entry.path, stat.st_mtime, stat.st_size
+
+    def _evict(self):
+        # The directory may be shared with other processes: go by its content rather than by what this process wrote
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda e: e[1])
+            size = sum(e[2] for e in entries)
+            for path, _, entry_size in entries:
+                if size <= self.max_bytes:
+                    break
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(path)
+                    self.evictions += 1
+                size -= entry_size
+            self._size = size
+
+    def clear(self):
+        with self._lock:
+            for path, _, _ in list(self._entries()):
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(path)
+            self._size = 0
+
+    def stats(self) -> dict:
+        """Return the hit/miss/eviction counters and the size of the cache (bytes)"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'bytes': self._size}
+
+
+class _Tee:
+    """Writable stream that copies what is written to two streams"""
+
+    def __init__(self, first, second):
+        self.first = first
+        self.second = second
+
+    def write(self, data) -> int:
+        self.first.write(data)
+        self.second.write(data)
+        return len(data)
+
+
+def _forwarded(name: str, read_only: bool = False) -> property:
+    """Property of `CachedClient` reading and writing (unless `read_only`) the attribute `name` of the wrapped client"""
+    getter = lambda self: getattr(self.client, name)
+    if read_only:
+        return property(getter)
+    return property(getter, lambda self, value: setattr(self.client, name, value))
+
+
+class CachedClient(ObjectStorageClient):
+    """
+    Read-through cache of object bodies on the local disk, wrapping any client. Downloads of an object already
+    in the cache are served from the disk, the other functions are forwarded to the wrapped client.
+
+    Entries are keyed by container, object name and ETag. Before serving an entry the ETag of the object is
+    revalidated with a HEAD request (`object_info()`), unless it was validated less than `max_age` seconds ago:
+    an object changed by another client is downloaded again, and its previous version ages out of the cache.
+    Objects missing from the cache are downloaded on the condition that their ETag is still the validated one
+    (`if_match`), so that the body stored under that ETag is always the matching version.
+    """
+
+    def __init__(self, client: ObjectStorageClient, directory: str = DEFAULT_OBJECT_CACHE_PATH, max_bytes: int = DEFAULT_OBJECT_CACHE_SIZE, max_age: float = 0):
+        """
+        @param `client` the client that sends the requests
+        @param `directory` directory of the cache files (can be shared by several processes)
+        @param `max_bytes` size of the cache, the least recently used objects are removed above it
+        @param `max_age` number of seconds during which an object validated by this client is served without a HEAD request
+        """
+        super().__init__()
+        self.client = client
+        self.object_cache = DiskCache(directory, max_bytes)
+        self.max_age = max_age
+        self._validated = {} # (container, object name) -> (validation time, ObjectInfo)
+        self._validated_lock = threading.Lock()
+
+    def __getattr__(self, name: str):
+        # Backend specific attributes (ex: `region`, `location`)
+        if name == 'client':
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    #
+    #   Cache
+    #
+
+    def _validate(self, object_name: str, container_name: str) -> ObjectInfo|None:
+        """Return the info of the object (from a HEAD request, or the last one if more recent than `max_age`)"""
+        key = (container_name, object_name)
+        if self.max_age:
+            with self._validated_lock:
+                validated = self._validated.get(key)
+            if validated is not None and time.monotonic() - validated[0] < self.max_age:
+                return validated[1]
+        info = self.client.object_info(object_name, container_name=container_name)
+        with self._validated_lock:
+            if info is None:
+                self._validated.pop(key, None)
+            else:
+                self._validated[key] = (time.monotonic(), info)
+        return info
+
+    def _invalidate(self, container_name: str, object_names: Iterable[str] = None):
+        """Forget the validations of the objects (or of the whole container), so that their ETag is checked again"""
+        with self._validated_lock:
+            if object_names is None:
+                self._validated = {k: v for k, v in self._validated.items() if k[0] != container_name}
+            else:
+                for name in object_names:
+                    self._validated.pop((container_name, name), None)
+
+    def _cacheable(self, info: ObjectInfo|None) -> bool:
+        if info is not None and self.decompress and metadata_codec(info.metadata) is not None:
+            return False # Downloads are decoded, they don't match the size and ETag of the object
+        return info is not None and bool(info.hash) and info.bytes is not None and info.bytes <= self.object_cache.max_bytes
+
+    def cache_stats(self) -> dict:
+        return self.object_cache.stats()
+
+    def _changed(self, object_name: str, container_name: str, info: ObjectInfo) -> bool:
+        """After a failed download of the validated version of an object, tell whether the object was replaced since"""
+        self._invalidate(container_name, [object_name])
+        current = self._validate(object_name, container_name)
+        return current is None or current.hash != info.hash
+
+    def _load(self, object_name: str, container_name: str, info: ObjectInfo, key: str, stream = None, chunk_size: int = None) -> tuple[bool, int]:
+        """
+        Download the validated version of an object to the cache, and to `stream` at the same time if set
+
+        @return (success, number of bytes written): the download fails if the object changed since its validation
+        """
+        file, tmp_path = self.object_cache.create()
+        try:
+            with file:
+                ok = self.client.object_download(object_name, _Tee(stream, file) if stream is not None else file,
+                    container_name=container_name, chunk_size=chunk_size, if_match=info.hash)
+            written = os.path.getsize(tmp_path)
+            if ok:
+                self.object_cache.commit(tmp_path, key)
+        finally:
+            self.object_cache.discard(tmp_path) # No-op once committed
+        return ok, written
+
+    #
+    #   Downloads
+    #
+
+    def object_download(self,
+        object_name: str,
+        stream,
+        container_name: str = None,
+        chunk_size: int = None,
+        byte_range: tuple[int, int] = None,
+        if_none_match: str = None,
+        if_modified_since: float = None,
+        if_match: str = None,
+    ) -> bool:
+        """Download an object, from the cache if its current version is there (see `ObjectStorageClient.object_download()`)"""
+        container_name = self.get_container(container_name)
+        download = lambda: self.client.object_download(object_name, stream, container_name=container_name, chunk_size=chunk_size,
+            byte_range=byte_range, if_none_match=if_none_match, if_modified_since=if_modified_since, if_match=if_match)
+        if if_none_match is not None or if_modified_since is not None or if_match is not None:
+            return download()
+        info = self._validate(object_name, container_name)
+        if not self._cacheable(info):
+            return download()
+
+        key = self.object_cache.key(container_name, object_name, info.hash)
+        path = self.object_cache.get(key)
+        if path is not None:
+            try:
+                with open(path, 'rb') as f:
+                    if byte_range is None:
+                        copy_stream(f, stream, chunk_size or self.download_chunk_size)
+                    else:
+                        f.seek(byte_range[0])
+                        remaining = byte_range[1] - byte_range[0] + 1
+                        while remaining > 0 and (chunk := f.read(min(remaining, chunk_size or self.download_chunk_size))):
+                            stream.write(chunk)
+                            remaining -= len(chunk)
+                return True
+            except FileNotFoundError:
+                pass # Evicted by another process in the meantime
+
+        if byte_range is not None: # Partial downloads are not cached
+            return download()
+
+        # Write the object to the stream and to the cache at once
+        ok, written = self._load(object_name, container_name, info, key, stream, chunk_size)
+        if not ok and written == 0 and self._changed(object_name, container_name, info):
+            return download() # Replaced since its validation, nothing was written to the stream yet
+        return ok
+
+    def download_file(self,
+        object_name: str,
+        outputFilePath: str,
+        container_name: str = None,
+        chunk_size: int = None,
+        parallel: bool = False,
+        parts: int = None,
+        concurrency: int = None,
+        retries: int = 3,
+        if_match: str = None,
+    ) -> bool:
+        """Download an object to a file, copied from the cache if its current version is there (see `ObjectStorageClient.download_file()`)"""
+        container_name = self.get_container(container_name)
+        download = lambda path, if_match: self.client.download_file(object_name, path, container_name=container_name,
+            chunk_size=chunk_size, parallel=parallel, parts=parts, concurrency=concurrency, retries=retries, if_match=if_match)
+        if if_match is not None:
+            return download(outputFilePath, if_match)
+        info = self._validate(object_name, container_name)
+        if not self._cacheable(info):
+            return download(outputFilePath, None)
+
+        key = self.object_cache.key(container_name, object_name, info.hash)
+        path = self.object_cache.get(key)
+        if path is not None:
+            try:
+                shutil.copyfile(path, outputFilePath) # Kernel copy (sendfile) where available
+                return True
+            except FileNotFoundError:
+                pass
+
+        # Download in the cache (parallel ranges included), then copy to the target
+        file, tmp_path = self.object_cache.create()
+        file.close()
+        try:
+            if download(tmp_path, info.hash):
+                shutil.copyfile(tmp_path, outputFilePath)
+                self.object_cache.commit(tmp_path, key)
+                return True
+        finally:
+            self.object_cache.discard(tmp_path) # No-op once committed
+        if self._changed(object_name, container_name, info):
+            return download(outputFilePath, None) # Replaced since its validation
+        return False
+
+    def object_open(self, object_name: str, container_name: str = None, mode: str = 'rb', **kwargs):
+        """
+        Open an object (see `ObjectStorageClient.object_open()`). Readers of the objects that can be cached read
+        the cache file (the object is downloaded to the cache first if needed), without further requests.
+        """
+        container_name = self.get_container(container_name)
+        if mode in ['w', 'wb']:
+            self._invalidate(container_name, [object_name])
+        elif mode in ['r', 'rb']:
+            info = self._validate(object_name, container_name)
+            if self._cacheable(info):
+                key = self.object_cache.key(container_name, object_name, info.hash)
+                if self.object_cache.get(key) is not None or self._load(object_name, container_name, info, key)[0]:
+                    try:
+                        return open(self.object_cache.path(key), 'rb', buffering=kwargs.get('buffer_size', io.DEFAULT_BUFFER_SIZE))
+                    except FileNotFoundError:
+                        pass # Evicted by another process in the meantime
+        return self.client.object_open(object_name, container_name, mode, **kwargs)
+
+    #
+    #   Forwarded to the wrapped client
+    #
+
+    # The settings of ObjectStorageClient have class level defaults, which `__getattr__` does not see past: they
+    # are read from (and written to) the wrapped client explicitly
+    container_name = _forwarded('container_name')
+    max_connections = _forwarded('max_connections')
+    cache = _forwarded('cache')
+    download_chunk_size = _forwarded('download_chunk_size')
+    multipart_threshold = _forwarded('multipart_threshold')
+    multipart_part_size = _forwarded('multipart_part_size')
+    multipart_concurrency = _forwarded('multipart_concurrency')
+    multipart_max_parts = _forwarded('multipart_max_parts')
+    multipart_max_part_size = _forwarded('multipart_max_part_size')
+    delete_batch_size = _forwarded('delete_batch_size')
+    delete_concurrency = _forwarded('delete_concurrency')
+    retry_policy = _forwarded('retry_policy')
+    limiter = _forwarded('limiter')
+    rate_limits = _forwarded('rate_limits')
+    instrumentation = _forwarded('instrumentation')
+    verify_integrity = _forwarded('verify_integrity')
+    compression = _forwarded('compression')
+    compression_level = _forwarded('compression_level')
+    compression_processes = _forwarded('compression_processes')
+    decompress = _forwarded('decompress')
+    executor = _forwarded('executor', read_only=True)
+
+    def close(self):
+        self.client.close()
+
+    def set_rate_limit(self, requests_per_second: float|None, container_name: str = None, burst: float = None):
+        self.client.set_rate_limit(requests_per_second, container_name, burst)
+
+    def enable_cache(self, ttl: float = 60, max_entries: int = 10000) -> MetadataCache:
+        return self.client.enable_cache(ttl, max_entries)
+
+    def disable_cache(self):
+        self.client.disable_cache()
+
+    def enable_metrics(self) -> Metrics:
+        return self.client.enable_metrics()
+
+    def container_create(self, container_name: str) -> bool:
+        return self.client.container_create(container_name)
+
+    def container_list(self, prefix: str = None) -> list[ContainerInfo]:
+        return self.client.container_list(prefix)
+
+    def container_delete(self, container_name: str, force: bool = False) -> bool:
+        self._invalidate(container_name)
+        return self.client.container_delete(container_name, force)
+
+    def container_info(self, container_name: str) -> ContainerInfo|None:
+        return self.client.container_info(container_name)
+
+    def object_info(self, object_name: str, container_name: str = None, if_none_match: str = None, if_modified_since: float = None) -> ObjectInfo|None:
+        return self.client.object_info(object_name, container_name=self.get_container(container_name), if_none_match=if_none_match, if_modified_since=if_modified_since)
+
+    def object_list(self, fetch_metadata: bool = False, prefix: str = None, delimiter: str = None, container_name: str = None) -> list[ObjectInfo|SubdirInfo]:
+        return self.client.object_list(fetch_metadata, prefix, delimiter, container_name=self.get_container(container_name))
+
+    def object_iter(self, prefix: str = None, delimiter: str = None, start_after: str = None, page_size: int = None, container_name: str = None) -> Iterator[ObjectInfo|SubdirInfo]:
+        return self.client.object_iter(prefix, delimiter, start_after, page_size, container_name=self.get_container(container_name))
+
+    def object_upload(self, stream, object_name: str, metadata: dict={}, container_name: str = None) -> bool:
+        container_name = self.get_container(container_name)
+        self._invalidate(container_name, [object_name])
+        return self.client.object_upload(stream, object_name, metadata, container_name=container_name)
+
+    def multipart_upload(self, stream, object_name: str, metadata: dict={}, container_name: str = None, size: int = None) -> bool:
+        container_name = self.get_container(container_name)
+        self._invalidate(container_name, [object_name])
+        return self.client.multipart_upload(stream, object_name, metadata, container_name=container_name, size=size)
+
+    def object_replace_metadata(self, object_name: str, metadata: dict = {}, container_name: str = None) -> bool:
+        container_name = self.get_container(container_name)
+        self._invalidate(container_name, [object_name])
+        return self.client.object_replace_metadata(object_name, metadata, container_name=container_name)
+
+    def object_copy(self, object_name: str, destination_name: str, container_name: str = None, destination_container: str = None, metadata: dict = None) -> bool:
+        container_name = self.get_container(container_name)
+        destination_container = destination_container or container_name
+        self._invalidate(destination_container, [destination_name])
+        return self.client.object_copy(object_name, destination_name, container_name, destination_container, metadata)
+
+    def object_delete(self, object_name: str, container_name: str = None) -> bool:
+        container_name = self.get_container(container_name)
+        self._invalidate(container_name, [object_name])
+        return self.client.object_delete(object_name, container_name=container_name)
+
+    def _object_delete_batch(self, object_names: list[str], container_name: str) -> dict[str, bool]:
+        self._invalidate(container_name, object_names)
+        return self.client._object_delete_batch(object_names, container_name)
+
+    def object_generate_download_url(self, object_name: str, container_name: str = None, expires_in_seconds: int = None) -> str|None:
+        return self.client.object_generate_download_url(object_name, container_name=self.get_container(container_name), expires_in_seconds=expires_in_seconds)
@@ -0,0 +1,232 @@
+
+import io, types, zlib
+from collections import deque
+from concurrent.futures import Executor
+
+CODECS = ['gzip', 'zstd']
+CODEC_METADATA = 'obs-codec' # Metadata key recording the codec of the objects uploaded compressed
+SIZE_METADATA = 'obs-original-size' # Metadata key recording the size of the data before compression, when known
+MD5_METADATA = 'obs-original-md5' # Metadata key recording the MD5 of the data before compression (files uploaded by `sync_upload()` and `upload_directory()`)
+COMPRESSION_CHUNK_SIZE = 4 * 1024 * 1024 # Bytes compressed per task when compressing on a process pool (4 MiB)
+DECOMPRESSION_INPUT_SIZE = 64 * 1024 # Compressed bytes decoded at a time, to bound the size of the decoded chunks
+
+def _metadata_value(metadata: dict|None, name: str) -> str|None:
+    for key, value in (metadata or {}).items():
+        if key.lower() == name: # Keys are case insensitive
+            return value
+    return None
+
+def metadata_codec(metadata: dict|None) -> str|None:
+    """Return the codec recorded in the metadata of an object (keys are case insensitive), or None"""
+    codec = _metadata_value(metadata, CODEC_METADATA)
+    return codec.lower() if codec is not None else None
+
+def metadata_original(metadata: dict|None) -> tuple[int|None, str|None]:
+    """Return the size and the MD5 of the data before compression recorded in the metadata of an object (None if unknown)"""
+    size, md5 = _metadata_value(metadata, SIZE_METADATA), _metadata_value(metadata, MD5_METADATA)
+    return int(size) if size is not None and size.isdigit() else None, md5.lower() if md5 is not None else None
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("The zstd codec requires the zstandard package (pip install obs_client[zstd])") from None
+    return zstandard
+
+
+class Codec:
+    """
+    Streaming compressor and decompressor of one of the `CODECS`. Compressed streams may be made of several
+    gzip members or zstd frames one after the other (see `CompressingWriter`), they are decoded as one stream.
+    """
+
+    def __init__(self, name: str, level: int = None):
+        """@param `level` compression level (default: 6 for gzip, 3 for zstd)"""
+        if name not in CODECS:
+            raise ValueError(f"unknown codec '{name}' (supported: {', '.join(CODECS)})")
+        self.name = name
+        self.level = level
+        if name == 'zstd':
+            _zstandard()
+
+    def compressor(self):
+        """@return an object with `compress(data) -> bytes` and `flush() -> bytes` functions"""
+        if self.name == 'gzip':
+            return zlib.compressobj(6 if self.level is None else self.level, zlib.DEFLATED, 31)
+        return _zstandard().ZstdCompressor(level=3 if self.level is None else self.level).compressobj()
+
+    def decompressor(self):
+        """@return an object with a `decompress(data) -> bytes` function and `eof` and `unused_data` attributes"""
+        if self.name == 'gzip':
+            return zlib.decompressobj(31)
+        return _zstandard().ZstdDecompressor().decompressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress `data` as a complete gzip member / zstd frame"""
+        compressor = self.compressor()
+        return compressor.compress(data) + compressor.flush()
+
+def _compress_chunk(name: str, level: int|None, data: bytes) -> bytes:
+    # Task of the process pool (module level function, so that it can be pickled)
+    return Codec(name, level).compress(data)
+
+
+class CompressingWriter(io.BufferedIOBase):
+    """
+    Writable stream that compresses the bytes written to it and writes them to `stream` (ex: an `ObjectWriter`),
+    closed or aborted along with it. With a process `pool`, the data is cut in chunks of `COMPRESSION_CHUNK_SIZE`
+    bytes compressed in parallel as independent gzip members / zstd frames, at most `max_in_flight` at a time.
+    """
+
+    def __init__(self, stream, codec: Codec, pool: Executor = None, max_in_flight: int = 2):
+        self.stream = stream
+        self.codec = codec
+        self.bytes_written = 0 # Uncompressed
+        self._pool = pool
+        self._max_in_flight = max_in_flight
+        self._compressor = codec.compressor() if pool is None else None
+        self._buffer = bytearray()
+        self._in_flight = deque() # Futures of the chunks being compressed, in order
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        if self.closed:
+            raise ValueError('I/O operation on closed file')
+        n = len(memoryview(b).cast('B'))
+        if self._pool is None:
+            data = self._compressor.compress(b)
+            if data:
+                self.stream.write(data)
+        else:
+            self._buffer += b
+            while len(self._buffer) >= COMPRESSION_CHUNK_SIZE:
+                self._submit(bytes(self._buffer[:COMPRESSION_CHUNK_SIZE]))
+                del self._buffer[:COMPRESSION_CHUNK_SIZE]
+        self.bytes_written += n
+        return n
+
+    def _submit(self, chunk: bytes):
+        while len(self._in_flight) >= self._max_in_flight: # Wait for a slot, so that memory use stays bounded
+            self.stream.write(self._in_flight.popleft().result())
+        self._in_flight.append(self._pool.submit(_compress_chunk, self.codec.name, self.codec.level, chunk))
+
+    def close(self):
+        """Write the end of the compressed stream and close `stream` (raise OSError on failure, the upload is then aborted)"""
+        if self.closed:
+            return
+        try:
+            if self._pool is None:
+                self.stream.write(self._compressor.flush())
+            else:
+                if self._buffer or not self.bytes_written: # An empty stream still needs a header
+                    self._submit(bytes(self._buffer))
+                while self._in_flight:
+                    self.stream.write(self._in_flight.popleft().result())
+            self.stream.close()
+        except BaseException as e:
+            self.abort()
+            if isinstance(e, Exception) and not isinstance(e, OSError): # Ex: a broken process pool
+                raise OSError(f'compression failed: {e}') from e
+            raise
+        super().close()
+
+    def abort(self):
+        """Stop compressing and abort `stream` (see `ObjectWriter.abort()`)"""
+        if self.closed:
+            return
+        for future in self._in_flight:
+            future.cancel()
+        self._in_flight.clear()
+        self._buffer = bytearray()
+        if hasattr(self.stream, 'abort'):
+            self.stream.abort()
+        super().close()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+    def __del__(self):
+        # Like ObjectWriter, a writer that was not closed does not create its object
+        try:
+            self.abort()
+        except Exception:
+            pass
+
+
+class DecompressingWriter:
+    """
+    Writable stream that decodes the compressed bytes written to it and writes them to `stream`. Decoding errors
+    do not interrupt the writes (so that the transfer can still be hashed): they are raised by `finish()`.
+    """
+
+    def __init__(self, stream, codec: Codec):
+        self.stream = stream
+        self.codec = codec
+        self.error = None
+        self._decompressor = codec.decompressor()
+        self._started = False # Bytes of the current member / frame were decoded
+
+    def write(self, data) -> int:
+        view = memoryview(data).cast('B')
+        if self.error is None:
+            try:
+                for i in range(0, len(view), DECOMPRESSION_INPUT_SIZE):
+                    self._decode(bytes(view[i:i + DECOMPRESSION_INPUT_SIZE]))
+            except Exception as e: # zlib.error, zstandard.ZstdError
+                self.error = e
+        return len(view)
+
+    def _decode(self, data: bytes):
+        while data:
+            decoded = self._decompressor.decompress(data)
+            self._started = True
+            if decoded:
+                self.stream.write(decoded)
+            if not self._decompressor.eof:
+                return
+            data = self._decompressor.unused_data # Next member / frame
+            self._decompressor, self._started = self.codec.decompressor(), False
+
+    def finish(self):
+        """@raise OSError if the compressed stream was invalid or truncated"""
+        if self.error is not None:
+            raise OSError(f'invalid {self.codec.name} data: {self.error}')
+        if self._started:
+            raise OSError(f'truncated {self.codec.name} data')
+
+
+class DecompressingReader(io.RawIOBase):
+    """Read-only, non seekable stream that decodes the compressed bytes read from `stream`"""
+
+    def __init__(self, stream, codec: Codec):
+        self.stream = stream
+        self.codec = codec
+        self._pending = bytearray() # Decoded bytes not read yet
+        self._writer = DecompressingWriter(types.SimpleNamespace(write=self._pending.extend), codec)
+        self._eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._pending and not self._eof:
+            data = self.stream.read(DECOMPRESSION_INPUT_SIZE)
+            if data:
+                self._writer.write(data)
+            else:
+                self._eof = True
+            if self._writer.error is not None or self._eof:
+                self._writer.finish()
+        n = min(len(b), len(self._pending))
+        b[:n] = self._pending[:n]
+        del self._pending[:n]
+        return n
+
+    def close(self):
+        self.stream.close()
+        super().close()
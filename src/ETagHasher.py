@@ -0,0 +1,109 @@
+
+import hashlib, io, math, os, re
+from typing import Iterable
+
+def is_md5_etag(etag: str|None) -> bool:
+    """True if `etag` has the format of the MD5 of an object (not of an object stored in parts, ex: `<md5>-<part count>` on S3)"""
+    return etag is not None and re.fullmatch('[0-9a-f]{32}', etag.strip('"').lower()) is not None
+
+def md5(data: bytes = b''):
+    return hashlib.md5(data, usedforsecurity=False)
+
+
+class ETagHasher:
+    """
+    Incremental MD5 of the bytes of an object, fed as they are transferred (no extra pass over the data) and
+    formatted as the ETag of the object. For objects stored in parts, pass the size of the parts: the ETag is then
+    the MD5 of the part MD5s, `<md5 of the binary digests>-<part count>` for S3 multipart uploads (`composite='s3'`)
+    or the MD5 of the hexadecimal digests for Swift Static Large Objects (`composite='swift'`).
+    """
+
+    def __init__(self, part_sizes: Iterable[int] = None, composite: str = 's3'):
+        self.composite = composite
+        self.bytes = 0
+        self._part_sizes = iter(part_sizes) if part_sizes is not None else None
+        self._md5 = md5()
+        self._digests = []
+        self._part_left = next(self._part_sizes, math.inf) if self._part_sizes is not None else math.inf
+        self._part_bytes = 0
+
+    def update(self, data):
+        if self._part_sizes is None:
+            self._md5.update(data)
+            self.bytes += len(data)
+            return
+        view = memoryview(data).cast('B')
+        self.bytes += len(view)
+        while len(view):
+            n = min(len(view), self._part_left)
+            self._md5.update(view[:n])
+            self._part_bytes += n
+            self._part_left -= n
+            view = view[n:]
+            if self._part_left == 0:
+                self._digests.append(self._md5.digest())
+                self._md5, self._part_bytes = md5(), 0
+                self._part_left = next(self._part_sizes, math.inf)
+
+    def hexdigest(self) -> str:
+        if self._part_sizes is None:
+            return self._md5.hexdigest()
+        digests = self._digests + ([self._md5.digest()] if self._part_bytes else [])
+        if self.composite == 'swift':
+            return md5(''.join(d.hex() for d in digests).encode()).hexdigest()
+        return f'{md5(b"".join(digests)).hexdigest()}-{len(digests)}'
+
+    def matches(self, etag: str) -> bool:
+        return etag.strip('"').lower() == self.hexdigest()
+
+
+class HashingReader:
+    """
+    Readable stream that hashes the bytes read from `stream` (the body of an upload). Rewinding it to its start
+    (ex: before a retry) restarts the hash; after any other seek, `hasher` is None since the bytes sent are unknown.
+    """
+
+    def __init__(self, stream):
+        if isinstance(stream, str):
+            stream = stream.encode()
+        if isinstance(stream, (bytes, bytearray, memoryview)):
+            stream = io.BytesIO(stream)
+        self.stream = stream
+        self.hasher = ETagHasher()
+        try:
+            self._start = stream.tell()
+        except (AttributeError, OSError, ValueError):
+            self._start = None
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)
+        if self.hasher is not None and data:
+            self.hasher.update(data)
+        return data
+
+    def seekable(self) -> bool:
+        return self._start is not None and self.stream.seekable()
+
+    def tell(self) -> int:
+        return self.stream.tell()
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        before = self.stream.tell()
+        position = self.stream.seek(offset, whence)
+        if position == self._start:
+            self.hasher = ETagHasher()
+        elif position != before:
+            self.hasher = None
+        return position
+
+
+class HashingWriter:
+    """Writable stream that hashes the bytes written to `stream` (the destination of a download)"""
+
+    def __init__(self, stream, hasher: ETagHasher):
+        self.stream = stream
+        self.hasher = hasher
+
+    def write(self, data) -> int:
+        self.hasher.update(data)
+        return self.stream.write(data)
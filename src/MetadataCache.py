@@ -0,0 +1,142 @@
+
+import copy, functools, inspect, threading, time
+from collections import OrderedDict
+
+class MetadataCache:
+    """
+    Thread-safe in-process cache of `container_info()` and `object_info()` results, including the negative results
+    (None) of the resources that do not exist (not those of the errors). Entries expire after `ttl` seconds and the least recently used entries are evicted when
+    the cache holds more than `max_entries` entries.
+    """
+
+    def __init__(self, ttl: float = 60, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict() # key -> (expiry time, value), least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, key) -> tuple[bool, object]:
+        """
+        Look up a key
+
+        @return (True, value) on a hit, (False, None) on a miss or if the entry expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, copy.deepcopy(entry[1])
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_object(self, container_name: str, object_name: str):
+        self.invalidate(('object', container_name, object_name))
+
+    def invalidate_container(self, container_name: str):
+        """Drop the container entry and the entries of all the objects of the container"""
+        with self._lock:
+            for key in [k for k in self._entries if k[1] == container_name]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Return the hit/miss/eviction counters and the number of entries"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'entries': len(self._entries)}
+
+
+#
+#   Decorators applied to the client functions. They do nothing unless the client cache is enabled
+#   (see `ObjectStorageClient.enable_cache()`).
+#
+
+_lookup = threading.local() # `not_found` is set by `not_found()` during the call of a `cached_info` function
+
+def not_found() -> None:
+    """
+    Called by the backends when the container or object looked up does not exist (404): unlike the None
+    returned on errors (403, 5xx...), this negative result is cached. Returns None, ex: `return not_found()`
+    """
+    _lookup.not_found = True
+    return None
+
+def _arguments(signature: inspect.Signature, self, args, kwargs) -> dict:
+    bound = signature.bind(self, *args, **kwargs)
+    bound.apply_defaults()
+    return bound.arguments
+
+def cached_info(kind: str):
+    """Cache the result of a `container_info()` (`kind='container'`) or `object_info()` (`kind='object'`) function"""
+    def decorator(func):
+        signature = inspect.signature(func)
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if self.cache is None:
+                return func(self, *args, **kwargs)
+            arguments = _arguments(signature, self, args, kwargs)
+            if arguments.get('if_none_match') is not None or arguments.get('if_modified_since') is not None:
+                return func(self, *args, **kwargs) # Conditional requests ask the backend
+            if kind == 'container':
+                key = ('container', arguments['container_name'])
+            else:
+                key = ('object', self.get_container(arguments['container_name']), arguments['object_name'])
+            found, value = self.cache.get(key)
+            if found:
+                return value
+            _lookup.not_found = False
+            value = func(self, *args, **kwargs)
+            if value is not None or _lookup.not_found:
+                self.cache.put(key, value)
+            return value
+        return wrapper
+    return decorator
+
+def invalidates_info(kind: str):
+    """
+    Drop the cache entries of the container (`kind='container'`), object (`kind='object'`), objects
+    (`kind='objects'`, for functions that take `object_names`) or copy destination (`kind='destination'`,
+    for functions that take `destination_name` and `destination_container`) modified by the decorated function
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if self.cache is None:
+                return func(self, *args, **kwargs)
+            arguments = _arguments(signature, self, args, kwargs)
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                if kind == 'container':
+                    self.cache.invalidate_container(arguments['container_name'])
+                elif kind == 'destination':
+                    container_name = arguments['destination_container'] or self.get_container(arguments['container_name'])
+                    self.cache.invalidate_object(container_name, arguments['destination_name'])
+                else:
+                    container_name = self.get_container(arguments['container_name'])
+                    names = arguments['object_names'] if kind == 'objects' else [arguments['object_name']]
+                    for name in names:
+                        self.cache.invalidate_object(container_name, name)
+        return wrapper
+    return decorator
@@ -0,0 +1,160 @@
+
+import bisect, json, math, threading, time
+from collections import Counter
+
+class Instrumentation:
+    """
+    Receives the measures of the requests sent by a client (see `ObjectStorageClient.instrumentation`).
+    Subclass it to forward the measures to a monitoring system, or use `Metrics` to aggregate them in memory.
+    The functions are called from the threads sending the requests.
+    """
+
+    def record_request(self, operation: str, seconds: float, status: int|str|None, bytes_sent: int, bytes_received: int):
+        """
+        Called after each request attempt
+
+        @param `operation` request type (ex: 'head_object' for S3, 'HEAD object' for Swift)
+        @param `seconds` latency of the request, until the reply headers are received
+        @param `status` HTTP status code, or the exception name if the request failed without reply
+        @param `bytes_sent` size of the request body
+        @param `bytes_received` size of the reply body
+        """
+        pass
+
+    def record_retry(self, operation: str, failure: str, delay: float):
+        """
+        Called before a failed request is retried
+
+        @param `failure` 'rejected' or 'failed' (see `ObjectStorageClient._classify_failure()`)
+        @param `delay` backoff delay before the retry (seconds)
+        """
+        pass
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, math.inf) # Upper bounds (seconds)
+
+class OperationMetrics:
+    """Counters and latency histogram of one request type"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0 # Replies with a status >= 400, and requests without reply
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.latency_sum = 0.0
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS) # Request count per bucket (not cumulative)
+        self.statuses = Counter()
+
+    def percentile(self, p: float) -> float:
+        """Estimate a latency percentile (0 < p <= 100) from the histogram: the upper bound of the bucket it falls in"""
+        rank = self.requests * p / 100
+        count = 0
+        for bound, n in zip(LATENCY_BUCKETS, self.latency_buckets):
+            count += n
+            if count >= rank and n:
+                return bound
+        return 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'retries': self.retries,
+            'bytes_sent': self.bytes_sent,
+            'bytes_received': self.bytes_received,
+            'latency_sum': self.latency_sum,
+            'latency_buckets': {str(bound): n for bound, n in zip(LATENCY_BUCKETS, self.latency_buckets)},
+            'statuses': {str(status): n for status, n in self.statuses.items()},
+        }
+
+
+class Metrics(Instrumentation):
+    """In-memory aggregation of the request measures, per operation"""
+
+    def __init__(self):
+        self.operations: dict[str, OperationMetrics] = {}
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _operation(self, operation: str) -> OperationMetrics:
+        if operation not in self.operations:
+            self.operations[operation] = OperationMetrics()
+        return self.operations[operation]
+
+    def record_request(self, operation: str, seconds: float, status: int|str|None, bytes_sent: int, bytes_received: int):
+        with self._lock:
+            m = self._operation(operation)
+            m.requests += 1
+            if not isinstance(status, int) or status >= 400:
+                m.errors += 1
+            m.bytes_sent += bytes_sent
+            m.bytes_received += bytes_received
+            m.latency_sum += seconds
+            m.latency_buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            m.statuses[status] += 1
+
+    def record_retry(self, operation: str, failure: str, delay: float):
+        with self._lock:
+            self._operation(operation).retries += 1
+
+    def reset(self):
+        with self._lock:
+            self.operations = {}
+            self.started = time.monotonic()
+
+    def snapshot(self) -> dict:
+        """Return a copy of the counters: `{'seconds': ..., 'operations': {operation: {'requests': ..., ...}}}`"""
+        with self._lock:
+            return {
+                'seconds': time.monotonic() - self.started,
+                'operations': {name: m.snapshot() for name, m in sorted(self.operations.items())},
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot())
+
+    def to_prometheus(self, prefix: str = 'obs_client') -> str:
+        """Export the counters in the Prometheus text format"""
+        lines = []
+        with self._lock:
+            for name, m in sorted(self.operations.items()):
+                labels = f'operation="{name}"'
+                for status, n in sorted(m.statuses.items(), key=str):
+                    lines.append(f'{prefix}_requests_total{{{labels},status="{status}"}} {n}')
+                lines.append(f'{prefix}_retries_total{{{labels}}} {m.retries}')
+                lines.append(f'{prefix}_bytes_sent_total{{{labels}}} {m.bytes_sent}')
+                lines.append(f'{prefix}_bytes_received_total{{{labels}}} {m.bytes_received}')
+                cumulative = 0
+                for bound, n in zip(LATENCY_BUCKETS, m.latency_buckets):
+                    cumulative += n
+                    lines.append(f'{prefix}_request_seconds_bucket{{{labels},le="{"+Inf" if bound == math.inf else bound}"}} {cumulative}')
+                lines.append(f'{prefix}_request_seconds_sum{{{labels}}} {m.latency_sum}')
+                lines.append(f'{prefix}_request_seconds_count{{{labels}}} {m.requests}')
+        return '\n'.join(lines) + '\n'
+
+    def summary(self) -> str:
+        """Human readable table of the counters"""
+        with self._lock:
+            seconds = time.monotonic() - self.started
+            lines = [f"{'operation':<28}{'requests':>9}{'errors':>8}{'retries':>8}{'avg ms':>9}{'p50 ms':>9}{'p99 ms':>9}{'sent':>11}{'received':>11}"]
+            for name, m in sorted(self.operations.items()):
+                average = m.latency_sum / m.requests * 1000 if m.requests else 0
+                lines.append(f"{name:<28}{m.requests:>9}{m.errors:>8}{m.retries:>8}{average:>9.1f}"
+                    f"{_milliseconds(m.percentile(50)):>9}{_milliseconds(m.percentile(99)):>9}"
+                    f"{_size(m.bytes_sent):>11}{_size(m.bytes_received):>11}")
+            sent = sum(m.bytes_sent for m in self.operations.values())
+            received = sum(m.bytes_received for m in self.operations.values())
+            lines.append(f"{sum(m.requests for m in self.operations.values())} requests in {seconds:.1f}s, "
+                f"{_size(sent)} sent ({_size(sent / seconds if seconds else 0)}/s), {_size(received)} received ({_size(received / seconds if seconds else 0)}/s)")
+        return '\n'.join(lines)
+
+def _milliseconds(bound: float) -> str:
+    """Format a histogram bucket bound (the percentiles are estimated as "under that bound")"""
+    return '>10000' if bound == math.inf else f"<{bound * 1000:g}"
+
+def _size(n: float) -> str:
+    for unit in ['B', 'KiB', 'MiB', 'GiB']:
+        if n < 1024 or unit == 'GiB':
+            return f"{n:.0f} {unit}" if unit == 'B' else f"{n:.1f} {unit}"
+        n /= 1024
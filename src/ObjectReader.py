@@ -0,0 +1,127 @@
+
+import io, os
+from collections import OrderedDict
+
+class _BufferWriter:
+    """Writable stream that fills a memoryview, to download a range straight into the buffer of the caller"""
+
+    def __init__(self, view: memoryview):
+        self.view = view
+        self.offset = 0
+
+    def write(self, data) -> int:
+        n = len(data)
+        self.view[self.offset:self.offset + n] = data
+        self.offset += n
+        return n
+
+
+class ObjectReader(io.RawIOBase):
+    """
+    Read-only, seekable file object over an object (see `ObjectStorageClient.object_open()`). Reads are served
+    with ranged GET requests, by blocks of `block_size` bytes kept in a small LRU cache of `cache_blocks` blocks:
+    random accesses (ex: a Parquet footer, a member of a zip archive) only fetch the blocks they touch, while
+    sequential reads fetch `readahead` bytes per request. Reads larger than the cache bypass it.
+    """
+
+    def __init__(self, client, object_name: str, container_name: str, size: int, block_size: int, readahead: int, cache_blocks: int):
+        self.client = client
+        self.name = object_name
+        self.container_name = container_name
+        self.size = size
+        self.block_size = block_size
+        self.readahead = max(readahead, block_size)
+        self.cache_blocks = max(cache_blocks, -(-self.readahead // block_size))
+        self.requests = 0 # Number of ranged GET requests sent
+        self.bytes_fetched = 0
+        self._position = 0
+        self._last_end = None # End of the previous read, to detect sequential reads
+        self._blocks = OrderedDict() # block index -> bytes, least recently used first
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_SET:
+            position = offset
+        elif whence == os.SEEK_CUR:
+            position = self._position + offset
+        elif whence == os.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError(f'invalid whence ({whence})')
+        if position < 0:
+            raise ValueError(f'negative seek position {position}')
+        self._position = position
+        return position
+
+    def readinto(self, b) -> int:
+        if self.closed:
+            raise ValueError('I/O operation on closed file')
+        view = memoryview(b).cast('B')
+        n = min(len(view), self.size - self._position)
+        if n <= 0:
+            return 0
+
+        first = self._position
+        if n > self.block_size * (self.cache_blocks - 1):
+            self._fetch(first, first + n - 1, view[:n]) # Larger than the cache (its blocks could not all be kept): straight to the buffer
+        else:
+            self._load_blocks(first // self.block_size, (first + n - 1) // self.block_size, sequential=first == self._last_end)
+            copied = 0
+            while copied < n:
+                index, offset = divmod(first + copied, self.block_size)
+                block = self._blocks[index]
+                chunk = min(n - copied, len(block) - offset)
+                view[copied:copied + chunk] = block[offset:offset + chunk]
+                copied += chunk
+
+        self._position = self._last_end = first + n
+        return n
+
+    def readall(self) -> bytes:
+        data = bytearray(max(0, self.size - self._position))
+        n = self.readinto(data)
+        return bytes(data[:n])
+
+    def _load_blocks(self, first_block: int, last_block: int, sequential: bool):
+        """Make sure the blocks are in the cache, with one request per run of missing blocks"""
+        if sequential and first_block not in self._blocks: # Fetch the next window, once the previous one is consumed
+            last_block = max(last_block, first_block + self.readahead // self.block_size - 1)
+        last_block = min(last_block, (self.size - 1) // self.block_size)
+
+        index = first_block
+        while index <= last_block:
+            if index in self._blocks:
+                self._blocks.move_to_end(index)
+                index += 1
+                continue
+            end = index
+            while end + 1 <= last_block and end + 1 not in self._blocks:
+                end += 1
+            first, last = index * self.block_size, min((end + 1) * self.block_size, self.size) - 1
+            data = bytearray(last - first + 1)
+            self._fetch(first, last, memoryview(data))
+            for i in range(index, end + 1):
+                self._blocks[i] = bytes(data[(i - index) * self.block_size:(i - index + 1) * self.block_size])
+            index = end + 1
+
+        while len(self._blocks) > self.cache_blocks:
+            self._blocks.popitem(last=False)
+
+    def _fetch(self, first: int, last: int, view: memoryview):
+        writer = _BufferWriter(view)
+        self.requests += 1
+        if not self.client.object_download(self.name, writer, container_name=self.container_name, byte_range=(first, last)) or writer.offset != last - first + 1:
+            raise OSError(f'could not read bytes {first}-{last} of {self.container_name}/{self.name}')
+        self.bytes_fetched += writer.offset
+
+    def close(self):
+        self._blocks.clear()
+        super().close()
@@ -1,5 +1,28 @@
 
+import io, os, threading, time
 from dataclasses import dataclass
+from email.utils import formatdate
+from collections import deque
+from typing import Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from .MetadataCache import MetadataCache, invalidates_info
+from .RetryPolicy import RetryPolicy
+from .AdaptiveLimiter import AdaptiveLimiter, TokenBucket
+from .Metrics import Instrumentation, Metrics
+from .ObjectReader import ObjectReader
+from .ObjectWriter import ObjectWriter
+from .ETagHasher import ETagHasher, is_md5_etag, md5
+from .Codec import CODEC_METADATA, SIZE_METADATA, Codec, CompressingWriter, DecompressingReader, DecompressingWriter, metadata_codec
+
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024 # Buffer size used to stream downloads (4 MiB)
+MULTIPART_THRESHOLD = 64 * 1024 * 1024 # Uploads larger than this are split in parts (64 MiB)
+MULTIPART_PART_SIZE = 16 * 1024 * 1024 # Smallest part size picked for multipart uploads (16 MiB)
+MULTIPART_CONCURRENCY = 8 # Number of parts uploaded in parallel
+MAX_CONNECTIONS = 10 # Size of the HTTP connection pool (and of the worker pool) of a client
+READ_BLOCK_SIZE = 256 * 1024 # Size of the blocks fetched by the readers of object_open() (256 KiB)
+READ_AHEAD = 4 * 1024 * 1024 # Bytes fetched per request by the readers of object_open() on sequential reads (4 MiB)
+READ_CACHE_BLOCKS = 32 # Number of blocks kept in memory by the readers of object_open()
 
 class ObjectStorageClientError(Exception):
     """Custom exceptions"""
@@ -12,6 +35,10 @@ class AuthorizationError(ObjectStorageClientError):
 class ContainerNotSpecified(ObjectStorageClientError):
     pass
 
+class IntegrityError(ObjectStorageClientError):
+    """The bytes transferred do not match the hash computed by the backend"""
+    pass
+
 
 @dataclass
 class ContainerInfo:
@@ -32,15 +59,348 @@ class ObjectInfo:
 class SubdirInfo:
     subdir: str         # Directory subpath
 
+class _NotModified:
+    def __repr__(self):
+        return 'NOT_MODIFIED'
+
+NOT_MODIFIED = _NotModified() # Result of a conditional object_info() / object_download() when the object did not change
+
+def quote_etag(etag: str) -> str:
+    """ETags are sent quoted in the conditional request headers"""
+    return etag if etag.startswith(('"', 'W/"')) or etag == '*' else f'"{etag}"'
+
+def http_date(timestamp: float) -> str:
+    """Format epoch seconds as a HTTP date (ex: for If-Modified-Since)"""
+    return formatdate(timestamp, usegmt=True)
+
+def copy_stream(source, destination, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    Copy everything from the `source` stream to the `destination` stream through a single buffer
+    of `chunk_size` bytes that is reused for every read, so memory use stays flat whatever the
+    amount of data copied. Uses `source.readinto()` when available, `source.read()` otherwise.
+
+    @return The number of bytes copied
+    """
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    readinto = getattr(source, 'readinto', None)
+    total = 0
+    while True:
+        if readinto is not None:
+            n = readinto(buffer)
+            if not n:
+                break
+            destination.write(view[:n])
+        else:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            n = len(chunk)
+            destination.write(chunk)
+        total += n
+    return total
+
+def stream_size(stream) -> int|None:
+    """Return the number of bytes left to read from `stream`, or None if it cannot be known (ex: stdin)"""
+    if isinstance(stream, str):
+        return len(stream.encode())
+    if isinstance(stream, (bytes, bytearray, memoryview)):
+        return len(stream)
+    try:
+        if not stream.seekable():
+            return None
+        position = stream.tell()
+        end = stream.seek(0, os.SEEK_END)
+        stream.seek(position)
+        return end - position
+    except (AttributeError, OSError, ValueError):
+        return None
+
+def choose_part_size(size: int|None, min_part_size: int, max_parts: int) -> int:
+    """
+    Pick the part size of a multipart upload so that an object of `size` bytes fits in `max_parts`
+    parts. Parts are at least `min_part_size` bytes and rounded up to a whole MiB.
+    """
+    if size is None:
+        return min_part_size
+    mib = 1024 * 1024
+    part_size = max(min_part_size, -(-size // max_parts))
+    return -(-part_size // mib) * mib
+
 class ObjectStorageClient:
     """Abstract class that defines a generic object storage API. Subclass this class to support a new object storage backend."""
 
     container_name = None
+    max_connections = MAX_CONNECTIONS # Size of the HTTP connection pool, set by the backend constructor
+    cache: MetadataCache|None = None # Cache of container_info() / object_info() results (see enable_cache())
+    download_chunk_size = DEFAULT_CHUNK_SIZE # Buffer size used by object_download() when `chunk_size` is not specified
+    multipart_threshold = MULTIPART_THRESHOLD # Size above which object_upload() switches to a multipart upload
+    multipart_part_size = MULTIPART_PART_SIZE # Minimum part size of multipart uploads (parts grow with the object size)
+    multipart_concurrency = MULTIPART_CONCURRENCY # Number of parts uploaded in parallel
+    multipart_max_parts = 10000 # Maximum number of parts supported by the backend
+    multipart_max_part_size = 5 * 1024 ** 3 # Maximum part size supported by the backend (5 GiB)
+    delete_batch_size = 1000 # Number of objects deleted per batch delete request
+    delete_concurrency = 4 # Number of batch delete requests in flight
+    retry_policy: RetryPolicy|None = None # Retries of the transient request failures, set by the backend constructor (None to disable)
+    request_body_argument = None # Name of the request body argument of the backend request functions (see _call())
+    limiter: AdaptiveLimiter|None = None # Adaptive limit of the requests in flight, set by the backend constructor (None to disable)
+    rate_limits: dict[str, TokenBucket] = {} # Request rate caps per container (see set_rate_limit())
+    instrumentation: Instrumentation|None = None # Receives the measures of each request (see enable_metrics())
+    verify_integrity = True # Compare the MD5 of the bytes uploaded and downloaded with the ETag of the objects (see _check_integrity())
+    compression: str|None = None # Codec of the uploads ('gzip' or 'zstd'), recorded in the object metadata (see _compresses())
+    compression_level: int|None = None # Level of the `compression` codec (its default if None)
+    compression_processes = 0 # Number of processes compressing the uploads in parallel (0: compress in the uploading thread)
+    decompress = True # Decode the downloads of the objects uploaded with a codec
+
+    _executor: ThreadPoolExecutor|None = None
+    _compression_pool: ProcessPoolExecutor|None = None
+
+    def __init__(self):
+        """Backends call it from their constructor"""
+        self._executor_lock = threading.Lock() # Creation of the worker pools of this client
 
     #
     #   Common implementation
     #
 
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """
+        Worker pool of the client, used by all the functions that send requests in parallel. It has one
+        worker per HTTP connection of the pool (`max_connections`) and lives as long as the client.
+        """
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_connections, thread_name_prefix=type(self).__name__)
+        return self._executor
+
+    def close(self):
+        """Stop the worker pools of the client (they are started again if needed)"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if self._compression_pool is not None:
+            self._compression_pool.shutdown()
+            self._compression_pool = None
+
+    def _compresses(self, metadata: dict) -> bool:
+        """
+        Tell whether an upload is compressed with the `compression` codec. Streams whose metadata already records
+        a codec (ex: the parts of an upload being compressed, or data compressed beforehand) are sent as they are.
+        """
+        return self.compression is not None and metadata_codec(metadata) is None
+
+    def _compressing_writer(self, writer: ObjectWriter) -> CompressingWriter:
+        """Compress the data written to `writer` with the `compression` codec, on the process pool if `compression_processes` is set"""
+        pool = None
+        if self.compression_processes:
+            with self._executor_lock:
+                if self._compression_pool is None:
+                    self._compression_pool = ProcessPoolExecutor(self.compression_processes)
+                pool = self._compression_pool
+        return CompressingWriter(writer, Codec(self.compression, self.compression_level), pool, 2 * self.compression_processes)
+
+    def _decoding(self, stream, codec: str|None):
+        """Return the stream a download is written to: `stream`, or a `DecompressingWriter` if the object was uploaded with a codec"""
+        if codec is None or not self.decompress:
+            return stream
+        return DecompressingWriter(stream, Codec(codec.lower()))
+
+    def _finish_decoding(self, out, description: str) -> bool:
+        """@return false (and print the error) if the download written to `out` (see `_decoding()`) could not be decoded"""
+        if isinstance(out, DecompressingWriter):
+            try:
+                out.finish()
+            except OSError as e:
+                print(f"{type(self).__name__}: {description}: {e}")
+                return False
+        return True
+
+    def _imap(self, function, items: Iterable, max_concurrency: int = None) -> Iterator[Future]:
+        """
+        Call `function(item)` for each item on the client worker pool, with at most `max_concurrency` calls
+        in flight (`max_connections` by default), and yield the futures in the input order as they complete.
+        Items are only pulled from `items` when a slot is free, which gives backpressure on lazy inputs.
+
+        Must not be called from a task running on the client worker pool (it would wait for itself).
+        """
+        window = max_concurrency or self.max_connections
+        in_flight = deque()
+        try:
+            for item in items:
+                in_flight.append(self.executor.submit(function, item))
+                if len(in_flight) >= window:
+                    future = in_flight.popleft()
+                    wait([future])
+                    yield future
+            while in_flight:
+                future = in_flight.popleft()
+                wait([future])
+                yield future
+        finally:
+            # The consumer stopped early (or failed), don't run the calls that did not start yet
+            for future in in_flight:
+                future.cancel()
+
+    def set_rate_limit(self, requests_per_second: float|None, container_name: str = None, burst: float = None):
+        """
+        Cap the rate of the requests sent by the client to a container, in addition to the adaptive limit of
+        requests in flight (see `limiter`)
+
+        @param `requests_per_second` maximum request rate, None to remove the cap
+        @param `burst` number of requests that can be sent at once after an idle period (`requests_per_second` by default)
+        """
+        container_name = self.get_container(container_name)
+        rate_limits = dict(self.rate_limits) # Requests in flight read the dict without lock
+        if requests_per_second is None:
+            rate_limits.pop(container_name, None)
+        else:
+            rate_limits[container_name] = TokenBucket(requests_per_second, burst)
+        self.rate_limits = rate_limits
+
+    def _call(self, function, *args, idempotent: bool = True, limited: bool = True, **kwargs):
+        """
+        Send a request to the backend with `function(*args, **kwargs)`, and retry it according to `retry_policy`
+        if it fails with a transient error (see `_classify_failure()`). Failures that may have been processed by
+        the backend (ex: 500, connection reset) are only retried if the request is `idempotent`; rejected requests
+        (ex: 503, 429) always are. A seekable request body is rewound before each retry, and requests sending a
+        stream that cannot be rewound (ex: stdin) are not retried. Failures while the body of a download is read
+        are handled by the backends with a `ResumingReader`.
+
+        Each attempt waits for a slot of the `limiter`, which shrinks when requests are rejected, and for the rate
+        limit of the container if one is set. Requests that are not `limited` skip both (ex: authentication requests
+        sent while a request holds a slot). Attempts and retries are reported to the `instrumentation`.
+
+        @return the result of the last attempt (or raise its exception)
+        """
+        limiter = self.limiter if limited else None
+        bucket = self.rate_limits.get(self._request_container(args, kwargs)) if limited and self.rate_limits else None
+        policy = self.retry_policy
+        body = kwargs.get(self.request_body_argument) if self.request_body_argument else None
+        position = None
+        if policy is not None and hasattr(body, 'read'):
+            try:
+                position = body.tell() if body.seekable() else None
+            except (AttributeError, OSError):
+                position = None
+            if position is None:
+                policy = None # The stream cannot be sent again
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            bytes_sent = (stream_size(body) or 0) if body is not None else 0
+
+        attempt = 1
+        while True:
+            if bucket is not None:
+                bucket.acquire()
+            started = limiter.acquire() if limiter is not None else None
+            failure, retry_after = None, None
+            try:
+                request_start = time.monotonic()
+                try:
+                    result, error = function(*args, **kwargs), None
+                except Exception as e:
+                    result, error = None, e
+                latency = time.monotonic() - request_start
+                failure, retry_after = self._classify_failure(result, error)
+            finally:
+                if limiter is not None:
+                    limiter.release(started, throttled=failure == 'rejected')
+
+            if instrumentation is not None:
+                operation, status, bytes_received = self._describe_request(function, args, kwargs, result, error)
+                instrumentation.record_request(operation, latency, status, bytes_sent, bytes_received)
+
+            if policy is not None:
+                if failure is None:
+                    policy.on_success()
+                elif (failure == 'rejected' or idempotent) \
+                        and attempt < policy.max_attempts \
+                        and (retry_after or 0) <= policy.max_retry_after \
+                        and policy.acquire():
+                    if hasattr(result, 'close'):
+                        result.close() # Release the connection of the failed reply
+                    delay = policy.backoff(attempt, retry_after)
+                    if instrumentation is not None:
+                        instrumentation.record_retry(operation, failure, delay)
+                    time.sleep(delay)
+                    if position is not None:
+                        body.seek(position)
+                    attempt += 1
+                    continue
+
+            if error is not None:
+                raise error
+            return result
+
+    def _describe_request(self, function, args: tuple, kwargs: dict, result, error: Exception|None) -> tuple[str, int|str|None, int]:
+        """
+        Describe a request for the client `instrumentation` (override in the backends)
+
+        @return (operation name, status code or exception name, size of the reply body)
+        """
+        return function.__name__, type(error).__name__ if error is not None else None, 0
+
+    def _check_integrity(self, hasher: ETagHasher|None, etag: str|None, description: str) -> bool:
+        """
+        Compare the hash of the bytes transferred, computed while they were streamed, with the ETag of the object.
+        The backends pass no `hasher` when the ETag is not a hash of the data (ex: S3 objects encrypted with KMS).
+
+        @return false (and print the mismatch) if the hashes differ
+        """
+        if hasher is None or etag is None or hasher.matches(etag):
+            return True
+        etag = etag.strip('"')
+        print(f"{type(self).__name__}: {description} integrity check failed: ETag {etag}, {hasher.hexdigest()} transferred")
+        return False
+
+    def _check_part(self, data: bytes, etag: str|None, description: str):
+        """Raise IntegrityError if the ETag of an uploaded part is not the MD5 of its bytes"""
+        if self.verify_integrity and is_md5_etag(etag) and etag.strip('"').lower() != md5(data).hexdigest():
+            raise IntegrityError(f"{description}: ETag {etag} does not match the bytes sent")
+
+    def _request_container(self, args: tuple, kwargs: dict) -> str|None:
+        """Return the container targeted by a request function call (override in the backends to support `set_rate_limit()`)"""
+        return None
+
+    def _classify_failure(self, result, error: Exception|None) -> tuple[str|None, float|None]:
+        """
+        Tell whether a request failed with a transient error (override in the backends)
+
+        @param `result` result of the request function, `error` the exception it raised (or None)
+        @return (failure, retry_after): failure is None if the request did not fail with a transient error,
+            'rejected' if the backend did not process the request (ex: throttling, connection refused), or 'failed'
+            if it may have processed it (ex: internal error, connection reset). `retry_after` is the delay requested
+            by the server (seconds) or None.
+        """
+        return None, None
+
+    def enable_cache(self, ttl: float = 60, max_entries: int = 10000) -> MetadataCache:
+        """
+        Cache the results of `container_info()` and `object_info()`, including for containers and objects that
+        do not exist, so repeated lookups skip the network. Entries expire after `ttl` seconds and the least
+        recently used entries are evicted above `max_entries`. Entries are invalidated when the container or
+        object is modified through this client (changes made by other clients are seen once entries expire).
+
+        @return The cache, which provides hit/miss counters with `stats()`
+        """
+        self.cache = MetadataCache(ttl, max_entries)
+        return self.cache
+
+    def disable_cache(self):
+        self.cache = None
+
+    def enable_metrics(self) -> Metrics:
+        """
+        Count the requests sent by the client, per operation: number of requests, errors and retries, status codes,
+        latency histogram, bytes sent and received (set `instrumentation` to forward the measures elsewhere)
+
+        @return The metrics, which provide `snapshot()`, `summary()`, `to_json()` and `to_prometheus()`
+        """
+        self.instrumentation = Metrics()
+        return self.instrumentation
+
     def use_container(self, container_name: str | None, create=False) -> bool:
         """
         Set the target container name
@@ -99,16 +459,383 @@ class ObjectStorageClient:
                 )
         return ok
 
-    def download_file(self, object_name: str, outputFilePath: str, container_name: str = None) -> bool:
-        """Download a file"""
+    def download_file(self,
+        object_name: str,
+        outputFilePath: str,
+        container_name: str = None,
+        chunk_size: int = None,
+        parallel: bool = False,
+        parts: int = None,
+        concurrency: int = None,
+        retries: int = 3,
+        if_match: str = None,
+    ) -> bool:
+        """
+        Download a file, streaming it to disk through a buffer of `chunk_size` bytes.
+
+        If `parallel` is set, the object is split in `parts` byte ranges (one per `multipart_part_size` bytes
+        by default) that are downloaded over `concurrency` connections (`multipart_concurrency` by default).
+        Each range is written directly at its offset in the preallocated file, and a range that fails is
+        downloaded again, up to `retries` times. All the ranges are requested from the same version of the object.
+
+        @param `if_match` only download the object if its ETag is this one (see `object_download()`)
+        """
+        if parallel:
+            return self._download_file_ranges(object_name, outputFilePath, container_name, chunk_size, parts, concurrency, retries, if_match)
+
         with open(outputFilePath, 'wb') as file:
             ok = self.object_download(
                 object_name=object_name, 
                 stream=file,
-                container_name=container_name
+                container_name=container_name,
+                chunk_size=chunk_size,
+                if_match=if_match,
                 )
         return ok
 
+    def _download_file_ranges(self, object_name: str, outputFilePath: str, container_name: str, chunk_size: int, parts: int, concurrency: int, retries: int, if_match: str = None) -> bool:
+        container_name = self.get_container(container_name)
+        info = self.object_info(object_name, container_name=container_name)
+        if info is None:
+            return False
+        if if_match is not None and (info.hash or '').strip('"') != if_match.strip('"'):
+            return False
+        if self.decompress and metadata_codec(info.metadata) is not None: # The decoded bytes can't be split in ranges
+            return self.download_file(object_name, outputFilePath, container_name, chunk_size, if_match=if_match)
+
+        size = info.bytes
+        if parts is None:
+            parts = -(-size // self.multipart_part_size)
+        part_size = max(1, -(-size // max(1, parts)))
+        ranges = [(first, min(first + part_size, size) - 1) for first in range(0, size, part_size)]
+
+        # Preallocate the file so that every range can be written at its offset
+        with open(outputFilePath, 'wb') as file:
+            if size > 0 and hasattr(os, 'posix_fallocate'):
+                os.posix_fallocate(file.fileno(), 0, size)
+            else:
+                file.truncate(size)
+
+        def download_range(byte_range: tuple[int, int]) -> bool:
+            first, last = byte_range
+            for _ in range(retries + 1):
+                try:
+                    # Each range has its own unbuffered handle, writes go straight to the file at the range offset
+                    with open(outputFilePath, 'r+b', buffering=0) as file:
+                        file.seek(first)
+                        ok = self.object_download(object_name, file, container_name=container_name, chunk_size=chunk_size, byte_range=(first, last), if_match=info.hash or None)
+                        if ok and file.tell() == last + 1:
+                            return True
+                except Exception:
+                    pass
+            return False
+
+        futures = self._imap(download_range, ranges, concurrency or self.multipart_concurrency)
+        return all(f.result() for f in futures)
+
+    def upload_directory(self, directory: str, prefix: str = None, container_name: str = None, concurrency: int = None, callback = None, metadata: dict = {}):
+        """
+        Upload all the files of a local directory tree, in parallel, as objects named `<prefix>/<path relative to directory>`.
+        Files are uploaded as the tree is walked. See `sync_upload()` to only upload the new or changed files.
+
+        @param `concurrency` number of files uploaded in parallel (`max_connections` by default)
+        @param `callback` function called with each `SyncAction` and its success as they complete
+        @param `metadata` metadata of every uploaded object
+        @return `SyncResult` with the counts of transferred and failed files and the throughput
+        """
+        from .Sync import normalize_prefix, upload_actions, run_actions
+        container_name = self.get_container(container_name)
+        prefix = normalize_prefix(prefix)
+        return run_actions(self, upload_actions(directory, prefix, metadata), container_name, concurrency, callback=callback)
+
+    def download_directory(self, directory: str, prefix: str = None, container_name: str = None, concurrency: int = None, callback = None):
+        """
+        Download all the objects under `prefix`, in parallel, to files named after the object names relative to `prefix`
+        in the local `directory`. Objects are downloaded as the listing is streamed. See `sync_download()` to only download
+        the new or changed objects.
+
+        @return `SyncResult`
+        """
+        from .Sync import normalize_prefix, download_actions, run_actions
+        container_name = self.get_container(container_name)
+        prefix = normalize_prefix(prefix)
+        return run_actions(self, download_actions(self, prefix, directory, container_name), container_name, concurrency, callback=callback)
+
+    def sync_upload(self,
+        directory: str,
+        prefix: str = None,
+        container_name: str = None,
+        delete: bool = False,
+        dry_run: bool = False,
+        checksum: bool = False,
+        concurrency: int = None,
+        callback = None,
+    ):
+        """
+        Upload the files of a local directory tree that are missing or changed under `prefix` in the container.
+        Files are compared by size, modification time and MD5 (against the object ETag), see `Sync.unchanged()`.
+
+        @param `directory` local directory to upload
+        @param `prefix` object name prefix, the objects are named `<prefix>/<path relative to directory>`
+        @param `delete` also delete the objects under `prefix` that have no matching local file
+        @param `dry_run` only report what would be transferred or deleted
+        @param `checksum` compare the MD5 of the files of the same size even when they are not newer than the objects
+        @param `concurrency` number of files transferred in parallel (`max_connections` by default)
+        @param `callback` function called with each `SyncAction` and its success as they complete
+        @return `SyncResult` with the counts of transferred, unchanged, deleted and failed files and the throughput
+        """
+        from .Sync import normalize_prefix, plan_upload, run_actions
+        container_name = self.get_container(container_name)
+        prefix = normalize_prefix(prefix)
+        actions, skipped = plan_upload(self, directory, prefix, container_name, delete, checksum)
+        result = run_actions(self, actions, container_name, concurrency, dry_run, callback)
+        result.skipped = skipped
+        return result
+
+    def sync_download(self,
+        directory: str,
+        prefix: str = None,
+        container_name: str = None,
+        delete: bool = False,
+        dry_run: bool = False,
+        checksum: bool = False,
+        concurrency: int = None,
+        callback = None,
+    ):
+        """
+        Download the objects under `prefix` that are missing or changed in the local `directory`. The modification time
+        of the downloaded files is set to the object one. See `sync_upload()` for the parameters.
+
+        @param `delete` also delete the local files that have no matching object
+        @return `SyncResult`
+        """
+        from .Sync import normalize_prefix, plan_download, run_actions
+        container_name = self.get_container(container_name)
+        prefix = normalize_prefix(prefix)
+        actions, skipped = plan_download(self, prefix, directory, container_name, delete, checksum)
+        result = run_actions(self, actions, container_name, concurrency, dry_run, callback)
+        result.skipped = skipped
+        return result
+
+    def object_open(self,
+        object_name: str,
+        container_name: str = None,
+        mode: str = 'rb',
+        block_size: int = READ_BLOCK_SIZE,
+        readahead: int = READ_AHEAD,
+        cache_blocks: int = READ_CACHE_BLOCKS,
+        buffer_size: int = io.DEFAULT_BUFFER_SIZE,
+        metadata: dict = {},
+        size: int = None,
+    ) -> io.BufferedReader|ObjectWriter|CompressingWriter:
+        """
+        Open an object as a binary file object.
+
+        In read mode (`'r'` or `'rb'`) the file is seekable and only the bytes that are read are downloaded, with ranged
+        requests (see `ObjectReader`): readers that seek around (ex: `zipfile`, Parquet) don't download the whole object.
+
+        In write mode (`'w'` or `'wb'`) the data is uploaded in parts as it is written, with bounded memory, and the object
+        is created when the file is closed (see `ObjectWriter`). Use it in a `with` block: the upload is aborted if the
+        block raises an exception.
+
+        Objects uploaded with a codec (see `compression`) are decoded as they are read, the file is then not seekable.
+
+        @param `block_size` (read) bytes fetched per random access (reads are rounded to whole blocks)
+        @param `readahead` (read) bytes fetched per request when reading sequentially
+        @param `cache_blocks` (read) number of blocks kept in memory
+        @param `buffer_size` (read) size of the buffer of the `io.BufferedReader` (its `raw` attribute is the `ObjectReader`)
+        @param `metadata` (write) metadata of the object
+        @param `size` (write) expected size of the object if known, to pick the part size (see `choose_part_size()`).
+            Otherwise the parts start at `multipart_part_size` bytes and grow as the object does (see `ObjectWriter`)
+        @raise FileNotFoundError in read mode if the object does not exist
+        """
+        if mode in ['w', 'wb']:
+            part_size = choose_part_size(size, self.multipart_part_size, self.multipart_max_parts)
+            if self._compresses(metadata):
+                metadata = {**metadata, CODEC_METADATA: self.compression}
+                if size is not None:
+                    metadata[SIZE_METADATA] = str(size) # Compared by sync_upload() and sync_download(), the object size is the compressed size
+                writer = ObjectWriter(self, object_name, self.get_container(container_name), metadata, part_size, grow_parts=size is None)
+                return self._compressing_writer(writer)
+            return ObjectWriter(self, object_name, self.get_container(container_name), metadata, part_size, grow_parts=size is None)
+        if mode not in ['r', 'rb']:
+            raise ValueError(f"invalid mode: '{mode}'")
+        container_name = self.get_container(container_name)
+        info = self.object_info(object_name, container_name=container_name)
+        if info is None:
+            raise FileNotFoundError(f'{container_name}/{object_name}')
+        raw = ObjectReader(self, object_name, container_name, info.bytes, block_size, readahead, cache_blocks)
+        codec = metadata_codec(info.metadata)
+        if codec is not None and self.decompress:
+            raw = DecompressingReader(io.BufferedReader(raw, buffer_size), Codec(codec))
+        return io.BufferedReader(raw, buffer_size)
+
+    def object_move(self, object_name: str, destination_name: str, container_name: str = None, destination_container: str = None, metadata: dict = None) -> bool:
+        """
+        Move (rename) an object: server-side copy (see `object_copy()`), then delete the source
+
+        @return true on success, false on failure (the source is only deleted once copied)
+        """
+        container_name = self.get_container(container_name)
+        destination_container = destination_container or container_name
+        if (container_name, object_name) == (destination_container, destination_name):
+            return metadata is None or self.object_replace_metadata(object_name, metadata, container_name=container_name)
+        return self.object_copy(object_name, destination_name, container_name, destination_container, metadata) \
+            and self.object_delete(object_name, container_name=container_name)
+
+    def object_copy_prefix(self,
+        prefix: str,
+        destination_prefix: str,
+        container_name: str = None,
+        destination_container: str = None,
+        move: bool = False,
+        concurrency: int = None,
+        callback = None,
+    ):
+        """
+        Copy (or move) all the objects whose name starts with `prefix` on the server side, in parallel: the object
+        data never goes through the client. Objects are named `<destination_prefix><name after prefix>`.
+        Objects are copied as the listing is streamed.
+
+        @param `destination_container` container of the copies (the source container by default)
+        @param `move` delete each source object once copied
+        @param `concurrency` number of objects copied in parallel (`max_connections` by default)
+        @param `callback` function called with each `SyncAction` (`destination` is the name of the copy) and its success as they complete
+        @return `SyncResult` with the counts of copied and failed objects
+        """
+        from .Sync import SyncResult, copy_actions, run_actions
+        container_name = self.get_container(container_name)
+        destination_container = destination_container or container_name
+        actions = copy_actions(self, prefix, destination_prefix, container_name, move)
+        if destination_container == container_name and destination_prefix.startswith(prefix):
+            if destination_prefix == prefix:
+                return SyncResult()
+            actions = list(actions) # The copies would show up in the listing
+        return run_actions(self, actions, container_name, concurrency, callback=callback, destination_container=destination_container)
+
+    def object_list(self,
+        fetch_metadata: bool = False,
+        prefix: str = None,
+        delimiter: str = None,
+        container_name: str = None,
+    ) -> list[ObjectInfo|SubdirInfo]:
+        """
+        List available objects in the specified container. If `container_name` is not specified,
+        lists objects in the active container (see `use_container()`).
+
+        If `delimiter` is set, it may return a mix of ObjectInfo and SubdirInfo that represent the objects
+        and subdir found following the prefix. The delimiter allows to browse as if it was a file system.
+
+        The whole listing is held in memory, use `object_iter()` to go through large containers.
+
+        @param `prefix` : if set, filter the results that start with the given prefix
+        @param `fetch_metadata` : if `True`, also fetch the objects metadata
+        """
+        container_name = self.get_container(container_name)
+        objects = list(self.object_iter(prefix=prefix, delimiter=delimiter, container_name=container_name))
+
+        if fetch_metadata:
+            obj_indices = [i for i, obj in enumerate(objects) if isinstance(obj, ObjectInfo)]
+            names = (objects[i].name for i in obj_indices)
+            futures = self._imap(lambda name: self.object_info(name, container_name=container_name), names)
+            for i, future in zip(obj_indices, futures):
+                try:
+                    info = future.result()
+                    if info is not None:
+                        objects[i] = info
+                except Exception:
+                    # If object_info fails, keep the listed object
+                    pass
+
+        return objects
+
+    def object_info_many(self, object_names: Iterable[str], container_name: str = None, max_concurrency: int = None) -> Iterator[ObjectInfo|None]:
+        """
+        Fetch the info of many objects with parallel `object_info()` calls on the client worker pool, at most
+        `max_concurrency` at a time (`max_connections` by default). `object_names` can be a lazy iterable,
+        names are only consumed as results are consumed.
+
+        @return An iterator of ObjectInfo (or None for the objects that do not exist), in the input order
+        """
+        container_name = self.get_container(container_name)
+        futures = self._imap(lambda name: self.object_info(name, container_name=container_name), object_names, max_concurrency)
+        for future in futures:
+            yield future.result()
+
+    @invalidates_info('object')
+    def multipart_upload(self, stream, object_name: str, metadata: dict={}, container_name: str = None, size: int = None) -> bool:
+        """
+        Upload a stream in parts, several parts being uploaded in parallel. Used by `object_upload()` for
+        objects larger than `multipart_threshold`, of unknown size or compressed (see `compression`), on backends
+        that implement the `_multipart_*()` functions.
+
+        The stream is copied to an `ObjectWriter` (see `object_open()`): at most `multipart_concurrency` parts are
+        in flight on the client worker pool, so memory use is bounded to about `multipart_part_size * multipart_concurrency`
+        bytes. The upload is aborted if any of the parts fails. Streams that fit in a single part are sent with one request.
+
+        @param `size` number of bytes to upload, if known (see `stream_size()`), used to pick the part size
+        @return true on success, false on failure
+        """
+        writer = self.object_open(object_name, container_name, 'wb', metadata=metadata, size=size)
+        try:
+            copy_stream(stream, writer)
+            writer.close()
+            return True
+        except Exception as e:
+            print(f'{type(self).__name__}: multipart_upload() aborted: {e}')
+            writer.abort()
+            return False
+
+    def object_delete_iter(self, object_names: Iterable[str], container_name: str = None) -> Iterator[tuple[str, bool]]:
+        """
+        Delete many objects using the batch delete API of the backend (`delete_batch_size` objects per request,
+        `delete_concurrency` requests in flight). `object_names` can be any iterable, including a generator
+        fed by `object_iter()`: names are consumed as the batches are sent.
+
+        @return An iterator of (object name, deleted) tuples, in the input order. Objects are deleted
+            as the iterator is consumed. Objects that do not exist are reported as deleted.
+        """
+        container_name = self.get_container(container_name)
+
+        def batches():
+            batch = []
+            for name in object_names:
+                batch.append(name)
+                if len(batch) == self.delete_batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+        def delete_batch(batch: list[str]) -> tuple[list[str], dict[str, bool]]:
+            try:
+                return batch, self._object_delete_batch(batch, container_name)
+            except Exception as e:
+                print(f'{type(self).__name__}: batch delete failed: {e}')
+                return batch, {}
+
+        for future in self._imap(delete_batch, batches(), self.delete_concurrency):
+            batch, results = future.result()
+            for name in batch:
+                yield name, results.get(name, False)
+
+    def object_delete_many(self, object_names: Iterable[str], container_name: str = None) -> dict[str, bool]:
+        """
+        Delete many objects (see `object_delete_iter()`)
+
+        @return A dict that tells for each object name if it was deleted
+        """
+        return dict(self.object_delete_iter(object_names, container_name))
+
+    def _object_delete_batch(self, object_names: list[str], container_name: str) -> dict[str, bool]:
+        """
+        Delete a batch of objects in a single request. Called concurrently from worker threads.
+        Backends that have a batch delete API override this, by default objects are deleted one by one.
+
+        @return A dict that tells for each object name if it was deleted (or does not exist)
+        """
+        return {name: self.object_delete(name, container_name) for name in object_names}
+
     def object_set_metadata(self, object_name: str, key: str, value: str, container_name: str = None) -> bool:
         """Sets a single metadata key-value pair on the specified object"""
         info = self.object_info(
@@ -126,7 +853,7 @@ class ObjectStorageClient:
 
     def object_delete_metadata(self, object_name: str, key: str, container_name: str = None) -> dict:
         """Delete a single metadata key-value for the specified object"""
-        info = self.object_info(object_name)
+        info = self.object_info(object_name, container_name=container_name)
         if info is None:
             return False
         if key in info.metadata:
@@ -191,43 +918,105 @@ class ObjectStorageClient:
         """
         raise NotImplementedError
 
-    def object_info(self, object_name: str, container_name: str = None) -> ObjectInfo|None:
+    def object_copy(self, object_name: str, destination_name: str, container_name: str = None, destination_container: str = None, metadata: dict = None) -> bool:
+        """
+        Copy an object on the server side, without transferring its data through the client
+
+        @param `destination_container` container of the copy (the source container by default)
+        @param `metadata` metadata of the copy (the metadata of the source is kept if None)
+        @return true on success, false on failure
+        """
+        raise NotImplementedError
+
+    def object_info(self, object_name: str, container_name: str = None, if_none_match: str = None, if_modified_since: float = None) -> ObjectInfo|None:
         """
         Return an objet's info (including metadata)
 
-        @return ObjectInfo or None if the object does not exist
+        @param `if_none_match` ETag of the version of the object already known (`ObjectInfo.hash`)
+        @param `if_modified_since` modification time of the version already known (epoch seconds, `ObjectInfo.last_modified`)
+        @return ObjectInfo or None if the object does not exist, or `NOT_MODIFIED` if the object still matches
+            `if_none_match` or was not modified since `if_modified_since`. Conditional requests bypass the metadata cache.
         """
         raise NotImplementedError
 
     def object_upload(self, stream, object_name: str, metadata: dict={}, container_name: str = None) -> bool:
         """
-        Upload a stream, optionally specifying some metadata to apply to the object
+        Upload a stream, optionally specifying some metadata to apply to the object. The bytes are hashed as
+        they are sent and the upload fails if they do not match the ETag returned by the backend (see `verify_integrity`).
+        If `compression` is set, the stream is compressed as it is uploaded and the codec is recorded in the metadata.
 
         @return true on success, false on failure
         """
         raise NotImplementedError
 
-    def object_download(self, object_name: str, stream, container_name: str = None) -> bool:
+    def object_download(self,
+        object_name: str,
+        stream,
+        container_name: str = None,
+        chunk_size: int = None,
+        byte_range: tuple[int, int] = None,
+        if_none_match: str = None,
+        if_modified_since: float = None,
+        if_match: str = None,
+    ) -> bool:
         """ 
-        Download an object and write to the output stream
+        Download an object and write to the output stream. The object is streamed (see `copy_stream()`),
+        it is never fully loaded in memory. Unless `byte_range` is set, the bytes are hashed as they are written
+        and the download fails if they do not match the ETag of the object (see `verify_integrity`). Objects uploaded
+        with a codec (see `compression`) are decoded unless `decompress` is false or `byte_range` is set.
+
+        @param `chunk_size` size of the download buffer in bytes (defaults to `download_chunk_size`)
+        @param `byte_range` (first, last) offsets of the bytes to download, inclusive (as in a HTTP Range header)
+        @param `if_none_match`, `if_modified_since` only download the object if it changed (see `object_info()`)
+        @param `if_match` only download the object if its ETag is this one (`ObjectInfo.hash`), fail if it changed
+        @return true on success, false on failure, or `NOT_MODIFIED` (nothing is written) if the object did not change
         """
         raise NotImplementedError
 
-    def object_list(self,
-        fetch_metadata: bool = False,
+    # Multipart upload (optional, see `multipart_upload()`)
+
+    def _multipart_create(self, object_name: str, metadata: dict, container_name: str):
+        """
+        Start a multipart upload
+
+        @return an object identifying the upload, passed to the other `_multipart_*()` functions (or None on failure)
+        """
+        raise NotImplementedError
+
+    def _multipart_upload_part(self, upload, part_number: int, data: bytes):
+        """
+        Upload one part (`part_number` starts at 1). Called concurrently from worker threads.
+
+        @return the part information needed by `_multipart_complete()`, raise an exception on failure
+        """
+        raise NotImplementedError
+
+    def _multipart_complete(self, upload, parts: list) -> bool:
+        """Assemble the uploaded `parts` (in order) into the final object"""
+        raise NotImplementedError
+
+    def _multipart_abort(self, upload):
+        """Cancel the upload and discard the parts uploaded so far"""
+        raise NotImplementedError
+
+    def object_iter(self,
         prefix: str = None,
         delimiter: str = None,
+        start_after: str = None,
+        page_size: int = None,
         container_name: str = None,
-    ) -> list[ObjectInfo|SubdirInfo]:
+    ) -> Iterator[ObjectInfo|SubdirInfo]:
         """
-        List available objects in the specified container. If `container_name` is not specified,
-        lists objects in the active container (see `use_container()`).
+        Iterate over the objects of the specified container. If `container_name` is not specified,
+        iterates over the objects of the active container (see `use_container()`).
 
-        If `delimiter` is set, it may return a mix of ObjectInfo and SubdirInfo that represent the objects
-        and subdir found following the prefix. The delimiter allows to browse as if it was a file system.
+        Pages are requested lazily from the backend as the iteration goes, so the whole container is
+        listed (not only the first page) while only one page is held in memory at a time.
 
-        @param `prefix` : if set, filter the results that start with the given prefix
-        @param `fetch_metadata` : if `True`, also fetch the objects metadata
+        @param `prefix` : if set, only yield the objects that start with the given prefix
+        @param `delimiter` : if set, also yield SubdirInfo for the subdirs found following the prefix
+        @param `start_after` : if set, only yield the objects whose name comes after this value
+        @param `page_size` : maximum number of entries requested per page (backend default if `None`)
         """
         raise NotImplementedError
 
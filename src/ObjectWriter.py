@@ -0,0 +1,139 @@
+
+import io
+from collections import deque
+
+PART_SIZE_DOUBLINGS = 10 # Number of times the part size doubles over `multipart_max_parts` parts when it grows
+
+class ObjectWriter(io.BufferedIOBase):
+    """
+    Write-only file object that uploads an object of unknown size (see `ObjectStorageClient.object_open()`).
+    Writes are buffered in parts of `part_size` bytes that are uploaded with the multipart functions of the
+    backend as they fill up, at most `multipart_concurrency` parts in flight: memory use is bounded whatever
+    the size of the object. The object is created atomically by `close()`. If the writer is not closed, or
+    the `with` block exits with an exception, the upload is aborted and no object is created.
+
+    Objects smaller than one part are sent with a single `object_upload()` request on `close()`.
+    """
+
+    def __init__(self, client, object_name: str, container_name: str, metadata: dict, part_size: int, grow_parts: bool = False):
+        """
+        @param `grow_parts` for objects of unknown size: double the part size every `multipart_max_parts / PART_SIZE_DOUBLINGS`
+            parts (up to `multipart_max_part_size`), so that the object can be much larger than `multipart_max_parts` parts of
+            `part_size` bytes. Fewer parts are then in flight as they grow, memory use stays about `multipart_concurrency`
+            parts of `part_size` bytes until a single part is larger than that.
+        """
+        self.client = client
+        self.name = object_name
+        self.container_name = container_name
+        self.metadata = metadata
+        self.part_size = part_size
+        self.grow_parts = grow_parts
+        self._in_flight_bytes = client.multipart_concurrency * part_size
+        self.bytes_written = 0
+        self._buffer = bytearray()
+        self._upload = None
+        self._part_number = 0
+        self._parts = []
+        self._in_flight = deque() # Futures of the parts being uploaded, in order
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        if self.closed:
+            raise ValueError('I/O operation on closed file')
+        view = memoryview(b).cast('B')
+        offset = 0
+        while offset < len(view):
+            n = min(len(view) - offset, self.part_size - len(self._buffer))
+            self._buffer += view[offset:offset + n]
+            offset += n
+            if len(self._buffer) == self.part_size:
+                try:
+                    self._send_part()
+                except OSError:
+                    raise
+                except Exception as e:
+                    raise self._error(e) from e
+        self.bytes_written += len(view)
+        return len(view)
+
+    def _send_part(self):
+        if self._upload is None:
+            self._upload = self.client._multipart_create(self.name, self.metadata, self.container_name)
+            if self._upload is None:
+                raise OSError(f'could not start the upload of {self.container_name}/{self.name}')
+        if self._part_number == self.client.multipart_max_parts:
+            raise OSError(f'{self.container_name}/{self.name} is larger than {self.client.multipart_max_parts} parts of {self.part_size} bytes')
+        max_in_flight = max(1, min(self.client.multipart_concurrency, self._in_flight_bytes // self.part_size))
+        while len(self._in_flight) >= max_in_flight: # Wait for a slot, so that memory use stays bounded
+            self._parts.append(self._in_flight.popleft().result())
+
+        self._part_number += 1
+        data, self._buffer = bytes(self._buffer), bytearray()
+        self._in_flight.append(self.client.executor.submit(self.client._multipart_upload_part, self._upload, self._part_number, data))
+        if self.grow_parts and self._part_number % max(1, self.client.multipart_max_parts // PART_SIZE_DOUBLINGS) == 0:
+            self.part_size = max(self.part_size, min(2 * self.part_size, self.client.multipart_max_part_size))
+
+    def close(self):
+        """Upload the last part and create the object (raise OSError on failure, including the failures of the parts, the upload is then aborted)"""
+        if self.closed:
+            return
+        try:
+            if self._upload is None and len(self._buffer) <= self.client.multipart_threshold:
+                if not self.client.object_upload(io.BytesIO(self._buffer), self.name, metadata=self.metadata, container_name=self.container_name):
+                    raise OSError(f'upload of {self.container_name}/{self.name} failed')
+            else:
+                if self._buffer or self._upload is None:
+                    self._send_part()
+                while self._in_flight:
+                    self._parts.append(self._in_flight.popleft().result())
+                if not self.client._multipart_complete(self._upload, self._parts):
+                    raise OSError(f'multipart upload of {self.container_name}/{self.name} failed')
+        except BaseException as e:
+            self.abort()
+            if isinstance(e, Exception) and not isinstance(e, OSError):
+                raise self._error(e) from e
+            raise
+        finally:
+            self._invalidate_info()
+        self._buffer = bytearray()
+        super().close()
+
+    def abort(self):
+        """Cancel the upload: the parts uploaded so far are discarded and no object is created"""
+        if self.closed:
+            return
+        for future in self._in_flight:
+            future.cancel()
+        for future in self._in_flight:
+            if not future.cancelled():
+                future.exception() # Wait for the parts being sent, so that they are aborted too
+        self._in_flight.clear()
+        if self._upload is not None:
+            self.client._multipart_abort(self._upload)
+        self._invalidate_info()
+        self._buffer = bytearray()
+        super().close()
+
+    def _error(self, error: Exception) -> OSError:
+        """The failures of the backend requests (ex: `ObjectStorageClientError`, botocore `ClientError`) are raised as OSError"""
+        return OSError(f'upload of {self.container_name}/{self.name} failed: {error}')
+
+    def _invalidate_info(self):
+        # The multipart functions do not drop the cached info of the object (see `invalidates_info()`)
+        if self.client.cache is not None:
+            self.client.cache.invalidate_object(self.container_name, self.name)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+    def __del__(self):
+        # Unlike regular files, a writer that was not closed does not create its object
+        try:
+            self.abort()
+        except Exception:
+            pass
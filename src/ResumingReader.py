@@ -0,0 +1,77 @@
+
+import io, time
+from typing import Callable
+
+class ResumingReader(io.RawIOBase):
+    """
+    Readable stream over the body of a download that resumes it when the connection fails while the body is read
+    (ex: connection reset): the rest of the download is requested from the first byte not received yet, following
+    the `retry_policy` of the client like the retries of the requests (number of attempts without progress, backoff,
+    retry budget). The bytes returned are those of a single, uninterrupted transfer.
+    """
+
+    def __init__(self, client, body, size: int|None, resume: Callable[[int], object], operation: str):
+        """
+        @param `body` stream of the reply body, of `size` bytes (None if unknown)
+        @param `resume` called with the number of bytes received so far, returns a stream of the remaining bytes,
+            or None if the download cannot be resumed (ex: the object was replaced in the meantime)
+        @param `operation` name of the request, reported to the client `instrumentation` with the resumptions
+        """
+        self.client = client
+        self.body = body
+        self.size = size
+        self.received = 0
+        self._resume = resume
+        self._operation = operation
+        self._attempt = 1
+        self._progress = False # Bytes were received since the last resumption
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while True:
+            try:
+                if hasattr(self.body, 'readinto'):
+                    n = self.body.readinto(b)
+                else:
+                    data = self.body.read(len(b))
+                    n = len(data)
+                    b[:n] = data
+            except Exception as e:
+                if not self._resumed(e):
+                    raise
+                continue
+            self.received += n
+            self._progress = self._progress or n > 0
+            return n
+
+    def _resumed(self, error: Exception) -> bool:
+        """Request the rest of the download after `error`, return false if it should not be resumed"""
+        failure, _ = self.client._classify_failure(None, error)
+        policy = self.client.retry_policy
+        if failure is None or policy is None:
+            return False
+        if self._progress: # Only failures in a row count as attempts
+            self._attempt, self._progress = 1, False
+        if (self.size is not None and self.received >= self.size) or self._attempt >= policy.max_attempts or not policy.acquire():
+            return False
+        delay = policy.backoff(self._attempt)
+        if self.client.instrumentation is not None:
+            self.client.instrumentation.record_retry(self._operation, failure, delay)
+        time.sleep(delay)
+        self._attempt += 1
+        try:
+            self.body.close()
+        except Exception:
+            pass
+        body = self._resume(self.received)
+        if body is None:
+            return False
+        self.body = body
+        return True
+
+    def close(self):
+        if not self.closed:
+            self.body.close()
+        super().close()
@@ -0,0 +1,72 @@
+
+import random, threading, time
+from email.utils import parsedate_to_datetime
+
+class RetryPolicy:
+    """
+    Retry policy of the requests of a client (see `ObjectStorageClient._call()`).
+
+    Transient failures are retried up to `max_attempts` times in total, after a capped exponential backoff with
+    full jitter, or after the delay requested by the server with a `Retry-After` header. Retries are limited by a
+    budget shared by all the requests of the client: each retry spends a token and each successful request gives
+    `budget_refill` token back, so that a client stops retrying (instead of multiplying the load) when the backend
+    is down for good.
+    """
+
+    def __init__(self,
+        max_attempts: int = 4,
+        base_delay: float = 0.1,
+        max_delay: float = 20,
+        max_retry_after: float = 60,
+        budget: float = 50,
+        budget_refill: float = 0.1,
+    ):
+        """
+        @param `max_attempts` number of attempts of a request (1 to disable retries)
+        @param `base_delay` backoff delay of the first retry (seconds), doubled after each retry
+        @param `max_delay` maximum backoff delay (seconds)
+        @param `max_retry_after` requests are not retried when the server asks to wait longer than that (seconds)
+        @param `budget` maximum number of retry tokens
+        @param `budget_refill` tokens given back by each successful request
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.budget = budget
+        self.budget_refill = budget_refill
+        self._tokens = budget
+        self._lock = threading.Lock()
+
+    def backoff(self, attempt: int, retry_after: float|None = None) -> float:
+        """Return the delay (seconds) to wait before sending attempt `attempt + 1`"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def acquire(self) -> bool:
+        """Spend a retry token, return False if the budget is exhausted"""
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def on_success(self):
+        with self._lock:
+            self._tokens = min(self.budget, self._tokens + self.budget_refill)
+
+
+def parse_retry_after(value: str|None) -> float|None:
+    """Convert a `Retry-After` header (seconds or HTTP date) to a number of seconds"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
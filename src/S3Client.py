@@ -5,15 +5,68 @@
 #   (error handling) https://boto3.amazonaws.com/v1/documentation/api/latest/guide/error-handling.html#parsing-error-responses-and-catching-exceptions-from-aws-services
 #
 
-import boto3, botocore
+import boto3, botocore, itertools
+from datetime import datetime, timezone
 from botocore.exceptions import ClientError
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from .ObjectStorageClient import *
+from .MetadataCache import cached_info, invalidates_info, not_found
+from .ResumingReader import ResumingReader
+from .ETagHasher import ETagHasher, HashingReader, HashingWriter, is_md5_etag, md5
+from .Codec import metadata_codec
+from .RetryPolicy import RetryPolicy, parse_retry_after
+from .AdaptiveLimiter import AdaptiveLimiter
+
+def _object_info_from_head(object_name: str, res: dict) -> ObjectInfo:
+    """Build an ObjectInfo from a head_object (or get_object) reply"""
+    return ObjectInfo(
+        name=object_name,
+        bytes=res.get('ContentLength'),
+        content_type=res.get('ContentType'),
+        hash=res.get('ETag').replace('"',''),
+        metadata=res.get('Metadata'),
+        last_modified=res.get('LastModified').timestamp()
+    )
+
+def _object_info_from_listing(o: dict) -> ObjectInfo:
+    """Build an ObjectInfo from an entry of the `Contents` of a list_objects_v2 reply"""
+    return ObjectInfo(
+        name=o['Key'],
+        bytes=o['Size'],
+        hash=o['ETag'].replace('"',''),
+        content_type=None,
+        metadata=None,
+        last_modified=o['LastModified'].timestamp()
+    )
+
+def _conditions(if_none_match: str|None, if_modified_since: float|None, if_match: str|None = None) -> dict:
+    """Arguments of a conditional head_object / get_object request"""
+    args = {}
+    if if_match is not None:
+        args['IfMatch'] = quote_etag(if_match)
+    if if_none_match is not None:
+        args['IfNoneMatch'] = quote_etag(if_none_match)
+    if if_modified_since is not None:
+        args['IfModifiedSince'] = datetime.fromtimestamp(if_modified_since, timezone.utc)
+    return args
+
+def _etag_hashes_data(res: dict) -> bool:
+    """The ETag of objects encrypted with KMS or a customer key is not the MD5 of their bytes"""
+    return not res.get('ServerSideEncryption', '').startswith('aws:kms') and 'SSECustomerAlgorithm' not in res
+
+COPY_MAX_SIZE = 5 * 1024 ** 3 # Largest object that can be copied with a single CopyObject request (5 GiB)
+
+# Errors raised when the request could not be sent (the others may happen after the request was processed)
+_CONNECT_ERRORS = (botocore.exceptions.EndpointConnectionError, botocore.exceptions.ConnectTimeoutError)
+_CONNECTION_ERRORS = (botocore.exceptions.ConnectionError, botocore.exceptions.HTTPClientError, botocore.exceptions.IncompleteReadError)
 
 class S3Client(ObjectStorageClient):
-    
-    def __init__(self, location, endpoint_url=None, verify_ssl=None, aws_access_key_id=None, aws_secret_access_key=None):
+
+    request_body_argument = 'Body'
+    copy_max_size = COPY_MAX_SIZE # Objects larger than this are copied in parts (see object_copy())
+    checksum_algorithm: str|None = None # Additional checksum of the uploads, verified by S3 ('CRC32', 'CRC32C', 'SHA1' or 'SHA256'), and of the downloads
+
+    def __init__(self, location, endpoint_url=None, verify_ssl=None, aws_access_key_id=None, aws_secret_access_key=None, max_connections: int = MAX_CONNECTIONS):
         """
         Initialize an S3 client
 
@@ -22,7 +75,10 @@ class S3Client(ObjectStorageClient):
         @param `verify_ssl` Set to `False` to ignore SSL verification
         @param `aws_access_key_id` AWS access key ID
         @param `aws_secret_access_key` AWS secret access key
+        @param `max_connections` Size of the HTTP connection pool, and number of requests sent in parallel by the client
         """
+        super().__init__()
+        self.max_connections = max_connections
         self.client = boto3.client(
             service_name='s3',
             endpoint_url=endpoint_url,
@@ -31,16 +87,48 @@ class S3Client(ObjectStorageClient):
             aws_secret_access_key=aws_secret_access_key,
             config=botocore.config.Config(
                 request_checksum_calculation="when_required",
-                response_checksum_validation="when_required"
+                response_checksum_validation="when_required",
+                max_pool_connections=max_connections,
+                retries={'total_max_attempts': 1} # Retries are handled by the client retry policy (see _call())
             ),
             verify=verify_ssl
         )
 
         self.location = location
         self.endpoint_url = endpoint_url
-    
+        self.retry_policy = RetryPolicy()
+        self.limiter = AdaptiveLimiter(max_connections)
+
+    def _describe_request(self, function, args: tuple, kwargs: dict, result, error: Exception|None) -> tuple[str, int|str|None, int]:
+        if isinstance(error, ClientError):
+            status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+        elif error is not None:
+            status = type(error).__name__
+        else:
+            status = result.get('ResponseMetadata', {}).get('HTTPStatusCode')
+        received = result.get('ContentLength', 0) if result is not None and 'Body' in result else 0
+        return function.__name__, status, received
+
+    def _request_container(self, args: tuple, kwargs: dict) -> str|None:
+        return kwargs.get('Bucket')
+
+    def _classify_failure(self, result, error: Exception|None) -> tuple[str|None, float|None]:
+        if isinstance(error, ClientError):
+            metadata = error.response.get('ResponseMetadata', {})
+            retry_after = parse_retry_after(metadata.get('HTTPHeaders', {}).get('retry-after'))
+            if metadata.get('HTTPStatusCode') in [429, 503] or error.response.get('Error', {}).get('Code') in ['SlowDown', 'Throttling', 'RequestLimitExceeded']:
+                return 'rejected', retry_after
+            if metadata.get('HTTPStatusCode') in [500, 502, 504] or error.response.get('Error', {}).get('Code') == 'InternalError': # Also sent with a 200 by copy_object
+                return 'failed', retry_after
+        elif isinstance(error, _CONNECT_ERRORS):
+            return 'rejected', None
+        elif isinstance(error, _CONNECTION_ERRORS):
+            return 'failed', None
+        return None, None
+
     # Container related actions
     
+    @invalidates_info('container')
     def container_create(self, container_name: str) -> bool:
         """
         Create a new container. This request might take few seconds to complete.
@@ -50,34 +138,37 @@ class S3Client(ObjectStorageClient):
         """
         try:
             if self.location != 'auto':
-                res = self.client.create_bucket(
+                res = self._call(self.client.create_bucket,
                     Bucket=container_name,
-                    CreateBucketConfiguration={"LocationConstraint": self.location}
+                    CreateBucketConfiguration={"LocationConstraint": self.location},
+                    idempotent=False # A retry would fail with BucketAlreadyOwnedByYou
                 )
             else:
-                res = self.client.create_bucket(Bucket=container_name)
+                res = self._call(self.client.create_bucket, Bucket=container_name, idempotent=False)
             return res.get('ResponseMetadata', {}).get('HTTPStatusCode') == 200
         except:
             return False
 
     def container_list(self, prefix: str = None) -> list[ContainerInfo]:
-        buckets = self.client.list_buckets().get('Buckets', [])
+        buckets = self._call(self.client.list_buckets).get('Buckets', [])
         return [ ContainerInfo(b['Name'], None, None) for b in buckets if prefix is None or b['Name'].startswith(prefix) ]
 
+    @invalidates_info('container')
     def container_delete(self, container_name: str, force: bool = False) -> bool:
         if force:
             # First delete all objects in the container, otherwise the delete request will fail
-            objects = self.object_list(container_name=container_name)
-            for o in objects:
-                self.object_delete(o.name, container_name)
+            names = (o.name for o in self.object_iter(container_name=container_name))
+            for _ in self.object_delete_iter(names, container_name):
+                pass
 
         try:
-            res = self.client.delete_bucket(Bucket=container_name)
+            res = self._call(self.client.delete_bucket, Bucket=container_name)
             self.container_name = None
             return True
         except:
             return False
 
+    @cached_info('container')
     def container_info(self, container_name: str) -> ContainerInfo:
         """
         Fetch container information
@@ -85,47 +176,45 @@ class S3Client(ObjectStorageClient):
         @return ContainerInfo or None if the container does not exist
         """
         try:
-            result = self.client.head_bucket(Bucket=container_name)
+            result = self._call(self.client.head_bucket, Bucket=container_name)
         except botocore.exceptions.ClientError as e:
             result = e.response
 
         if result.get('ResponseMetadata', {}).get('HTTPStatusCode') == 200:
             return ContainerInfo(container_name, None, None)
         elif result.get('ResponseMetadata', {}).get('HTTPStatusCode') == 404:
-            return None
+            return not_found()
         else:
             print('S3Client: unknown error code:', result.get('ResponseMetadata', {}).get('HTTPStatusCode'))
             return None
 
     # Object related actions
 
-    def object_info(self, object_name: str, container_name: str = None) -> ObjectInfo|None:
+    @cached_info('object')
+    def object_info(self, object_name: str, container_name: str = None, if_none_match: str = None, if_modified_since: float = None) -> ObjectInfo|None:
         try:
-            res = self.client.head_object(Bucket=self.get_container(container_name), Key=object_name)
+            res = self._call(self.client.head_object, Bucket=self.get_container(container_name), Key=object_name,
+                **_conditions(if_none_match, if_modified_since))
         except botocore.exceptions.ClientError as e:
             res = e.response
         
         if res.get('ResponseMetadata', {}).get('HTTPStatusCode') == 200:
-            return ObjectInfo(
-                name=object_name,
-                bytes=res.get('ContentLength'),
-                content_type=res.get('ContentType'),
-                hash=res.get('ETag').replace('"',''),
-                metadata=res.get('Metadata'),
-                last_modified=res.get('LastModified').timestamp()
-            )
+            return _object_info_from_head(object_name, res)
+        elif res.get('ResponseMetadata', {}).get('HTTPStatusCode') in [304, 412]:
+            return NOT_MODIFIED
         elif res.get('ResponseMetadata', {}).get('HTTPStatusCode') == 404:
-            return None
+            return not_found()
         else:
             print(f"S3Client: object_info() status code: {res.get('ResponseMetadata', {}).get('HTTPStatusCode')}")
             return None
 
+    @invalidates_info('object')
     def object_replace_metadata(self, object_name: str, metadata: dict = {}, container_name: str = None) -> bool:
         try:
-            res = self.client.copy_object(
+            res = self._call(self.client.copy_object,
                 Bucket=self.get_container(container_name),
                 Key=object_name,
-                CopySource={'Bucket':self.container_name, 'Key': object_name},
+                CopySource={'Bucket': self.get_container(container_name), 'Key': object_name},
                 Metadata=metadata,
                 MetadataDirective='REPLACE'
             )
@@ -134,82 +223,252 @@ class S3Client(ObjectStorageClient):
 
         return res.get('ResponseMetadata', {}).get('HTTPStatusCode') == 200
 
+    @invalidates_info('destination')
+    def object_copy(self, object_name: str, destination_name: str, container_name: str = None, destination_container: str = None, metadata: dict = None) -> bool:
+        """
+        Copy an object on the server side with CopyObject. Objects larger than `copy_max_size` (5 GiB, the limit
+        of CopyObject) are copied with a multipart upload whose parts are copied in parallel with UploadPartCopy.
+        """
+        container_name = self.get_container(container_name)
+        destination_container = destination_container or container_name
+        source = {'Bucket': container_name, 'Key': object_name}
+
+        info = None
+        if metadata is not None:
+            # Replacing the metadata also replaces the content type, which must be sent again
+            info = self.object_info(object_name, container_name=container_name)
+            if info is None:
+                print(f"S3Client: object_copy() source not found: {container_name}/{object_name}")
+                return False
+        if info is None or info.bytes <= self.copy_max_size:
+            args = {'Bucket': destination_container, 'Key': destination_name, 'CopySource': source}
+            if metadata is not None:
+                args.update(Metadata=metadata, MetadataDirective='REPLACE', ContentType=info.content_type)
+            try:
+                res = self._call(self.client.copy_object, **args)
+                return res.get('ResponseMetadata', {}).get('HTTPStatusCode') == 200
+            except botocore.exceptions.ClientError as e:
+                # Sources larger than 5 GiB are rejected with InvalidRequest
+                if info is not None or e.response.get('Error', {}).get('Code') != 'InvalidRequest':
+                    print(f"S3Client: object_copy() status code: {e.response.get('ResponseMetadata', {}).get('HTTPStatusCode')} {e.response.get('Error', {}).get('Message')}")
+                    return False
+            info = self.object_info(object_name, container_name=container_name)
+            if info is None or info.bytes <= self.copy_max_size:
+                return False
+
+        return self._multipart_copy(source, info, destination_name, destination_container, metadata)
+
+    def _multipart_copy(self, source: dict, info: ObjectInfo, destination_name: str, destination_container: str, metadata: dict|None) -> bool:
+        try:
+            res = self._call(self.client.create_multipart_upload,
+                Bucket=destination_container,
+                Key=destination_name,
+                Metadata=info.metadata if metadata is None else metadata,
+                ContentType=info.content_type,
+                idempotent=False
+            )
+        except botocore.exceptions.ClientError as e:
+            print(f"S3Client: create_multipart_upload() status code: {e.response.get('ResponseMetadata', {}).get('HTTPStatusCode')}")
+            return False
+        upload = {'Bucket': destination_container, 'Key': destination_name, 'UploadId': res['UploadId']}
+
+        part_size = choose_part_size(info.bytes, self.multipart_part_size, self.multipart_max_parts)
+        ranges = [(first, min(first + part_size, info.bytes) - 1) for first in range(0, info.bytes, part_size)]
+
+        def copy_part(part: tuple[int, tuple[int, int]]) -> dict:
+            part_number, (first, last) = part
+            res = self._call(self.client.upload_part_copy, CopySource=source, CopySourceRange=f'bytes={first}-{last}', PartNumber=part_number, **upload)
+            return {'PartNumber': part_number, 'ETag': res['CopyPartResult']['ETag']}
+
+        try:
+            futures = self._imap(copy_part, enumerate(ranges, 1), self.multipart_concurrency)
+            parts = [f.result() for f in futures]
+            if not self._multipart_complete(upload, parts):
+                raise ObjectStorageClientError(f"Multipart copy of {source['Key']} failed")
+            return True
+        except Exception as e:
+            print(f'S3Client: object_copy() aborted: {e}')
+            self._multipart_abort(upload)
+            return False
+
+    @invalidates_info('object')
     def object_upload(self, stream, object_name: str, metadata: dict={}, container_name: str = None) -> bool:
-        """Upload a stream, optionally specifying some metadata to apply to the object"""
+        """
+        Upload a stream, optionally specifying some metadata to apply to the object. Streams larger than
+        `multipart_threshold`, of unknown size (ex: stdin) or compressed are sent with a parallel multipart upload.
+        """
+
+        size = stream_size(stream)
+        if size is None or size > self.multipart_threshold or self._compresses(metadata):
+            return self.multipart_upload(stream, object_name, metadata, container_name, size)
 
-        res = self.client.put_object(
-            Body=stream,
+        body = HashingReader(stream) if self.verify_integrity else stream
+        res = self._call(self.client.put_object,
+            Body=body,
             Bucket=self.get_container(container_name),
             Key=object_name,
-            Metadata=metadata
+            Metadata=metadata,
+            **self._checksum_args()
         )
 
         if res.get('ResponseMetadata', {}).get('HTTPStatusCode') == 200:
+            if self.verify_integrity and _etag_hashes_data(res):
+                return self._check_integrity(body.hasher, res.get('ETag'), f'object_upload() of {object_name}')
             return True
         else:
             print(f"S3Client: object_upload() status code: {res.get('ResponseMetadata', {}).get('HTTPStatusCode')}")
             return False
 
 
-    def object_download(self, object_name: str, stream, container_name: str = None) -> bool:
+    def _checksum_args(self) -> dict:
+        """
+        Arguments of the upload requests adding a `checksum_algorithm` checksum: botocore computes it while the body is
+        sent (in a trailer over HTTPS) and S3 rejects the request if it does not match. 'CRC32C' needs `awscrt`.
+        """
+        return {'ChecksumAlgorithm': self.checksum_algorithm} if self.checksum_algorithm else {}
+
+    def _multipart_create(self, object_name: str, metadata: dict, container_name: str):
         try:
-            res = self.client.get_object(
-                Bucket=self.get_container(container_name),
-                Key=object_name,
-            )
+            # Not idempotent: a retry after a lost reply would leave an upload that is never completed
+            res = self._call(self.client.create_multipart_upload, Bucket=container_name, Key=object_name, Metadata=metadata, idempotent=False, **self._checksum_args())
+        except botocore.exceptions.ClientError as e:
+            print(f"S3Client: create_multipart_upload() status code: {e.response.get('ResponseMetadata', {}).get('HTTPStatusCode')}")
+            return None
+        return {'Bucket': container_name, 'Key': object_name, 'UploadId': res['UploadId']}
+
+    def _multipart_upload_part(self, upload, part_number: int, data: bytes):
+        res = self._call(self.client.upload_part, Body=data, PartNumber=part_number, **upload, **self._checksum_args())
+        if _etag_hashes_data(res):
+            self._check_part(data, res['ETag'], f"Part {part_number} of {upload['Key']}")
+        part = {'PartNumber': part_number, 'ETag': res['ETag']}
+        if self.checksum_algorithm:
+            part[f'Checksum{self.checksum_algorithm}'] = res[f'Checksum{self.checksum_algorithm}'] # Needed to complete the upload
+        return part
+
+    def _multipart_complete(self, upload, parts: list) -> bool:
+        # Not idempotent: a retry after a lost reply would fail with NoSuchUpload
+        res = self._call(self.client.complete_multipart_upload, MultipartUpload={'Parts': parts}, **upload, idempotent=False)
+        if res.get('ResponseMetadata', {}).get('HTTPStatusCode') != 200:
+            return False
+        if self.verify_integrity and all(is_md5_etag(p['ETag']) for p in parts):
+            # The ETag of the object is the MD5 of the part MD5s: check that the parts were assembled as sent
+            digests = b''.join(bytes.fromhex(p['ETag'].strip('"')) for p in parts)
+            expected = f'{md5(digests).hexdigest()}-{len(parts)}'
+            if res.get('ETag', '').strip('"') != expected:
+                print(f"S3Client: complete_multipart_upload() of {upload['Key']} integrity check failed: ETag {res.get('ETag')}, {expected} expected")
+                return False
+        return True
+
+    def _multipart_abort(self, upload):
+        try:
+            self._call(self.client.abort_multipart_upload, **upload)
+        except botocore.exceptions.ClientError:
+            pass # Incomplete uploads can also be cleaned up with a bucket lifecycle rule
+
+    def object_download(self,
+        object_name: str,
+        stream,
+        container_name: str = None,
+        chunk_size: int = None,
+        byte_range: tuple[int, int] = None,
+        if_none_match: str = None,
+        if_modified_since: float = None,
+        if_match: str = None,
+    ) -> bool:
+        args = {"Bucket": self.get_container(container_name), "Key": object_name, **_conditions(if_none_match, if_modified_since, if_match)}
+        if byte_range: args['Range'] = f"bytes={byte_range[0]}-{byte_range[1]}"
+        if self.checksum_algorithm: args['ChecksumMode'] = 'ENABLED' # botocore verifies the checksum stored with the object
+
+        try:
+            res = self._call(self.client.get_object, **args)
         except botocore.exceptions.ClientError as e:
             res = e.response
 
-        if res.get('ResponseMetadata', {}).get('HTTPStatusCode') == 200:
-            stream.write(res['Body'].read())
-            return True
-        elif res.get('ResponseMetadata', {}).get('HTTPStatusCode') == 404:
+        if res.get('ResponseMetadata', {}).get('HTTPStatusCode') == (206 if byte_range else 200):
+            hasher = self._download_hasher(res, args['Bucket'], object_name) if self.verify_integrity and not byte_range else None
+            out = self._decoding(stream, metadata_codec(res.get('Metadata')) if not byte_range else None)
+            first, last = byte_range or (0, None)
+            resume = lambda received: self._resume_download(args, res.get('ETag'), first + received, last)
+            with ResumingReader(self, res['Body'], res.get('ContentLength'), resume, 'get_object') as body:
+                copy_stream(body, HashingWriter(out, hasher) if hasher else out, chunk_size or self.download_chunk_size)
+            return self._check_integrity(hasher, res.get('ETag'), f'object_download() of {object_name}') \
+                and self._finish_decoding(out, f'object_download() of {object_name}')
+        elif res.get('ResponseMetadata', {}).get('HTTPStatusCode') in [304, 412] and if_match is None:
+            return NOT_MODIFIED
+        elif res.get('ResponseMetadata', {}).get('HTTPStatusCode') in [404, 412]:
             return False
         else:
             print(f"S3Client: object_download() status code: {res.get('ResponseMetadata', {}).get('HTTPStatusCode')}")
             return False
 
-    def object_list(self,
-        fetch_metadata: bool = False,
+    def _resume_download(self, args: dict, etag: str|None, first: int, last: int|None):
+        """Return the body of the bytes `first` to `last` of the object downloaded with `args`, or None if it changed"""
+        if not etag:
+            return None
+        args = {k: v for k, v in args.items() if k not in ['IfMatch', 'IfNoneMatch', 'IfModifiedSince']}
+        args['Range'] = f"bytes={first}-{'' if last is None else last}"
+        try:
+            return self._call(self.client.get_object, IfMatch=etag, **args)['Body']
+        except botocore.exceptions.ClientError as e:
+            print(f"S3Client: cannot resume the download of {args['Key']}: {e.response.get('ResponseMetadata', {}).get('HTTPStatusCode')}")
+            return None
+
+    def _download_hasher(self, res: dict, container_name: str, object_name: str) -> ETagHasher|None:
+        """Return the hasher matching the ETag of a get_object reply, or None if it cannot be checked"""
+        etag = res.get('ETag', '').strip('"')
+        if not _etag_hashes_data(res):
+            return None
+        if is_md5_etag(etag):
+            return ETagHasher()
+        digest, _, count = etag.partition('-')
+        if not is_md5_etag(digest) or not count.isdigit():
+            return None
+        # Multipart upload: the size of the first part gives the others, assuming equal parts (the last one excepted)
+        # as written by this client and the AWS tools
+        try:
+            head = self._call(self.client.head_object, Bucket=container_name, Key=object_name, PartNumber=1)
+        except botocore.exceptions.ClientError:
+            return None
+        part_size = head.get('ContentLength')
+        if head.get('LastModified') != res.get('LastModified') or head.get('PartsCount', int(count)) != int(count): # Replaced in the meantime
+            return None
+        if not part_size or -(-res['ContentLength'] // part_size) != int(count):
+            return None
+        return ETagHasher(itertools.repeat(part_size))
+
+    def object_iter(self,
         prefix: str = None,
         delimiter: str = None,
+        start_after: str = None,
+        page_size: int = None,
         container_name: str = None,
-    ) -> list[ObjectInfo|SubdirInfo]:
+    ) -> Iterator[ObjectInfo|SubdirInfo]:
 
         args = {"Bucket": self.get_container(container_name)}
         if prefix: args['Prefix'] = prefix
         if delimiter: args['Delimiter'] = delimiter
+        if start_after: args['StartAfter'] = start_after
+        if page_size: args['MaxKeys'] = page_size
 
-        res = self.client.list_objects_v2(**args)
+        while True:
+            res = self._call(self.client.list_objects_v2, **args)
 
-        if res.get('ResponseMetadata', {}).get('HTTPStatusCode') == 200:
-            objects =  [ObjectInfo(
-                            name=o['Key'],
-                            bytes=o['Size'],
-                            hash=o['ETag'],
-                            content_type=None,
-                            metadata=None,
-                            last_modified=o['LastModified'].timestamp()
-                        ) for o in res.get('Contents', [])]
-            subdirs =  [SubdirInfo(o['Prefix']) for o in res.get('CommonPrefixes', [])]
-            if fetch_metadata and objects:
-                with ThreadPoolExecutor() as executor:
-                    future_to_index = {executor.submit(self.object_info, obj.name): i for i, obj in enumerate(objects)}
-                    for future in as_completed(future_to_index):
-                        i = future_to_index[future]
-                        try:
-                            objects[i] = future.result()
-                        except Exception as exc:
-                            # If object_info fails, keep the original object
-                            pass
-            objects.extend(subdirs)
-            return objects
-        else:
-            return []
+            if res.get('ResponseMetadata', {}).get('HTTPStatusCode') != 200:
+                return
+
+            for o in res.get('Contents', []):
+                yield _object_info_from_listing(o)
+            for o in res.get('CommonPrefixes', []):
+                yield SubdirInfo(o['Prefix'])
 
+            if not res.get('IsTruncated'):
+                return
+            args['ContinuationToken'] = res['NextContinuationToken']
+
+    @invalidates_info('object')
     def object_delete(self, object_name: str, container_name: str = None) -> bool:
         try:
-            res = self.client.delete_object(
+            res = self._call(self.client.delete_object,
                 Bucket=self.get_container(container_name),
                 Key=object_name,
             )
@@ -223,6 +482,18 @@ class S3Client(ObjectStorageClient):
             print(f"S3Client: object_delete() status code: {status}")
             return False
 
+    @invalidates_info('objects')
+    def _object_delete_batch(self, object_names: list[str], container_name: str) -> dict[str, bool]:
+        res = self._call(self.client.delete_objects,
+            Bucket=container_name,
+            Delete={'Objects': [{'Key': name} for name in object_names], 'Quiet': True},
+        )
+        # In quiet mode only the keys that could not be deleted are returned
+        results = {name: True for name in object_names}
+        for e in res.get('Errors', []):
+            results[e['Key']] = False
+        return results
+
     def object_generate_download_url(self, object_name: str, container_name: str, expires_in_seconds: int = None) -> str|None :
         try:
             return self.client.generate_presigned_url(
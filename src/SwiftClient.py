@@ -4,43 +4,23 @@
 #   API Reference: https://docs.openstack.org/api-ref/object-store/
 #
 
-import os, requests
+import os, json, time, threading, weakref, requests, urllib3
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import quote, unquote
 
 from .ObjectStorageClient import *
+from .MetadataCache import cached_info, invalidates_info, not_found
+from .ResumingReader import ResumingReader
+from .ETagHasher import ETagHasher, HashingReader, HashingWriter, is_md5_etag, md5
+from .Codec import CODEC_METADATA
+from .TokenCache import TokenCache, DEFAULT_TOKEN_CACHE_PATH, parse_expiry
+from .RetryPolicy import RetryPolicy, parse_retry_after
+from .AdaptiveLimiter import AdaptiveLimiter
 
-class SwiftClient(ObjectStorageClient):
-
-    def __init__(self, region: str, credentials: dict = {}) -> None:
-        self.OBJECT_STORAGE_URL = None
-        self.region = region
-        self.session = requests.Session()
-        self.session.hooks = {'response': [self._response_hook]} # Set a response hook to handle authentication errors
-        self.authenticate(credentials)
-
-    # This hook is called before each response is returned from
-    # the request execution. We use it to handle authentication
-    # failure. If there is an auth failure, we re-authenticate
-    # and retry the request before raising an exception if we
-    # still have a failure. This allows to renew an expired
-    # token transparently without raising an error.
-    def _response_hook(self, resp: requests.Response, *args, **kwargs):
-        """Called before returning the response"""
-        auth_status_codes = [401, 403]
-        if resp.status_code in auth_status_codes:
-            self.session.close()
-            self.authenticate() # Renew token
-            req = resp.request.copy() # Copy the original request
-            req.headers['X-Auth-Token'] = self.OS_AUTH_TOKEN # Update the auth token
-            req.hooks = None # To avoid infinite retry, we clear the hooks
-            res : requests.Response = requests.Session().send(request=req)
-            if res.status_code in auth_status_codes:
-                raise AuthorizationError
-            else:
-                return res
-        return resp
+class SwiftCredentials:
+    """OpenStack credentials and Keystone authentication, shared by the Swift clients"""
 
+    token_refresh_margin = 300 # Renew the token in the background that many seconds before it expires
 
     def read_credentials_from_env(self, credentials: dict):
         """
@@ -67,13 +47,11 @@ class SwiftClient(ObjectStorageClient):
             print("The environment does not seem to contain OpenStack credentials or token")
             raise AuthorizationError
 
-    def authenticate(self, credentials : dict = {}) -> bool:
-        """Retreives a usable authentication token"""
-        self.read_credentials_from_env(credentials)
-
+    def _auth_request(self) -> tuple[str, dict]:
+        """Return the Keystone url and body of the token request"""
         # See https://docs.openstack.org/api-ref/identity/v3/#authentication-and-token-management
         auth_url = self.OS_AUTH_URL + ('' if self.OS_AUTH_URL.endswith('/') else '/') + "auth/tokens"
-        r = requests.post(auth_url, json={
+        return auth_url, {
             "auth": {
                 "identity": {
                 "methods": ["password"],
@@ -92,32 +70,291 @@ class SwiftClient(ObjectStorageClient):
                     }
                 }
             }
+        }
+
+    def _read_auth_reply(self, token: str, body: dict):
+        """Retreive the auth token, its expiry date and the storage URL from the Keystone reply"""
+        self.OS_AUTH_TOKEN = token
+        self.token_expires_at = parse_expiry(body.get('token', {}).get('expires_at'))
+
+        self.OBJECT_STORAGE_URL = None
+        catalog = body.get('token', {}).get('catalog', [])
+        endpoints = next((e['endpoints'] for e in catalog if e['type'] == 'object-store'), None)
+        if endpoints is not None:
+            self.OBJECT_STORAGE_URL = next((e['url'] for e in endpoints if e['interface'] == 'public' and e['region'] == self.region), None)
+
+        if self.OBJECT_STORAGE_URL is None:
+            raise ObjectStorageClientError(f"Storage URL not found in server reply for region '{self.region}'")
+
+    def _token_refresh_delay(self) -> float|None:
+        """Number of seconds before the current token should be renewed, None if its expiry date is unknown"""
+        if self.token_expires_at is None:
+            return None
+        lifetime = self.token_expires_at - time.time()
+        return max(lifetime - min(self.token_refresh_margin, lifetime / 2), 0) # Short-lived tokens are renewed half way
+
+    #
+    #   Token cache: a token and its storage URL are saved on disk (see `TokenCache`) so that other
+    #   clients and processes using the same credentials skip the Keystone authentication
+    #
+
+    def _token_cache_key(self) -> str:
+        return TokenCache.key(self.OS_AUTH_URL, self.OS_USER_DOMAIN_NAME, self.OS_USERNAME,
+                              self.OS_PROJECT_DOMAIN_NAME, self.OS_PROJECT_NAME, self.region)
+
+    def _load_cached_token(self, stale_token: str|None) -> bool:
+        """
+        Use the token saved in the token cache, unless it is `stale_token` (the one being renewed)
+
+        @return True if a token was loaded
+        """
+        if self.token_cache is None:
+            return False
+        entry = self.token_cache.get(self._token_cache_key())
+        if entry is None or entry['token'] == stale_token:
+            return False
+        self.OS_AUTH_TOKEN = entry['token']
+        self.OBJECT_STORAGE_URL = entry['storage_url']
+        self.token_expires_at = entry['expires_at']
+        return True
+
+    def _save_token(self):
+        """Save the current token in the token cache"""
+        if self.token_cache is None or self.token_expires_at is None:
+            return
+        self.token_cache.put(self._token_cache_key(), {
+            'token': self.OS_AUTH_TOKEN,
+            'storage_url': self.OBJECT_STORAGE_URL,
+            'expires_at': self.token_expires_at
         })
 
-        if r.status_code == 201:
-            # Retreive the auth header from the server reply
-            self.OS_AUTH_TOKEN = r.headers.get('X-Subject-Token')
-            # Assign the auth header to the client session
-            self.session.headers['X-Auth-Token'] = self.OS_AUTH_TOKEN
 
-            # Retreive the storage URL from the server reply
-            self.OBJECT_STORAGE_URL = None
-            catalog = r.json().get('token', {}).get('catalog', [])
-            endpoints = next((e['endpoints'] for e in catalog if e['type'] == 'object-store'), None)
-            if endpoints is not None:
-                self.OBJECT_STORAGE_URL = next((e['url'] for e in endpoints if e['interface'] == 'public' and e['region'] == self.region), None)
+def _conditions(if_none_match: str|None, if_modified_since: float|None, if_match: str|None = None) -> dict:
+    """Headers of a conditional HEAD / GET request"""
+    headers = {}
+    if if_match is not None:
+        headers['If-Match'] = quote_etag(if_match)
+    if if_none_match is not None:
+        headers['If-None-Match'] = quote_etag(if_none_match)
+    if if_modified_since is not None:
+        headers['If-Modified-Since'] = http_date(if_modified_since)
+    return headers
+
+def _object_info_from_headers(object_name: str, headers) -> ObjectInfo:
+    """Build an ObjectInfo from the headers of an object HEAD or GET reply"""
+    meta = {}
+    for h in headers:
+        if h.lower().startswith('x-object-meta-'):
+            meta[h.lower().removeprefix('x-object-meta-')] = headers[h]
+
+    return ObjectInfo(
+        name=object_name,
+        bytes=int(headers.get('Content-Length', 0)),
+        hash=headers['Etag'].strip('"') if 'Etag' in headers else None, # Etag of Static Large Objects is quoted
+        content_type=headers.get('Content-Type'),
+        metadata=meta,
+        last_modified=float(headers.get('X-Timestamp'))
+    )
+
+def _object_info_from_listing(o: dict) -> ObjectInfo|SubdirInfo:
+    """Build an ObjectInfo (or SubdirInfo) from an entry of a container listing"""
+    if 'subdir' in o:
+        return SubdirInfo(o['subdir'])
+
+    # By default the endpoint returns a ISO string in the format "2022-12-13T18:05:00.378500" (UTC).
+    # If the trailing +00 is not added, python assumes it is a local timestamp, not UTC.
+    iso = o.get('last_modified')
+    if '+' not in iso.split('T')[1] and '-' not in iso.split('T')[1]:
+        iso += '+00:00' # Ensure we have an offset specified
+
+    return ObjectInfo(
+        name=o.get('name'),
+        bytes=o.get('bytes'),
+        hash=o.get('hash'),
+        content_type=o.get('content_type'),
+        metadata=None,
+        last_modified=datetime.fromisoformat(iso).timestamp()
+    )
+
+
+def _refresh_token(client_ref: weakref.ref):
+    """Timer callback renewing the token of a client, unless the client was garbage collected"""
+    client = client_ref()
+    if client is not None:
+        client._refresh_token()
+
+
+class SwiftClient(SwiftCredentials, ObjectStorageClient):
+
+    multipart_max_parts = 1000 # Default `max_manifest_segments` of the SLO middleware
+    request_body_argument = 'data'
+
+    def __init__(self, region: str, credentials: dict = {}, max_connections: int = MAX_CONNECTIONS, token_cache: str|None = DEFAULT_TOKEN_CACHE_PATH) -> None:
+        """
+        Initialize a Swift client
 
-            if self.OBJECT_STORAGE_URL is None:
-                raise ObjectStorageClientError(f"Storage URL not found in server reply for region '{self.region}'")
+        @param `region` Swift storage region
+        @param `credentials` OpenStack credentials (read from the environment if not provided)
+        @param `max_connections` Size of the HTTP connection pool, and number of requests sent in parallel by the client
+        @param `token_cache` Path of the file where the auth tokens are saved to be reused until they expire (None to disable)
+        """
+        super().__init__()
+        self.OBJECT_STORAGE_URL = None
+        self.OS_AUTH_TOKEN = None
+        self.token_expires_at = None
+        self.token_cache = TokenCache(token_cache) if token_cache else None
+        self._auth_lock = threading.Lock()
+        self._refresh_timer = None
+        self.region = region
+        self.max_connections = max_connections
+        self.retry_policy = RetryPolicy()
+        self.limiter = AdaptiveLimiter(max_connections)
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=max_connections, pool_maxsize=max_connections)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.hooks = {'response': [self._response_hook]} # Set a response hook to handle authentication errors
+        self.authenticate(credentials)
 
-            return True
+    # This hook is called before each response is returned from
+    # the request execution. We use it to handle authentication
+    # failure. If there is an auth failure, we re-authenticate
+    # and retry the request before raising an exception if we
+    # still have a failure. This allows to renew an expired
+    # token transparently without raising an error.
+    def _response_hook(self, resp: requests.Response, *args, **kwargs):
+        """Called before returning the response"""
+        auth_status_codes = [401, 403]
+        if resp.status_code in auth_status_codes:
+            self._renew_token(resp.request.headers.get('X-Auth-Token'))
+            resp.content # Read the reply so that its connection goes back to the pool
+            req = resp.request.copy() # Copy the original request
+            req.headers['X-Auth-Token'] = self.OS_AUTH_TOKEN # Update the auth token
+            req.hooks = None # To avoid infinite retry, we clear the hooks
+            if req.body is not None and hasattr(req.body, 'read'):
+                requests.utils.rewind_body(req) # Send the streamed body again from its start (raises if it is not seekable)
+            # Replay on the pooled session with the same options (stream, timeout, verify...)
+            res : requests.Response = self.session.send(req, **kwargs)
+            if res.status_code in auth_status_codes:
+                raise AuthorizationError
+            else:
+                return res
+        return resp
+
+    def _describe_request(self, function, args: tuple, kwargs: dict, result, error: Exception|None) -> tuple[str, int|str|None, int]:
+        method = function.__name__.upper()
+        url = args[0] if args else kwargs.get('url', '')
+        if not self.OBJECT_STORAGE_URL or not url.startswith(self.OBJECT_STORAGE_URL):
+            target = 'auth'
+        else:
+            path = url[len(self.OBJECT_STORAGE_URL):].split('?')[0].strip('/').split('/', 1)
+            target = 'account' if path == [''] else 'container' if len(path) == 1 else 'object'
+
+        if result is None:
+            return f"{method} {target}", type(error).__name__, 0
+        if method == 'HEAD':
+            received = 0
+        elif kwargs.get('stream'):
+            received = int(result.headers.get('Content-Length', 0)) # Not read yet
+        else:
+            received = len(result.content)
+        return f"{method} {target}", result.status_code, received
+
+    def _request_container(self, args: tuple, kwargs: dict) -> str|None:
+        url = args[0] if args else kwargs.get('url', '')
+        if not url.startswith(f"{self.OBJECT_STORAGE_URL}/"):
+            return None # Account requests
+        return url[len(self.OBJECT_STORAGE_URL) + 1:].split('/')[0].split('?')[0]
+
+    def _classify_failure(self, result, error: Exception|None) -> tuple[str|None, float|None]:
+        if isinstance(result, requests.Response):
+            if result.status_code in [429, 498, 503]: # 498: rate limited by the ratelimit middleware
+                return 'rejected', parse_retry_after(result.headers.get('Retry-After'))
+            if result.status_code in [500, 502, 504]:
+                return 'failed', parse_retry_after(result.headers.get('Retry-After'))
+        elif isinstance(error, requests.exceptions.ConnectTimeout) or \
+                isinstance(getattr(error.args[0] if error is not None and error.args else None, 'reason', None), urllib3.exceptions.NewConnectionError):
+            return 'rejected', None # The connection could not be established
+        elif isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.ChunkedEncodingError)):
+            return 'failed', None
+        elif isinstance(error, (urllib3.exceptions.ProtocolError, urllib3.exceptions.ReadTimeoutError)):
+            return 'failed', None # Raised while a download body is read from the raw response
+        return None, None
+
+    def _renew_token(self, expired_token: str|None):
+        """
+        Renew the token once, even when many threads find out at the same time that it expired:
+        the first one authenticates while the others wait for the new token.
+        """
+        with self._auth_lock:
+            if self.OS_AUTH_TOKEN == expired_token:
+                self.authenticate()
+
+    def _refresh_token(self):
+        """Renew the token before it expires (called from the refresh timer)"""
+        try:
+            self._renew_token(self.OS_AUTH_TOKEN)
+        except Exception as e:
+            # Requests keep using the current token, and renew it on authentication failure
+            print(f"SwiftClient: background token refresh failed: {e}")
+
+    def _schedule_token_refresh(self):
+        """Start a timer to renew the token `token_refresh_margin` seconds before it expires"""
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+            self._refresh_timer = None
+        delay = self._token_refresh_delay()
+        if delay is None:
+            return
+        self._refresh_timer = threading.Timer(delay, _refresh_token, args=(weakref.ref(self),))
+        self._refresh_timer.daemon = True
+        self._refresh_timer.start()
+
+    def close(self):
+        """Stop the token refresh timer and the worker pool of the client"""
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+            self._refresh_timer = None
+        super().close()
+
+
+    def authenticate(self, credentials : dict = {}) -> bool:
+        """
+        Retreives a usable authentication token: a token saved in the token cache by another client or process,
+        or a new one. The current token is considered expired and is never reused.
+        """
+        if credentials or getattr(self, 'OS_AUTH_URL', None) is None:
+            self.read_credentials_from_env(credentials) # Keep the credentials given to the constructor when renewing the token
+
+        if self.token_cache is None:
+            self._keystone_authenticate()
+        else:
+            # Holding the lock, processes starting together wait for the first one to save its token
+            with self.token_cache.locked():
+                if not self._load_cached_token(stale_token=self.OS_AUTH_TOKEN):
+                    self._keystone_authenticate()
+                    self._save_token()
+
+        # Assign the auth header to the client session
+        self.session.headers['X-Auth-Token'] = self.OS_AUTH_TOKEN
+        self._schedule_token_refresh()
+        return True
+
+    def _keystone_authenticate(self):
+        """Request a new token from Keystone"""
+        auth_url, payload = self._auth_request()
+        r = self._call(requests.post, auth_url, json=payload, limited=False) # Sent while the request that got a 401 holds a slot
+
+        if r.status_code == 201:
+            self._read_auth_reply(r.headers.get('X-Subject-Token'), r.json())
         else:
             # print(f"AuthenticationRequestFailed: HttpResponseStatus={r.status_code} with content {r.content}")
             raise AuthorizationError(f"HttpResponseStatus={r.status_code} ResponseContent={r.content}")
 
+    @cached_info('container')
     def container_info(self, container_name: str) -> ContainerInfo|None:
         url = f"{self.OBJECT_STORAGE_URL}/{container_name}"
-        r = self.session.head(url)
+        r = self._call(self.session.head, url)
         meta = {}
         for h in r.headers:
             if h.startswith('X-Object-Meta-'):
@@ -129,7 +366,9 @@ class SwiftClient(ObjectStorageClient):
                 count=int(r.headers.get('X-Container-Object-Count')),
                 bytes=int(r.headers.get('Content-Length')) if r.headers.get('Content-Length') is not None else None
             )
-        elif r.status_code != 404:
+        elif r.status_code == 404:
+            return not_found()
+        else:
             print(f"ERROR: get_object_info({container_name}) got status code: {r.status_code} {r.content}")
 
 
@@ -137,59 +376,65 @@ class SwiftClient(ObjectStorageClient):
         url = f"{self.OBJECT_STORAGE_URL}"
         params = {"format":"json"}
         if prefix: params['prefix'] = prefix
-        r = self.session.get(url, params=params)
+        r = self._call(self.session.get, url, params=params)
         objList = r.json()
         return [ContainerInfo(o.get('name'), o.get('bytes'), o.get('count')) for o in objList]
 
+    @invalidates_info('container')
     def container_create(self, container_name: str) -> bool:
         url = f"{self.OBJECT_STORAGE_URL}/{container_name}"
-        r = self.session.put(url)
+        r = self._call(self.session.put, url)
         if r.status_code not in [201, 202]:
             print('container_create() status code:', r.status_code)
         return r.status_code == 201
 
+    @invalidates_info('container')
     def container_delete(self, container_name: str, force: bool = False) -> bool:
         if force:
             # First delete all objects in the container, otherwise the delete request will fail
-            objects = self.object_list(container_name=container_name)
-            for o in objects:
-                self.object_delete(o.name, container_name)
+            names = (o.name for o in self.object_iter(container_name=container_name))
+            for _ in self.object_delete_iter(names, container_name):
+                pass
+            # Segments left by uploads that did not complete or manifests that were overwritten
+            segments_container = f"{container_name}_segments"
+            names = (o.name for o in self.object_iter(container_name=segments_container))
+            for _ in self.object_delete_iter(names, segments_container):
+                pass
+            self._call(self.session.delete, f"{self.OBJECT_STORAGE_URL}/{segments_container}")
 
         url = f"{self.OBJECT_STORAGE_URL}/{container_name}"
-        r = self.session.delete(url)
+        r = self._call(self.session.delete, url)
         if r.status_code not in [204, 404, 409]:
             print('container_delete() status code:', r.status_code)
         if r.status_code in [204, 404]:
             # Success
+            if not force:
+                # The segments container is empty once all the manifests were deleted, the delete fails (409) otherwise
+                self._call(self.session.delete, f"{url}_segments")
             self.container_name = None
             return True
         else:
             return False
 
 
-    def object_info(self, object_name: str, container_name: str = None) -> ObjectInfo|None:
+    @cached_info('object')
+    def object_info(self, object_name: str, container_name: str = None, if_none_match: str = None, if_modified_since: float = None) -> ObjectInfo|None:
         """Return an objet's info (including metadata)"""
         url = f"{self.OBJECT_STORAGE_URL}{self.object_path(object_name, container_name)}"
-        r = self.session.head(url)
-        meta = {}
-        for h in r.headers:
-            if h.lower().startswith('x-object-meta-'):
-                meta[h.lower().removeprefix('x-object-meta-')] = r.headers[h]
+        r = self._call(self.session.head, url, headers=_conditions(if_none_match, if_modified_since))
         
         if r.status_code == 200:
-            return ObjectInfo(
-                name=object_name,
-                bytes=int(r.headers.get('Content-Length', 0)),
-                hash=r.headers.get('Etag'),
-                content_type=r.headers.get('Content-Type'),
-                metadata=meta,
-                last_modified=float(r.headers.get('X-Timestamp'))
-            )
+            return _object_info_from_headers(object_name, r.headers)
+        elif r.status_code in [304, 412]:
+            return NOT_MODIFIED
         elif r.status_code == 204:
             return None
-        elif r.status_code != 404:
+        elif r.status_code == 404:
+            return not_found()
+        else:
             print(f"ERROR: get_object_info({object_name}) got status code: {r.status_code} {r.content}")
 
+    @invalidates_info('object')
     def object_replace_metadata(self, object_name: str, metadata: dict, container_name: str = None) -> bool:
         """
         Function to set all the object's metadata
@@ -200,93 +445,264 @@ class SwiftClient(ObjectStorageClient):
         for m in metadata:
             headers[f'X-Object-Meta-{m}'] = metadata[m]
 
-        r = self.session.post(url, headers=headers)
+        r = self._call(self.session.post, url, headers=headers)
         return r.status_code == 202
 
+    @invalidates_info('destination')
+    def object_copy(self, object_name: str, destination_name: str, container_name: str = None, destination_container: str = None, metadata: dict = None) -> bool:
+        """
+        Copy an object on the server side (PUT with X-Copy-From). The copy of a Static Large Object is a regular
+        object holding the concatenated segments, so it is limited to the maximum object size of the cluster (5 GiB by default).
+        """
+        container_name = self.get_container(container_name)
+        destination_container = destination_container or container_name
+        url = f"{self.OBJECT_STORAGE_URL}{self.object_path(destination_name, destination_container)}"
+        headers = {'X-Copy-From': quote(f"/{container_name}/{object_name}"), 'Content-Length': '0'}
+        if metadata is not None:
+            headers['X-Fresh-Metadata'] = 'true'
+            for m in metadata:
+                headers[f'X-Object-Meta-{m}'] = metadata[m]
+
+        r = self._call(self.session.put, url, headers=headers)
+        if r.status_code == 201:
+            return True
+        print(f"SwiftClient: object_copy() status code: {r.status_code}")
+        return False
+
+    @invalidates_info('object')
     def object_upload(self, stream, object_name: str, metadata: dict={}, container_name: str = None) -> bool:
+        """
+        Upload a stream, optionally specifying some metadata to apply to the object. Streams larger than
+        `multipart_threshold`, of unknown size (ex: stdin) or compressed are uploaded as a Static Large Object: segments
+        are uploaded in parallel to the `<container>_segments` container and then assembled by a manifest.
+        """
+        size = stream_size(stream)
+        if size is None or size > self.multipart_threshold or self._compresses(metadata):
+            return self.multipart_upload(stream, object_name, metadata, container_name, size)
+
         url = f"{self.OBJECT_STORAGE_URL}{self.object_path(object_name, container_name)}"
         headers={'X-Auth-Token': self.OS_AUTH_TOKEN}
         for m in metadata:
             headers[f'X-Object-Meta-{m}'] = metadata[m] # Add metadata
-        r = self.session.put(url, headers=headers, data=stream)
+        body = HashingReader(stream) if self.verify_integrity else stream
+        r = self._call(self.session.put, url, headers=headers, data=body)
         if r.status_code != 201:
             print('Upload status code:', r.status_code)
-        return r.status_code == 201
+            return False
+        if self.verify_integrity:
+            return self._check_integrity(body.hasher, r.headers.get('Etag'), f'object_upload() of {object_name}')
+        return True
+
+    # Static Large Object (SLO) upload, see https://docs.openstack.org/swift/latest/overview_large_objects.html
 
-    def object_download(self, object_name: str, stream, container_name: str = None) -> bool:
+    def _multipart_create(self, object_name: str, metadata: dict, container_name: str):
+        segments_container = f"{container_name}_segments"
+        r = self._call(self.session.put, f"{self.OBJECT_STORAGE_URL}/{segments_container}")
+        if r.status_code not in [201, 202]:
+            print(f'Could not create the segments container {segments_container}, status code:', r.status_code)
+            return None
+        return {
+            'container_name': container_name,
+            'object_name': object_name,
+            'metadata': metadata,
+            'segments_container': segments_container,
+            'segments_prefix': f"{object_name}/slo/{time.time():.6f}/",
+        }
+
+    def _multipart_upload_part(self, upload, part_number: int, data: bytes):
+        path = f"/{upload['segments_container']}/{upload['segments_prefix']}{part_number:08d}"
+        r = self._call(self.session.put, f"{self.OBJECT_STORAGE_URL}{path}", data=data)
+        if r.status_code != 201:
+            raise ObjectStorageClientError(f'Segment upload status code: {r.status_code}')
+        self._check_part(data, r.headers.get('Etag'), f'Segment {path}')
+        return {'path': path, 'etag': r.headers.get('Etag'), 'size_bytes': len(data)}
+
+    def _multipart_complete(self, upload, parts: list) -> bool:
+        url = f"{self.OBJECT_STORAGE_URL}{self.object_path(upload['object_name'], upload['container_name'])}"
+        headers = {}
+        for m in upload['metadata']:
+            headers[f'X-Object-Meta-{m}'] = upload['metadata'][m] # Add metadata to the manifest
+        r = self._call(self.session.put, url, params={'multipart-manifest': 'put'}, headers=headers, data=json.dumps(parts))
+        if r.status_code != 201:
+            print('Manifest upload status code:', r.status_code, r.content)
+            return False
+        if self.verify_integrity and all(is_md5_etag(p['etag']) for p in parts):
+            # The ETag of a Static Large Object is the MD5 of the segment ETags: check that the segments were assembled as sent
+            hasher = md5(''.join(p['etag'].strip('"') for p in parts).encode())
+            if r.headers.get('Etag', '').strip('"') != hasher.hexdigest():
+                print(f"Manifest upload integrity check failed: ETag {r.headers.get('Etag')}, {hasher.hexdigest()} expected")
+                return False
+        return True
+
+    def _multipart_abort(self, upload):
+        segments = self.object_iter(prefix=upload['segments_prefix'], container_name=upload['segments_container'])
+        for o in segments:
+            self.object_delete(o.name, upload['segments_container'])
+
+    def object_download(self,
+        object_name: str,
+        stream,
+        container_name: str = None,
+        chunk_size: int = None,
+        byte_range: tuple[int, int] = None,
+        if_none_match: str = None,
+        if_modified_since: float = None,
+        if_match: str = None,
+    ) -> bool:
         url = f"{self.OBJECT_STORAGE_URL}{self.object_path(object_name, container_name)}"
-        r = self.session.get(url, stream=True)
-        if r.status_code == 200:
-            for chunk in r.iter_content():
-                stream.write(chunk)
-            return True
-        else:
-            # print(f"Request status is {r.status_code} with content {r.content}")
-            return False # Could not download
+        headers = _conditions(if_none_match, if_modified_since, if_match)
+        if byte_range: headers['Range'] = f"bytes={byte_range[0]}-{byte_range[1]}"
+        with self._call(self.session.get, url, headers=headers, stream=True) as r:
+            if r.status_code == (206 if byte_range else 200):
+                hasher = self._download_hasher(r, url) if self.verify_integrity and not byte_range else None
+                out = self._decoding(stream, r.headers.get(f'X-Object-Meta-{CODEC_METADATA}') if not byte_range else None)
+                # Read the raw response so the stored bytes are written as-is through a single buffer
+                first, last = byte_range or (0, None)
+                size = int(r.headers['Content-Length']) if 'Content-Length' in r.headers else None
+                resume = lambda received: self._resume_download(url, r.headers.get('Etag'), first + received, last)
+                with ResumingReader(self, r.raw, size, resume, 'GET object') as body:
+                    copy_stream(body, HashingWriter(out, hasher) if hasher else out, chunk_size or self.download_chunk_size)
+                return self._check_integrity(hasher, r.headers.get('Etag'), f'object_download() of {object_name}') \
+                    and self._finish_decoding(out, f'object_download() of {object_name}')
+            elif r.status_code in [304, 412] and if_match is None:
+                return NOT_MODIFIED
+            else:
+                # print(f"Request status is {r.status_code} with content {r.content}")
+                return False # Could not download
+
+    def _resume_download(self, url: str, etag: str|None, first: int, last: int|None):
+        """Return the raw body of the bytes `first` to `last` of the object at `url`, or None if it changed"""
+        if not etag:
+            return None
+        headers = {'Range': f"bytes={first}-{'' if last is None else last}", 'If-Match': etag}
+        r = self._call(self.session.get, url, headers=headers, stream=True)
+        if r.status_code != 206:
+            print(f"SwiftClient: cannot resume the download of {url}: {r.status_code}")
+            r.close()
+            return None
+        return r.raw
+
+    def _download_hasher(self, r: requests.Response, url: str) -> ETagHasher|None:
+        """Return the hasher matching the Etag of a GET reply, or None if it cannot be checked"""
+        etag = r.headers.get('Etag')
+        if r.headers.get('X-Static-Large-Object', '').lower() == 'true':
+            # The Etag is the MD5 of the segment Etags, the manifest gives the segment sizes
+            m = self._call(self.session.get, url, params={'multipart-manifest': 'get'})
+            if m.status_code != 200:
+                return None
+            segments = m.json()
+            if any('range' in s or s.get('sub_slo') for s in segments) or not etag \
+                    or md5(''.join(s['hash'] for s in segments).encode()).hexdigest() != etag.strip('"'): # Replaced in the meantime
+                return None
+            return ETagHasher([s['bytes'] for s in segments], composite='swift')
+        if 'X-Object-Manifest' in r.headers: # Dynamic Large Object, the Etag depends on the segments listed at the time
+            return None
+        return ETagHasher() if is_md5_etag(etag) else None
 
-    def object_list(self,
-        fetch_metadata: bool = False,
+    def object_iter(self,
         prefix: str = None,
         delimiter: str = None,
+        start_after: str = None,
+        page_size: int = None,
         container_name: str = None,
-    ) -> list[ObjectInfo]:
+    ) -> Iterator[ObjectInfo|SubdirInfo]:
         # See https://docs.openstack.org/api-ref/object-store/?expanded=show-container-details-and-list-objects-detail#show-container-details-and-list-objects
 
-        if container_name is None:
-            container_name = self.container_name
-
-        if container_name is None:
-            raise ContainerNotSpecified
-        
-        url = f"{self.OBJECT_STORAGE_URL}/{container_name}"
+        url = f"{self.OBJECT_STORAGE_URL}/{self.get_container(container_name)}"
         params = {"format":"json"}
         if prefix: params['prefix'] = prefix
         if delimiter: params['delimiter'] = delimiter
-        r = self.session.get(url, params=params)
+        if start_after: params['marker'] = start_after
+        if page_size: params['limit'] = page_size
+
+        while True:
+            r = self._call(self.session.get, url, params=params)
+            if r.status_code != 200:
+                return # 204 when there is nothing (left) to list
 
-        if r.status_code != 200:
-            return []
-        else:
             objects = r.json()
-            for i in range(0, len(objects)):
-                o = objects[i]
-                if 'subdir' in o:
-                    objects[i] = SubdirInfo(o['subdir'])
-                else:
-                    # By default the endpoint returns a ISO string in the format "2022-12-13T18:05:00.378500" (UTC).
-                    # If the trailing +00 is not added, python assumes it is a local timestamp, not UTC.
-                    iso = o.get('last_modified')
-                    if '+' not in iso.split('T')[1] and '-' not in iso.split('T')[1]:
-                        iso += '+00:00' # Ensure we have an offset specified
-                    
-                    objects[i] = ObjectInfo(
-                        name=o.get('name'),
-                        bytes=o.get('bytes'),
-                        hash=o.get('hash'),
-                        content_type=o.get('content_type'),
-                        metadata=None,
-                        last_modified=datetime.fromisoformat(iso).timestamp()
-                    )
-
-            if fetch_metadata:
-                obj_indices = [i for i, obj in enumerate(objects) if isinstance(obj, ObjectInfo)]
-                with ThreadPoolExecutor() as executor:
-                    future_to_index = {executor.submit(self.object_info, objects[i].name, container_name=container_name): i for i in obj_indices}
-                    for future in as_completed(future_to_index):
-                        i = future_to_index[future]
-                        try:
-                            meta_obj = future.result()
-                            if meta_obj:
-                                objects[i].metadata = meta_obj.metadata
-                        except Exception:
-                            pass
-
-            return objects
+            for o in objects:
+                yield _object_info_from_listing(o)
+
+            # The server caps the page size (10000 by default), keep going from the last entry until a page comes back short or empty
+            if len(objects) == 0 or (page_size and len(objects) < page_size):
+                return
+            params['marker'] = objects[-1].get('subdir') or objects[-1].get('name')
 
+    @invalidates_info('object')
     def object_delete(self, object_name: str, container_name:str = None) -> bool:
+        """Delete the specified object. The segments of a Static Large Object are deleted along with its manifest."""
         if container_name is None:
             container_name = self.container_name
         # print('object_delete()', object_name)
         url = f"{self.OBJECT_STORAGE_URL}{self.object_path(object_name, container_name)}"
-        r = self.session.delete(url)
-        return r.status_code == 204 or r.status_code == 404
+        # Deletes the segments along with an SLO manifest, and deletes other objects as a plain DELETE would
+        r = self._call(self.session.delete, url, params={'multipart-manifest': 'delete'}, headers={'Accept': 'application/json'})
+        if r.status_code != 200:
+            # 204 when the cluster has no SLO middleware
+            return r.status_code == 204 or r.status_code == 404
+
+        # The SLO middleware replies 200 with a bulk delete report
+        status = r.json().get('Response Status', '').split(' ')[0]
+        if status == '400':
+            # Older SLO middlewares refuse to delete objects that are not manifests this way
+            r = self._call(self.session.delete, url)
+            return r.status_code == 204 or r.status_code == 404
+        return status in ['200', '404']
+
+    @invalidates_info('objects')
+    def _object_delete_batch(self, object_names: list[str], container_name: str) -> dict[str, bool]:
+        """
+        Delete a batch of objects with the bulk delete middleware. Static Large Objects are deleted with
+        `object_delete()` instead, so that their segments are deleted along with their manifest.
+        """
+        manifests = self._slo_manifests(object_names, container_name)
+        results = {name: self.object_delete(name, container_name) for name in object_names if name in manifests}
+        object_names = [name for name in object_names if name not in manifests]
+        if not object_names:
+            return results
+
+        # See https://docs.openstack.org/swift/latest/middleware.html#bulk-delete
+        paths = [quote(f"/{container_name}/{name}") for name in object_names]
+        r = self._call(self.session.post,
+            self.OBJECT_STORAGE_URL,
+            params={'bulk-delete': 'true'},
+            headers={'Content-Type': 'text/plain', 'Accept': 'application/json'},
+            data='\n'.join(paths).encode(),
+        )
+        if r.status_code != 200:
+            # Bulk delete not available on this cluster
+            return results | super()._object_delete_batch(object_names, container_name)
+
+        results.update({name: True for name in object_names})
+        prefix_length = len(container_name) + 2
+        for path, status in r.json().get('Errors', []):
+            results[unquote(path)[prefix_length:]] = False
+        return results
+
+    def _slo_manifests(self, object_names: list[str], container_name: str) -> set[str]:
+        """
+        Return the names of `object_names` that have segments in `<container>_segments` (see `multipart_upload()`),
+        with a single listing of the range of segment names the batch can have
+        """
+        # The segments of an object are named `<object>/slo/<timestamp>/<n>`, they sort between `<object>` and `<object>/slo0`
+        names = set(object_names)
+        url = f"{self.OBJECT_STORAGE_URL}/{container_name}_segments"
+        params = {'format': 'json', 'marker': min(names), 'end_marker': f"{max(names)}/slo0"}
+        manifests = set()
+        while True:
+            r = self._call(self.session.get, url, params=params)
+            if r.status_code != 200:
+                return manifests # 404 when there is no segments container, 204 when there is nothing (left) to list
+            segments = r.json()
+            for o in segments:
+                segment = o['name']
+                i = segment.find('/slo/')
+                while i >= 0:
+                    if segment[:i] in names:
+                        manifests.add(segment[:i])
+                        break
+                    i = segment.find('/slo/', i + 1)
+            if len(segments) == 0:
+                return manifests
+            params['marker'] = segments[-1]['name']
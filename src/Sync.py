@@ -0,0 +1,268 @@
+
+#
+#   Directory <-> container synchronization (see `ObjectStorageClient.sync_upload()` and `ObjectStorageClient.sync_download()`)
+#
+
+import hashlib, os, re, time
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .ObjectStorageClient import ObjectInfo, ObjectStorageClient
+from .Codec import MD5_METADATA, metadata_codec, metadata_original
+
+MD5_PATTERN = re.compile('^[0-9a-f]{32}$')
+
+@dataclass
+class SyncAction:
+    action: str # 'upload', 'download', 'delete', 'copy' or 'move'
+    name: str # Object name
+    path: str # Local file path
+    bytes: int = 0
+    last_modified: float = None # Remote last modification time (downloads)
+    destination: str = None # Name of the copy (copies and moves)
+    metadata: dict = None # Metadata of the object (uploads)
+
+@dataclass
+class SyncResult:
+    transferred: int = 0
+    transferred_bytes: int = 0
+    skipped: int = 0
+    deleted: int = 0
+    failed: list[str] = field(default_factory=list) # Object names
+    seconds: float = 0
+    dry_run: bool = False
+
+    @property
+    def throughput(self) -> float:
+        """Transfer rate in bytes per second"""
+        return self.transferred_bytes / self.seconds if self.seconds else 0
+
+    @property
+    def files_per_second(self) -> float:
+        return self.transferred / self.seconds if self.seconds else 0
+
+    def summary(self) -> str:
+        if self.dry_run:
+            return (f"(dry run) {self.transferred} to transfer ({self.transferred_bytes / 1024 / 1024:.1f} MiB), "
+                f"{self.skipped} unchanged, {self.deleted} to delete")
+        return (f"{self.transferred} transferred ({self.transferred_bytes / 1024 / 1024:.1f} MiB), "
+            f"{self.skipped} unchanged, {self.deleted} deleted, {len(self.failed)} failed "
+            f"in {self.seconds:.1f}s ({self.files_per_second:.1f} files/s, {self.throughput / 1024 / 1024:.1f} MiB/s)")
+
+
+def file_md5(path: str) -> str:
+    md5 = hashlib.md5(usedforsecurity=False)
+    with open(path, 'rb') as f:
+        while chunk := f.read(1024 * 1024):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+def unchanged(path: str, stat: os.stat_result, remote: ObjectInfo, source_is_newer: bool, checksum: bool,
+        object_info: Callable[[], ObjectInfo|None] = None) -> bool:
+    """
+    Compare a local file with an object. Files of a different size are changed. Otherwise the MD5 of the file
+    is compared to the ETag when the source is newer (or with `checksum`), unless the ETag is not a plain MD5
+    (ex: multipart uploads): files are then considered unchanged unless the source is newer.
+
+    The size and ETag of the objects uploaded with a codec are those of the compressed bytes: when the sizes differ,
+    `object_info` is called to get the metadata of the object (the listings don't have it), and the file is compared
+    with the size and MD5 recorded before compression instead (see `_transfer()`).
+    """
+    if remote.bytes != stat.st_size:
+        info = object_info() if object_info is not None else None
+        if info is None or metadata_codec(info.metadata) is None:
+            return False
+        size, md5 = metadata_original(info.metadata)
+        if size is not None and size != stat.st_size:
+            return False
+        if (checksum or source_is_newer) and md5 is not None:
+            return file_md5(path) == md5
+        return not source_is_newer
+    if (checksum or source_is_newer) and remote.hash and MD5_PATTERN.match(remote.hash):
+        return file_md5(path) == remote.hash
+    return not source_is_newer
+
+def normalize_prefix(prefix: str|None) -> str:
+    """The prefix is a "directory": 'site' and 'site/' both sync objects named 'site/...'"""
+    return prefix.rstrip('/') + '/' if prefix else ''
+
+def local_files(directory: str) -> Iterator[tuple[str, str, os.stat_result]]:
+    """Yield the (relative path with '/' separators, path, stat) of the regular files under `directory`"""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for f in sorted(files):
+            path = os.path.join(root, f)
+            if os.path.isfile(path): # Skip broken links, sockets...
+                yield os.path.relpath(path, directory).replace(os.sep, '/'), path, os.stat(path)
+
+def local_path(directory: str, rel: str) -> str|None:
+    """
+    @return the path of the file of the object named `rel` (relative to the prefix) in `directory`, or None
+        if it resolves outside of `directory` (ex: 'a/../../x', links to other directories)
+    """
+    path = os.path.join(directory, *rel.split('/'))
+    root, real = os.path.realpath(directory), os.path.realpath(path)
+    if real == root or os.path.commonpath([root, real]) != root:
+        print(f"sync: {rel}: skipped, the object name points outside of {directory}")
+        return None
+    return path
+
+def remote_objects(client: ObjectStorageClient, prefix: str, container_name: str) -> dict[str, ObjectInfo]:
+    """Stream the listing of the objects under `prefix`, indexed by their name relative to the prefix"""
+    objects = {}
+    for o in client.object_iter(prefix=prefix or None, container_name=container_name):
+        if isinstance(o, ObjectInfo) and not o.name.endswith('/'): # Skip "directory" marker objects
+            objects[o.name[len(prefix):]] = o
+    return objects
+
+def upload_actions(directory: str, prefix: str, metadata: dict = None) -> Iterator[SyncAction]:
+    """Upload every file of `directory` (with `metadata`), as the tree is walked"""
+    for rel, path, stat in local_files(directory):
+        yield SyncAction('upload', prefix + rel, path, stat.st_size, metadata=metadata)
+
+def download_actions(client: ObjectStorageClient, prefix: str, directory: str, container_name: str) -> Iterator[SyncAction]:
+    """Download every object under `prefix`, as the listing is streamed"""
+    for o in client.object_iter(prefix=prefix or None, container_name=container_name):
+        if isinstance(o, ObjectInfo) and not o.name.endswith('/'):
+            path = local_path(directory, o.name[len(prefix):])
+            if path is not None:
+                yield SyncAction('download', o.name, path, o.bytes, o.last_modified)
+
+def copy_actions(client: ObjectStorageClient, prefix: str, destination_prefix: str, container_name: str, move: bool) -> Iterator[SyncAction]:
+    """Copy (or move) every object under `prefix` to `destination_prefix`, as the listing is streamed"""
+    for o in client.object_iter(prefix=prefix or None, container_name=container_name):
+        if isinstance(o, ObjectInfo):
+            yield SyncAction('move' if move else 'copy', o.name, None, o.bytes, destination=destination_prefix + o.name[len(prefix):])
+
+def plan_upload(client: ObjectStorageClient, directory: str, prefix: str, container_name: str, delete: bool, checksum: bool) -> tuple[list[SyncAction], int]:
+    """
+    @return the actions to run to make the objects under `prefix` match `directory`, and the number of unchanged files
+    """
+    remote = remote_objects(client, prefix, container_name)
+    actions, skipped = [], 0
+    for rel, path, stat in local_files(directory):
+        o = remote.pop(rel, None)
+        if o is not None and unchanged(path, stat, o, stat.st_mtime > o.last_modified, checksum,
+                lambda: client.object_info(o.name, container_name=container_name)):
+            skipped += 1
+        else:
+            actions.append(SyncAction('upload', prefix + rel, path, stat.st_size))
+    if delete:
+        actions.extend(SyncAction('delete', prefix + rel, None) for rel in sorted(remote))
+    return actions, skipped
+
+def plan_download(client: ObjectStorageClient, prefix: str, directory: str, container_name: str, delete: bool, checksum: bool) -> tuple[list[SyncAction], int]:
+    """
+    @return the actions to run to make `directory` match the objects under `prefix`, and the number of unchanged files
+    """
+    local = {rel: (path, stat) for rel, path, stat in local_files(directory)} if os.path.isdir(directory) else {}
+    actions, skipped = [], 0
+    for rel, o in sorted(remote_objects(client, prefix, container_name).items()):
+        path = local_path(directory, rel)
+        if path is None:
+            continue
+        path_stat = local.pop(rel, None)
+        # The files of the objects uploaded with a codec are decoded, unless `client.decompress` is false
+        object_info = (lambda: client.object_info(o.name, container_name=container_name)) if client.decompress else None
+        if path_stat is not None and unchanged(path, path_stat[1], o, o.last_modified > path_stat[1].st_mtime, checksum, object_info):
+            skipped += 1
+        else:
+            actions.append(SyncAction('download', o.name, path, o.bytes, o.last_modified))
+    if delete:
+        actions.extend(SyncAction('delete', None, path) for path, _ in sorted(local.values()))
+    return actions, skipped
+
+def run_actions(client: ObjectStorageClient, actions: Iterable[SyncAction], container_name: str, concurrency: int = None,
+        dry_run: bool = False, callback: Callable[[SyncAction, bool], None] = None, destination_container: str = None) -> SyncResult:
+    """
+    Run the transfers on a worker pool of `concurrency` threads (`client.max_connections` by default), then the deletions.
+    Transfers run on their own pool: the client pool is used by each transfer for its parts (multipart uploads, ranged downloads).
+    Actions are pulled from `actions` as transfers complete, so a lazy input (tree walk, listing) is never held in memory.
+
+    @param `callback` called with each action and its success once done
+    @param `destination_container` container of the copies (copies and moves)
+    """
+    result = SyncResult(dry_run=dry_run)
+    start = time.monotonic()
+
+    def done(action: SyncAction, ok: bool):
+        if ok and action.action == 'delete':
+            result.deleted += 1
+        elif ok:
+            result.transferred += 1
+            result.transferred_bytes += action.bytes
+        else:
+            result.failed.append(action.name or action.path)
+        if callback is not None:
+            callback(action, ok)
+
+    if dry_run:
+        for a in actions:
+            done(a, True)
+        result.seconds = time.monotonic() - start
+        return result
+
+    def transfer_done(future):
+        try:
+            ok = future.result()
+        except Exception as e:
+            print(f"sync: {pending[future].name}: {e}")
+            ok = False
+        done(pending.pop(future), ok)
+
+    workers = concurrency or client.max_connections
+    deletions = []
+    pending = {} # future -> action
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for a in actions:
+            if a.action == 'delete':
+                deletions.append(a)
+                continue
+            if len(pending) >= 2 * workers: # Keep the workers busy without queuing the whole input
+                for future in wait(pending, return_when=FIRST_COMPLETED).done:
+                    transfer_done(future)
+            pending[executor.submit(_transfer, client, a, container_name, destination_container)] = a
+        while pending:
+            for future in wait(pending, return_when=FIRST_COMPLETED).done:
+                transfer_done(future)
+
+    remote_deletions = {a.name: a for a in deletions if a.name is not None}
+    for name, ok in client.object_delete_iter(remote_deletions, container_name=container_name):
+        done(remote_deletions[name], ok)
+    for a in deletions:
+        if a.name is None:
+            try:
+                os.remove(a.path)
+                done(a, True)
+            except OSError as e:
+                print(f"sync: {a.path}: {e}")
+                done(a, False)
+
+    result.seconds = time.monotonic() - start
+    return result
+
+def _transfer(client: ObjectStorageClient, action: SyncAction, container_name: str, destination_container: str = None) -> bool:
+    if action.action == 'upload':
+        # The ETag of a compressed object is not the MD5 of the file, record it for the next syncs (see `unchanged()`)
+        metadata = dict(action.metadata or {})
+        if client.compression is not None:
+            metadata[MD5_METADATA] = file_md5(action.path)
+        return client.upload_file(action.path, action.name, metadata=metadata, container_name=container_name)
+    if action.action == 'copy':
+        return client.object_copy(action.name, action.destination, container_name, destination_container)
+    if action.action == 'move':
+        return client.object_move(action.name, action.destination, container_name, destination_container)
+
+    # Download next to the target and move it in place once complete, so that a failure does not leave a truncated file
+    os.makedirs(os.path.dirname(action.path) or '.', exist_ok=True)
+    part_path = action.path + '.part'
+    parallel = action.bytes > client.multipart_threshold
+    if not client.download_file(action.name, part_path, container_name=container_name, parallel=parallel):
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        return False
+    if action.last_modified is not None:
+        os.utime(part_path, (action.last_modified, action.last_modified)) # So that the next sync sees the file as up to date
+    os.replace(part_path, action.path)
+    return True
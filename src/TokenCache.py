@@ -0,0 +1,83 @@
+
+import contextlib, hashlib, json, os, tempfile, time
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError: # Windows: no inter-process locking
+    fcntl = None
+
+DEFAULT_TOKEN_CACHE_PATH = os.path.join(os.getenv('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'obs_client', 'swift-tokens.json')
+TOKEN_EXPIRY_MARGIN = 60 # Tokens expiring in less than that many seconds are not reused
+
+class TokenCache:
+    """
+    Authentication tokens saved on disk so they can be reused by other clients and processes until they
+    expire. The file is only readable by its owner and accesses are serialized with a lock file.
+    """
+
+    def __init__(self, path: str = DEFAULT_TOKEN_CACHE_PATH):
+        self.path = path
+
+    @staticmethod
+    def key(*fields) -> str:
+        """Build a cache key from the fields identifying the credentials (auth url, user, project, region...)"""
+        return hashlib.sha256(json.dumps(fields).encode()).hexdigest()
+
+    @contextlib.contextmanager
+    def locked(self):
+        """Hold the cache lock (the other processes wait for it in `locked()`)"""
+        os.makedirs(os.path.dirname(self.path), mode=0o700, exist_ok=True)
+        with os.fdopen(os.open(self.path + '.lock', os.O_RDWR | os.O_CREAT, 0o600)) as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key: str) -> dict|None:
+        """
+        Return the entry saved for `key`
+
+        @return the entry or None if there is none or it is about to expire
+        """
+        entry = self._read().get(key)
+        if entry is None or entry.get('expires_at', 0) - TOKEN_EXPIRY_MARGIN < time.time():
+            return None
+        return entry
+
+    def put(self, key: str, entry: dict):
+        """
+        Save an entry, which must have an `expires_at` timestamp. The file is replaced atomically
+        and the expired entries are dropped.
+        """
+        entries = {k: e for k, e in self._read().items() if e.get('expires_at', 0) > time.time()}
+        entries[key] = entry
+
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.swift-tokens') # Created with 0600 permissions
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"TokenCache: could not save token: {e}")
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+
+
+def parse_expiry(expires_at: str|None) -> float|None:
+    """Convert a Keystone `expires_at` date (ex: "2022-12-13T18:05:00.000000Z") to a timestamp"""
+    if not expires_at:
+        return None
+    return datetime.fromisoformat(expires_at.replace('Z', '+00:00')).timestamp()
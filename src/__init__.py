@@ -1,3 +1,43 @@
 from .ObjectStorageClient import *
-from .SwiftClient import *
-from .S3Client import *
\ No newline at end of file
+
+import sys as _sys, types as _types
+
+# The backend modules are imported on first use, so that only the dependencies of the backend
+# actually used are loaded (boto3 and requests take most of the import time)
+_LAZY_IMPORTS = {
+    'SwiftClient': 'SwiftClient',
+    'SwiftCredentials': 'SwiftClient',
+    'S3Client': 'S3Client',
+    'TokenCache': 'TokenCache',
+    'CachedClient': 'CachedClient',
+    'DiskCache': 'CachedClient',
+    'AsyncObjectStorageClient': 'AsyncObjectStorageClient',
+    'AsyncSwiftClient': 'AsyncSwiftClient',
+    'AsyncS3Client': 'AsyncS3Client',
+}
+
+def _exported(value) -> bool:
+    # The star import above also brings the modules, classes and functions imported by ObjectStorageClient
+    if isinstance(value, _types.ModuleType):
+        return False
+    return not callable(value) or getattr(value, '__module__', '').startswith(f'{__name__}.')
+
+# `from obs_client import *` imports the synchronous clients (the asyncio ones need optional dependencies)
+__all__ = [name for name, value in globals().items() if not name.startswith('_') and _exported(value)] \
+    + ['SwiftClient', 'SwiftCredentials', 'S3Client', 'TokenCache', 'CachedClient', 'DiskCache', 'AsyncObjectStorageClient']
+
+def __getattr__(name: str):
+    if name in _LAZY_IMPORTS:
+        import importlib
+        importlib.import_module(f'.{_LAZY_IMPORTS[name]}', __name__)
+        # Importing a submodule binds it to the package, hiding the class of the same name: bind the classes
+        # of all the submodules loaded so far (the backends import each other)
+        for lazy_name, module_name in _LAZY_IMPORTS.items():
+            module = _sys.modules.get(f'{__name__}.{module_name}')
+            if module is not None and (lazy_name not in globals() or isinstance(globals()[lazy_name], _types.ModuleType)):
+                globals()[lazy_name] = getattr(module, lazy_name)
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_IMPORTS))
@@ -2,21 +2,25 @@
 #   CLI code
 #
 
-import argparse, os, sys
+import argparse, atexit, os, sys
 
-from .SwiftClient import *
-from .S3Client import *
+from .ObjectStorageClient import *
+from .Codec import CODECS, Codec
 
 
 CLI_VERSION = "0.6"
 LIB_VERSION = "2.1.0 " # Sync with version in setup.cfg
 
+NAME_COLUMN_WIDTH = 50 # Object listings are streamed, the name column can't be sized on the longest name
+
 parser = argparse.ArgumentParser(
     prog="obs_client",
     description="Object Storage Client CLI tool that simplify managing object storage",
     epilog="This is an open source project: https://github.com/Totalus/object-storage-client"
 )
 
+parser.add_argument('--stats', action="store_true", help="Print request statistics (counts, latencies, bytes, errors) on stderr after the command")
+
 subparsers = parser.add_subparsers(dest="command", required=True, metavar='<command>', title="Commands", help="Operation to execute")
 
 sp = subparsers.add_parser('version', help='Print version')
@@ -32,25 +36,54 @@ sp.add_argument('container', metavar='<container>' , help="Container name")
 sp.add_argument('--force', action="store_true", help="Delete container and all of its objects")
 
 sp = subparsers.add_parser('upload', help="Upload a file (or from stdin if --file unspecified)")
-sp.add_argument('--file', '-f', metavar='<file path>', help="Local file to upload")
+sp.add_argument('--file', '-f', metavar='<file path>', help="Local file to upload (or directory with --recursive)")
+sp.add_argument('--recursive', '-r', action="store_true", help="Upload all the files of the --file directory, named `<object path>/<relative file path>`")
+sp.add_argument('--concurrency', metavar='<count>', type=int, help="Number of files uploaded in parallel with --recursive (10 by default)")
 sp.add_argument('object', metavar='<object path>', help="Target object path. If --container is not specified, the first part of the <object path> is assumed to be the container name (i.e. `<object path> = <container name>/<object name>`)")
 sp.add_argument('--container', metavar='<container name>', help="Container name. Optionally you can specify the container name in the object path instead (ex: <container>/<object_name>)")
 sp.add_argument('--meta', '-m', metavar='<key>=<value>', help="Metadata key-value pairs", action="append", default=[])
+sp.add_argument('--compress', choices=CODECS, help="Compress the data as it is uploaded (decoded automatically on download)")
+sp.add_argument('--compress-level', metavar='<level>', type=int, help="Compression level (6 for gzip, 3 for zstd by default)")
 
 sp = subparsers.add_parser('download', help="Download a file")
 sp.add_argument('object', metavar='<object path>', help="Object to download (`<container name>/<object name>`, unless --container is specified)")
-sp.add_argument('--file', metavar='<file path>', help="Target file")
+sp.add_argument('--file', metavar='<file path>', help="Target file (or directory with --recursive)")
+sp.add_argument('--recursive', '-r', action="store_true", help="Download all the objects under the <object path> prefix to the --file directory")
+sp.add_argument('--chunk-size', metavar='<bytes>', type=int, help="Size of the download buffer (4 MiB by default)")
+sp.add_argument('--parallel', action="store_true", help="Download byte ranges over several connections (requires --file)")
+sp.add_argument('--parts', metavar='<count>', type=int, help="Number of byte ranges for --parallel (one per 16 MiB by default)")
+sp.add_argument('--concurrency', metavar='<count>', type=int, help="Number of simultaneous connections for --parallel (8 by default), or of files downloaded in parallel with --recursive (10 by default)")
+sp.add_argument('--raw', action="store_true", help="Do not decode the objects uploaded with --compress")
 sp.add_argument('--container', metavar='<container name>', help="Container name. Optionally you can specify the container name in the object path instead (ex: <container>/<object_name>)")
 
+sp = subparsers.add_parser('sync', help="Synchronize a local directory and a container (only the missing or changed files are transferred)")
+sp.add_argument('source', metavar='<source>', help="Local directory to upload, or `<container>/<prefix>` to download")
+sp.add_argument('destination', metavar='<destination>', help="`<container>/<prefix>` to upload to, or local directory to download to")
+direction = sp.add_mutually_exclusive_group()
+direction.add_argument('--up', action="store_true", help="Upload the <source> directory to <destination> (required when the direction is ambiguous)")
+direction.add_argument('--down', action="store_true", help="Download <source> to the <destination> directory (required when the direction is ambiguous)")
+sp.add_argument('--delete', action="store_true", help="Delete the destination files or objects that do not exist in the source")
+sp.add_argument('--dry-run', '-n', action="store_true", help="Only print what would be transferred or deleted")
+sp.add_argument('--checksum', '-c', action="store_true", help="Compare the MD5 of files of the same size, even when their modification time did not change")
+sp.add_argument('--concurrency', metavar='<count>', type=int, help="Number of files transferred in parallel")
+
 sp = subparsers.add_parser('object-download-url', help="Generate a signed temporary download link for an object")
 sp.add_argument('object', metavar='<object path>', help="Object to download (`<container name>/<object name>`, unless --container is specified)")
 sp.add_argument('--container', metavar='<container name>', help="Container name. Optionally you can specify the container name in the object path instead (ex: <container>/<object_name>)")
 sp.add_argument('--expires-in', '-e', metavar='<seconds>', help="Link will become invalid after this number of seconds")
 
-sp = subparsers.add_parser('object-delete', help="Delete an object")
-sp.add_argument('object', metavar='<object name>', help="Object name")
+sp = subparsers.add_parser('object-delete', help="Delete an object (or all the objects with a prefix with --recursive)")
+sp.add_argument('object', metavar='<object name>', help="Object name (or prefix with --recursive)")
+sp.add_argument('--recursive', '-r', action="store_true", help="Delete all the objects whose name starts with <object name>")
 sp.add_argument('--container', metavar='<container name>', help="Container name. Optionally you can specify the container name in the object path instead (ex: <container>/<object_name>)")
 
+for command, verb, done in [('copy', 'Copy', 'copied'), ('move', 'Move', 'moved')]:
+    sp = subparsers.add_parser(command, help=f"{verb} an object (or all the objects with a prefix with --recursive) on the server side, without downloading it")
+    sp.add_argument('source', metavar='<source path>', help="`<container name>/<object name>` (or prefix with --recursive)")
+    sp.add_argument('destination', metavar='<destination path>', help="`<container name>/<object name>` (or prefix with --recursive)")
+    sp.add_argument('--recursive', '-r', action="store_true", help=f"{verb} all the objects whose name starts with the source object name")
+    sp.add_argument('--concurrency', metavar='<count>', type=int, help=f"Number of objects {done} in parallel with --recursive (10 by default)")
+
 sp = subparsers.add_parser('ls', help="List containers and objects as if it was the file system.")
 sp.add_argument('path', nargs='?')
 
@@ -77,7 +110,11 @@ CONFIGURATION_HELP_TEXT = """
     - Ensure your OpenStack credentials are available in the environment
 """
 
-def verify_configuration() -> ObjectStorageClient:
+def verify_configuration(max_connections: int = None) -> ObjectStorageClient:
+    """
+    @param `max_connections` size of the connection pool (the default of the client if None)
+    """
+    options = {'max_connections': max_connections} if max_connections else {}
 
     swift_region = os.environ.get('OBS_SWIFT_REGION')
     s3_location = os.environ.get('OBS_S3_LOCATION')
@@ -92,12 +129,16 @@ def verify_configuration() -> ObjectStorageClient:
         print(CONFIGURATION_HELP_TEXT)
         exit()
 
+    # Only the configured backend (and its dependencies) is imported
     if swift_region is not None:
-        return SwiftClient(region=os.environ.get('OBS_SWIFT_REGION'))
+        from .SwiftClient import SwiftClient
+        return SwiftClient(region=os.environ.get('OBS_SWIFT_REGION'), **options)
     elif s3_location is not None:
+        from .S3Client import S3Client
         return S3Client(
             location=os.environ.get('OBS_S3_LOCATION'),
-            endpoint_url=os.environ.get('OBS_S3_ENDPOINT_URL')
+            endpoint_url=os.environ.get('OBS_S3_ENDPOINT_URL'),
+            **options
         )
 
 if __name__ == "__main__":
@@ -107,12 +148,18 @@ if __name__ == "__main__":
         print(f'Universal Object Storage LIB: {LIB_VERSION}')
         exit()
 
-    client = verify_configuration() # Returns the client (or exits the script on misconfiguration)
+    # File transfers in parallel need as many connections
+    parallel_files = args.command == 'sync' or (args.command in ['upload', 'download', 'copy', 'move'] and args.recursive)
+    client = verify_configuration(args.concurrency if parallel_files else None) # Returns the client (or exits the script on misconfiguration)
+
+    if args.stats:
+        metrics = client.enable_metrics()
+        atexit.register(lambda: print(metrics.summary(), file=sys.stderr)) # Also printed when the command calls exit()
 
     if args.command == "test-config":
-        if isinstance(client, SwiftClient):
+        if type(client).__name__ == 'SwiftClient':
             print(f'Connecting to OpenStack Swift (region={client.region})')
-        elif isinstance(client, S3Client):
+        elif type(client).__name__ == 'S3Client':
             print(f'Connecting to AWS S3 (location={client.location}{f", endpoint={client.endpoint_url}" if client.endpoint_url else ""})')
 
         client.container_list() # Assume it throws an error on failure
@@ -165,7 +212,25 @@ if __name__ == "__main__":
                 print(f'Metadata synthax error: `{m}`')
                 exit()
 
-        if args.file is not None:
+        if args.compress is not None:
+            try:
+                Codec(args.compress) # Check that the codec is available
+            except ImportError as e:
+                print(e)
+                exit(1)
+            client.compression, client.compression_level = args.compress, args.compress_level
+
+        if args.recursive:
+            if args.file is None or not os.path.isdir(args.file):
+                print('--recursive requires a directory to upload (--file <directory>)')
+                exit()
+            print(f'Uploading {args.file} to {container}/{object_path}')
+            result = client.upload_directory(args.file, object_path, container_name=container, concurrency=args.concurrency,
+                callback=lambda action, ok: ok or print(f'Upload failed: {action.path}'), metadata=meta)
+            print(result.summary())
+            if result.failed:
+                exit(1)
+        elif args.file is not None:
             print(f'Uploading: {container}/{object_path}')
             with open(args.file, 'rb') as f:
                 if client.object_upload(f, object_path, container_name=container, metadata=meta):
@@ -174,10 +239,13 @@ if __name__ == "__main__":
                     print('Upload failed')
         else:
             print(f'Uploading {container}/{object_path} from stdin')
-            if client.object_upload(sys.stdin.buffer, object_path, container_name=container, metadata=meta):
+            try:
+                # Streamed in parts: the size of stdin is unknown and it is never held in memory
+                with client.object_open(object_path, container, mode='wb', metadata=meta) as f:
+                    copy_stream(sys.stdin.buffer, f)
                 print(f'Upload complete: {container}/{object_path}')
-            else:
-                print('Upload failed')
+            except OSError as e:
+                print(f'Upload failed: {e}')
         
     elif args.command == "download":
         object_path = args.object
@@ -188,17 +256,60 @@ if __name__ == "__main__":
             container = object_path.split('/')[0]
             object_path = '/'.join(object_path.split('/')[1:])
 
-        if args.file:
+        client.decompress = not args.raw
+        if args.recursive:
+            if args.file is None:
+                print('--recursive requires a target directory (--file <directory>)')
+                exit()
             print(f'Downloading {container}/{object_path} to {args.file}')
-            with open(args.file, 'wb') as f:
-                if client.object_download(object_path, f, container_name=container):
-                    print('Download complete:', args.file)
-                else:
-                    print('Download failed')
+            result = client.download_directory(args.file, object_path, container_name=container, concurrency=args.concurrency,
+                callback=lambda action, ok: ok or print(f'Download failed: {container}/{action.name}'))
+            print(result.summary())
+            if result.failed:
+                exit(1)
+        elif args.file:
+            print(f'Downloading {container}/{object_path} to {args.file}')
+            if client.download_file(object_path, args.file, container_name=container, chunk_size=args.chunk_size, parallel=args.parallel, parts=args.parts, concurrency=args.concurrency):
+                print('Download complete:', args.file)
+            else:
+                print('Download failed')
         else:
-            if not client.object_download(object_path, sys.stdout.buffer, container_name=container):
+            if not client.object_download(object_path, sys.stdout.buffer, container_name=container, chunk_size=args.chunk_size):
                 print('Download failed', file=sys.stderr)
 
+    elif args.command == "sync":
+        def print_action(action, ok):
+            name = f'{container}/{action.name}' if action.name is not None else action.path
+            print(f"{'(dry run) ' if args.dry_run else ''}{action.action}: {name}{'' if ok else ' FAILED'}")
+
+        # Without --up or --down, the local side must be an existing directory and the other side must not be a local path,
+        # so that a mistyped directory is not taken for a container (and emptied by --delete)
+        if args.up or args.down:
+            upload = args.up
+        elif os.path.isdir(args.source) and not os.path.exists(args.destination):
+            upload = True
+        elif os.path.isdir(args.destination) and not os.path.exists(args.source):
+            upload = False
+        else:
+            print('Cannot tell which side is the local directory: specify --up (upload <source>) or --down (download to <destination>)')
+            exit(1)
+        if upload and not os.path.isdir(args.source):
+            print(f'{args.source} is not a directory')
+            exit(1)
+        path = args.destination if upload else args.source
+        container = path.split('/')[0]
+        prefix = '/'.join(path.split('/')[1:])
+
+        if upload:
+            result = client.sync_upload(args.source, prefix, container_name=container, delete=args.delete, dry_run=args.dry_run,
+                checksum=args.checksum, concurrency=args.concurrency, callback=print_action)
+        else:
+            result = client.sync_download(args.destination, prefix, container_name=container, delete=args.delete, dry_run=args.dry_run,
+                checksum=args.checksum, concurrency=args.concurrency, callback=print_action)
+        print(result.summary())
+        if result.failed:
+            exit(1)
+
     elif args.command == "object-download-url":
         object_path = args.object
         if args.container is not None:
@@ -270,6 +381,23 @@ if __name__ == "__main__":
             container = object_path.split('/')[0]
             object_path = '/'.join(object_path.split('/')[1:])
 
+        if args.recursive:
+            confirm = input(f'WARNING: You are about to delete all the objects starting with "{object_path}" in container "{container}". Are you sure ? [y/N]: ')
+            if confirm.lower() not in ['y', 'yes']:
+                print('Aborting operation')
+                exit()
+
+            deleted, failed = 0, 0
+            names = (o.name for o in client.object_iter(prefix=object_path, container_name=container))
+            for name, ok in client.object_delete_iter(names, container_name=container):
+                if ok:
+                    deleted += 1
+                else:
+                    failed += 1
+                    print(f'Object delete failure: {container}/{name}')
+            print(f'{deleted} objects deleted' + (f', {failed} failures' if failed else ''))
+            exit()
+
         info = client.object_info(object_name=object_path, container_name=container)
         if info is None:
             print(f'Object `{object_path}` does not exist in container `{container}`')
@@ -280,6 +408,24 @@ if __name__ == "__main__":
         else:
             print(f'Object delete failure')
     
+    elif args.command in ["copy", "move"]:
+        source_container, source = args.source.split('/')[0], '/'.join(args.source.split('/')[1:])
+        container, destination = args.destination.split('/')[0], '/'.join(args.destination.split('/')[1:])
+        move = args.command == "move"
+
+        if args.recursive:
+            result = client.object_copy_prefix(source, destination, source_container, container, move=move, concurrency=args.concurrency,
+                callback=lambda action, ok: ok or print(f'{args.command} failed: {source_container}/{action.name}'))
+            print(f"{result.transferred} objects {'moved' if move else 'copied'} ({result.transferred_bytes / 1024 / 1024:.1f} MiB) in {result.seconds:.1f}s"
+                + (f', {len(result.failed)} failures' if result.failed else ''))
+            if result.failed:
+                exit(1)
+        elif (client.object_move if move else client.object_copy)(source, destination, source_container, container):
+            print(f"Object {'moved' if move else 'copied'}: {source_container}/{source} -> {container}/{destination}")
+        else:
+            print(f"Object {args.command} failure")
+            exit(1)
+
     elif args.command == "ls":
         if args.path is None:
             res = client.container_list()
@@ -300,18 +446,16 @@ if __name__ == "__main__":
             elif not object_path.endswith('/') and len(object_path) > 0 and client.object_info(container_name=container, object_name=object_path) == None:
                 object_path += '/' # Assume folder name
 
-            res = client.object_list(container_name=container, delimiter='/', prefix=object_path)
+            # Entries are printed as they are listed, so the name column has a fixed width
             prefix_to_remove = '/'.join(object_path.split('/')[0:-1])
             if len(prefix_to_remove) > 0: prefix_to_remove += '/'
-            if len(res) > 0:
-                maxLen = max([ len(i.subdir if type(i) == SubdirInfo else i.name) for i in res])
-            for i in res:
+            for i in client.object_iter(container_name=container, delimiter='/', prefix=object_path):
                 if type(i) == SubdirInfo:
                     subdir = i.subdir[len(prefix_to_remove):]
                     print(f'{subdir}')
                 else: # ObjectInfo
                     name = i.name[len(prefix_to_remove):]
-                    print(f'{name.ljust(maxLen)}  {str(i.bytes).rjust(10)} bytes')
+                    print(f'{name.ljust(NAME_COLUMN_WIDTH)}  {str(i.bytes).rjust(10)} bytes')
     
     elif args.command == "list":
         if args.path is None:
@@ -328,14 +472,12 @@ if __name__ == "__main__":
             container = args.path.split('/')[0]
             object_path: str = '/'.join(args.path.split('/')[1:])
 
-            res = client.object_list(container_name=container, prefix=object_path)
-
-            print(f'--- {len(res)} objects ---')
-
-            if len(res) > 0:
-                maxLen = max([ len(i.subdir if type(i) == SubdirInfo else i.name) for i in res])
-            for i in res:
+            count = 0
+            for i in client.object_iter(container_name=container, prefix=object_path):
+                count += 1
                 if type(i) == SubdirInfo:
                     print(f'{i.subdir}')
                 else: # ObjectInfo
-                    print(f'{i.name.ljust(maxLen)}  {str(i.bytes).rjust(10)} bytes')
\ No newline at end of file
+                    print(f'{i.name.ljust(NAME_COLUMN_WIDTH)}  {str(i.bytes).rjust(10)} bytes')
+
+            print(f'--- {count} objects ---')
\ No newline at end of file
@@ -0,0 +1,238 @@
+#
+#   Offline benchmark of the clients, against local stand-ins of the storage backends:
+#   - S3: moto server (`pip install moto[server]`), or any S3 compatible endpoint with --s3-endpoint-url (ex: MinIO)
+#   - Swift: the in-memory Swift + Keystone server of `tests/fake_swift.py`
+#
+#   python -m tests.benchmark [s3] [swift] [--output results.json] [--compare previous.json]
+#
+#   The stand-ins run in the benchmark process and keep the data in memory: the numbers measure the client
+#   overhead (and the stand-in), not a real network. Compare results of the same machine and options only.
+#
+
+import argparse, configparser, io, json, logging, os, platform, statistics, subprocess, sys, tempfile, time
+from datetime import datetime, timezone
+
+from tests.fake_swift import FakeSwiftServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SIZES = '4K,1M,16M,100M'
+TRANSFER_BYTES = 64 * 1024 * 1024 # Bytes transferred per object size (at least one object)
+MAX_TRANSFERS = 100 # Maximum number of objects transferred per object size
+S3_LOCATION = 'us-west-2'
+
+def parse_size(value: str) -> int:
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    value = value.strip().upper()
+    return int(float(value[:-1]) * units[value[-1]]) if value[-1] in units else int(value)
+
+def format_size(n: int) -> str:
+    for unit in ['B', 'K', 'M', 'G']:
+        if n < 1024 or unit == 'G':
+            return f'{n:g}{unit}' if unit != 'B' else f'{n}B'
+        n /= 1024
+
+
+#
+#   Backends
+#
+
+def start_s3(endpoint_url: str = None):
+    """
+    @return (S3 client, environment of the CLI, function stopping the stand-in), or None if moto is not installed
+    """
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'benchmark')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'benchmark')
+    stop = lambda: None
+    if endpoint_url is None:
+        try:
+            from moto.server import ThreadedMotoServer
+        except ImportError:
+            print('Skipping S3: moto is not installed (pip install moto[server]), or use --s3-endpoint-url')
+            return None
+        logging.getLogger('werkzeug').setLevel(logging.ERROR) # Request log of the moto server
+        server = ThreadedMotoServer(ip_address='127.0.0.1', port=0, verbose=False)
+        server.start()
+        host, port = server.get_host_and_port()
+        endpoint_url = f'http://{host}:{port}'
+        stop = server.stop
+
+    from src.S3Client import S3Client
+    env = {'OBS_S3_LOCATION': S3_LOCATION, 'OBS_S3_ENDPOINT_URL': endpoint_url}
+    return S3Client(S3_LOCATION, endpoint_url), env, stop
+
+def start_swift(token_cache: str):
+    """@return (Swift client, environment of the CLI, function stopping the stand-in)"""
+    server = FakeSwiftServer().start()
+    from src.SwiftClient import SwiftClient
+    env = {'OBS_SWIFT_REGION': server.region, 'XDG_CACHE_HOME': os.path.dirname(token_cache), **server.credentials()}
+    return SwiftClient(server.region, server.credentials(), token_cache=token_cache), env, server.stop
+
+
+#
+#   Measures
+#
+
+def bench_transfers(client, container: str, sizes: list[int]) -> dict:
+    """Sequential object_upload() / object_download() of objects of each size"""
+    results = {}
+    for size in sizes:
+        count = max(1, min(MAX_TRANSFERS, TRANSFER_BYTES // size))
+        data = os.urandom(size)
+        names = [f'transfer/{format_size(size)}/{i}' for i in range(count)]
+
+        start = time.perf_counter()
+        for name in names:
+            if not client.object_upload(io.BytesIO(data), name, container_name=container):
+                raise RuntimeError(f'upload of {name} failed')
+        upload = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for name in names:
+            out = io.BytesIO()
+            if not client.object_download(name, out, container_name=container) or out.getbuffer().nbytes != size:
+                raise RuntimeError(f'download of {name} failed')
+        download = time.perf_counter() - start
+
+        client.object_delete_many(names, container_name=container)
+        results[format_size(size)] = {
+            'bytes': size,
+            'objects': count,
+            'upload_mib_per_second': size * count / upload / 1024 ** 2,
+            'upload_objects_per_second': count / upload,
+            'download_mib_per_second': size * count / download / 1024 ** 2,
+            'download_objects_per_second': count / download,
+        }
+    return results
+
+def bench_objects(client, container: str, count: int) -> dict:
+    """Listing, metadata fetch (one HEAD per object) and deletion of `count` small objects"""
+    names = [f'listing/{i:08d}' for i in range(count)]
+    start = time.perf_counter()
+    uploaded = sum(client.executor.map(lambda name: client.object_upload(b'x', name, container_name=container), names))
+    populate = time.perf_counter() - start
+    if uploaded != count:
+        raise RuntimeError(f'only {uploaded} of {count} objects were uploaded')
+
+    start = time.perf_counter()
+    listed = sum(1 for _ in client.object_iter(prefix='listing/', container_name=container))
+    listing = time.perf_counter() - start
+
+    start = time.perf_counter()
+    infos = client.object_list(fetch_metadata=True, prefix='listing/', container_name=container)
+    fetch_metadata = time.perf_counter() - start
+
+    start = time.perf_counter()
+    deleted = sum(ok for _, ok in client.object_delete_iter(names, container_name=container))
+    delete = time.perf_counter() - start
+    if listed != count or len(infos) != count or deleted != count:
+        raise RuntimeError(f'listed {listed}, fetched {len(infos)}, deleted {deleted} of {count} objects')
+
+    return {
+        'objects': count,
+        'upload_parallel_objects_per_second': count / populate,
+        'list_keys_per_second': count / listing,
+        'fetch_metadata_objects_per_second': count / fetch_metadata,
+        'delete_objects_per_second': count / delete,
+    }
+
+def bench_cli(env: dict, container: str, runs: int) -> dict:
+    """Wall time of CLI commands, the interpreter startup included (median of `runs`)"""
+    env = {**os.environ, **env}
+    results = {}
+    for name, command in [('version', ['version']), ('list', ['list', container])]:
+        durations = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, '-m', 'src', *command], cwd=ROOT, env=env, capture_output=True, check=True)
+            durations.append(time.perf_counter() - start)
+        results[f'{name}_median_ms'] = statistics.median(durations) * 1000
+        results[f'{name}_min_ms'] = min(durations) * 1000
+    return results
+
+def run_backend(client, env: dict, args) -> dict:
+    container = f'obs-client-benchmark-{int(time.time())}'
+    client.container_create(container)
+    try:
+        return {
+            'transfers': bench_transfers(client, container, [parse_size(s) for s in args.sizes.split(',')]),
+            'objects': bench_objects(client, container, args.objects),
+            'cli': bench_cli(env, container, args.cli_runs),
+        }
+    finally:
+        client.container_delete(container, force=True)
+        client.close()
+
+
+#
+#   Report
+#
+
+def flatten(results: dict, prefix: str = '') -> dict:
+    """{'a': {'b': 1}} -> {'a.b': 1}"""
+    out = {}
+    for k, v in results.items():
+        if isinstance(v, dict):
+            out.update(flatten(v, f'{prefix}{k}.'))
+        else:
+            out[f'{prefix}{k}'] = v
+    return out
+
+def print_report(results: dict, previous: dict = None):
+    current = flatten(results['backends'])
+    previous = flatten(previous['backends']) if previous else {}
+    for key, value in current.items():
+        if key.endswith(('.bytes', '.objects')):
+            continue
+        line = f'{key:60} {value:12.1f}'
+        if isinstance(previous.get(key), (int, float)) and previous[key]:
+            line += f'   {(value - previous[key]) / previous[key] * 100:+6.1f}%'
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog='python -m tests.benchmark', description='Benchmark the clients against local stand-ins of S3 and Swift')
+    parser.add_argument('backends', nargs='*', metavar='backend', help='Backends to benchmark: s3, swift (all by default)')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help=f'Object sizes of the transfer benchmark (default: {DEFAULT_SIZES})')
+    parser.add_argument('--objects', type=int, default=2000, help='Number of objects of the listing, metadata and delete benchmarks (default: 2000)')
+    parser.add_argument('--cli-runs', type=int, default=5, help='Number of runs of each CLI command (default: 5)')
+    parser.add_argument('--s3-endpoint-url', help='Benchmark this S3 compatible endpoint instead of a moto server')
+    parser.add_argument('--output', '-o', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON results of a previous run, to print the relative changes')
+    args = parser.parse_args()
+    if set(args.backends) - {'s3', 'swift'}:
+        parser.error('backends are s3 and swift')
+
+    setup = configparser.ConfigParser()
+    setup.read(os.path.join(ROOT, 'setup.cfg'))
+    results = {
+        'version': setup.get('metadata', 'version', fallback=None),
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'options': {'sizes': args.sizes, 'objects': args.objects, 'cli_runs': args.cli_runs},
+        'backends': {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in args.backends or ['s3', 'swift']:
+            print(f'Benchmarking {backend}...', file=sys.stderr)
+            started = start_s3(args.s3_endpoint_url) if backend == 's3' else start_swift(os.path.join(tmp, 'obs_client', 'swift-tokens.json'))
+            if started is None:
+                continue
+            client, env, stop = started
+            try:
+                results['backends'][backend] = run_backend(client, env, args)
+            finally:
+                stop()
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    print_report(results, previous)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'Results written to {args.output}', file=sys.stderr)
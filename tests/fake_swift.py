@@ -0,0 +1,401 @@
+#
+#   In-memory OpenStack Swift + Keystone stand-in
+#
+#   Implements the subset of the Swift and Keystone v3 APIs used by SwiftClient so that it can be
+#   exercised without a cloud account (see `tests/benchmark.py`). Data is kept in memory and lost
+#   when the server stops.
+#
+#   Standalone: python -m tests.fake_swift [port]
+#
+
+import hashlib, json, threading, time, uuid
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+
+ACCOUNT = 'AUTH_bench'
+
+
+class _Object:
+    def __init__(self, data: bytes, headers: dict, manifest: list = None):
+        self.data = data
+        self.content_type = headers.get('content-type') or 'application/octet-stream'
+        self.metadata = {k: v for k, v in headers.items() if k.startswith('x-object-meta-')}
+        self.timestamp = time.time()
+        self.manifest = manifest
+        if manifest is None:
+            self.etag = hashlib.md5(data).hexdigest()
+        else: # Static Large Object: MD5 of the segment Etags, quoted
+            self.etag = '"' + hashlib.md5(''.join(s['hash'] for s in manifest).encode()).hexdigest() + '"'
+
+
+
+class FakeSwiftServer:
+    """Threaded HTTP server that serves the fake Keystone and Swift endpoints"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, region: str = 'RegionOne', token_ttl: int = 3600):
+        self.region = region
+        self.token_ttl = token_ttl
+        self.tokens = {}        # token -> expiry (epoch seconds)
+        self.containers = {}    # name -> {object name -> _Object}
+        self.lock = threading.Lock()
+        self.auth_count = 0
+        self.request_count = 0
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def credentials(self) -> dict:
+        """Credentials to pass to SwiftClient"""
+        return {
+            'OS_AUTH_URL': f'{self.url}/v3/',
+            'OS_USERNAME': 'bench',
+            'OS_PASSWORD': 'bench',
+            'OS_USER_DOMAIN_NAME': 'Default',
+            'OS_PROJECT_DOMAIN_NAME': 'Default',
+            'OS_PROJECT_NAME': 'bench',
+        }
+
+    def start(self) -> 'FakeSwiftServer':
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def expire_tokens(self):
+        """Invalidate every issued token (the next storage requests get a 401)"""
+        with self.lock:
+            self.tokens.clear()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True # Headers and body are written separately, don't delay small replies
+
+            def log_message(self, *args):
+                pass
+
+            # Helpers
+
+            def _body(self) -> bytes:
+                if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+                    data = bytearray()
+                    while True:
+                        size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+                        if size == 0:
+                            self.rfile.readline()
+                            return bytes(data)
+                        data += self.rfile.read(size)
+                        self.rfile.readline()
+                return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+            def _reply(self, status: int, body: bytes = b'', headers: dict = {}, head: bool = False):
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                if 'Content-Length' not in headers:
+                    self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if body and not head:
+                    self.wfile.write(body)
+
+            def _json(self, status: int, payload, headers: dict = {}):
+                self._reply(status, json.dumps(payload).encode(), {'Content-Type': 'application/json', **headers})
+
+            def _route(self):
+                parts = urlsplit(self.path)
+                self.query = {k: v[-1] for k, v in parse_qs(parts.query, keep_blank_values=True).items()}
+                return unquote(parts.path)
+
+            def _authorized(self) -> bool:
+                with server.lock:
+                    server.request_count += 1
+                    expiry = server.tokens.get(self.headers.get('X-Auth-Token'))
+                if expiry is None or expiry < time.time():
+                    self._reply(401)
+                    return False
+                return True
+
+            def _split(self, path: str):
+                path = path[len(f'/v1/{ACCOUNT}'):].lstrip('/')
+                container, _, obj = path.partition('/')
+                return container, obj
+
+            def _object_body(self, obj: _Object) -> bytes:
+                if obj.manifest is None:
+                    return obj.data
+                data = bytearray()
+                for seg in obj.manifest:
+                    c, _, o = seg['name'].lstrip('/').partition('/')
+                    data += server.containers[c][o].data
+                return bytes(data)
+
+            def _object_headers(self, obj: _Object, size: int) -> dict:
+                headers = {
+                    'Content-Type': obj.content_type,
+                    'Content-Length': str(size),
+                    'X-Timestamp': f'{obj.timestamp:.5f}',
+                    'Last-Modified': formatdate(obj.timestamp, usegmt=True),
+                    'Accept-Ranges': 'bytes',
+                }
+                headers['Etag'] = obj.etag
+                if obj.manifest is not None:
+                    headers['X-Static-Large-Object'] = 'True'
+                for k, v in obj.metadata.items():
+                    headers['X-Object-Meta-' + k[len('x-object-meta-'):].title()] = v
+                return headers
+
+            def _not_modified(self, obj: _Object, etag: str) -> bool:
+                inm = self.headers.get('If-None-Match')
+                if inm is not None:
+                    return inm.strip('"') == etag.strip('"') or inm == '*'
+                ims = self.headers.get('If-Modified-Since')
+                if ims is not None:
+                    return int(obj.timestamp) <= parsedate_to_datetime(ims).timestamp()
+                return False
+
+            def _get_object(self, container, name, head=False):
+                obj = server.containers.get(container, {}).get(name)
+                if obj is None:
+                    return self._reply(404, head=head)
+                if self.query.get('multipart-manifest') == 'get' and obj.manifest is not None:
+                    body = json.dumps([{'name': s['name'], 'hash': s['hash'], 'bytes': s['bytes']} for s in obj.manifest]).encode()
+                    return self._reply(200, body, {'Content-Type': 'application/json', 'X-Static-Large-Object': 'True'}, head=head)
+                data = self._object_body(obj)
+                headers = self._object_headers(obj, len(data))
+                if self._not_modified(obj, headers['Etag']):
+                    del headers['Content-Length']
+                    return self._reply(304, b'', {'Etag': headers['Etag']})
+                if self.headers.get('If-Match') not in [None, '*'] and self.headers['If-Match'].strip('"') != headers['Etag'].strip('"'):
+                    return self._reply(412, head=head)
+                rng = self.headers.get('Range')
+                if rng and rng.startswith('bytes='):
+                    start, _, end = rng[6:].partition('-')
+                    if start == '':
+                        start, end = max(0, len(data) - int(end)), len(data) - 1
+                    else:
+                        start, end = int(start), min(int(end) if end else len(data) - 1, len(data) - 1)
+                    if start >= len(data):
+                        return self._reply(416, head=head)
+                    headers['Content-Range'] = f'bytes {start}-{end}/{len(data)}'
+                    headers['Content-Length'] = str(end - start + 1)
+                    return self._reply(206, data[start:end + 1], headers, head=head)
+                self._reply(200, data, headers, head=head)
+
+            def _list_container(self, container):
+                objects = server.containers.get(container)
+                if objects is None:
+                    return self._reply(404)
+                prefix = self.query.get('prefix', '')
+                delimiter = self.query.get('delimiter')
+                marker = self.query.get('marker', '')
+                end_marker = self.query.get('end_marker')
+                limit = min(int(self.query.get('limit', 10000)), 10000)
+                out = []
+                seen = set()
+                for name in sorted(objects):
+                    if not name.startswith(prefix) or name <= marker:
+                        continue
+                    if end_marker is not None and name >= end_marker:
+                        break
+                    if delimiter:
+                        i = name.find(delimiter, len(prefix))
+                        if i >= 0:
+                            subdir = name[:i + len(delimiter)]
+                            if subdir not in seen and subdir != marker and not marker.startswith(subdir):
+                                seen.add(subdir)
+                                out.append({'subdir': subdir})
+                            if len(out) >= limit:
+                                break
+                            continue
+                    o = objects[name]
+                    out.append({
+                        'name': name,
+                        'bytes': len(self._object_body(o)),
+                        'hash': o.etag.strip('"'),
+                        'content_type': o.content_type,
+                        'last_modified': datetime.fromtimestamp(o.timestamp, timezone.utc).replace(tzinfo=None).isoformat(),
+                    })
+                    if len(out) >= limit:
+                        break
+                if not out:
+                    return self._reply(204)
+                self._json(200, out)
+
+            def _bulk_delete(self):
+                names = [unquote(n) for n in self._body().decode().split('\n') if n.strip()]
+                deleted = not_found = 0
+                for n in names:
+                    c, _, o = n.lstrip('/').partition('/')
+                    with server.lock:
+                        if o in server.containers.get(c, {}):
+                            del server.containers[c][o]
+                            deleted += 1
+                        else:
+                            not_found += 1
+                self._json(200, {'Response Status': '200 OK', 'Number Deleted': deleted, 'Number Not Found': not_found, 'Errors': []})
+
+            # Verbs
+
+            def do_POST(self):
+                path = self._route()
+                if path.startswith('/v3/auth/tokens'):
+                    self._body()
+                    token = uuid.uuid4().hex
+                    expiry = time.time() + server.token_ttl
+                    with server.lock:
+                        server.tokens[token] = expiry
+                        server.auth_count += 1
+                    catalog = [{'type': 'object-store', 'endpoints': [
+                        {'interface': 'public', 'region': server.region, 'url': f'{server.url}/v1/{ACCOUNT}'}
+                    ]}]
+                    expires_at = datetime.fromtimestamp(expiry, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000000Z')
+                    return self._json(201, {'token': {'catalog': catalog, 'expires_at': expires_at}}, {'X-Subject-Token': token})
+                if not self._authorized():
+                    return
+                if 'bulk-delete' in self.query:
+                    return self._bulk_delete()
+                container, name = self._split(path)
+                self._body()
+                obj = server.containers.get(container, {}).get(name)
+                if obj is None:
+                    return self._reply(404)
+                obj.metadata = {k.lower(): v for k, v in self.headers.items() if k.lower().startswith('x-object-meta-')}
+                self._reply(202)
+
+            def do_HEAD(self):
+                path = self._route()
+                if not self._authorized():
+                    return
+                container, name = self._split(path)
+                if not name:
+                    objects = server.containers.get(container)
+                    if objects is None:
+                        return self._reply(404, head=True)
+                    return self._reply(204, headers={
+                        'X-Container-Object-Count': str(len(objects)),
+                        'X-Container-Bytes-Used': str(sum(len(o.data) for o in objects.values())),
+                    }, head=True)
+                self._get_object(container, name, head=True)
+
+            def do_GET(self):
+                path = self._route()
+                if not self._authorized():
+                    return
+                container, name = self._split(path)
+                if not container:
+                    prefix = self.query.get('prefix', '')
+                    return self._json(200, [
+                        {'name': c, 'count': len(o), 'bytes': sum(len(x.data) for x in o.values())}
+                        for c, o in sorted(server.containers.items()) if c.startswith(prefix)
+                    ])
+                if not name:
+                    return self._list_container(container)
+                self._get_object(container, name)
+
+            def do_PUT(self):
+                path = self._route()
+                body = self._body()
+                if not self._authorized():
+                    return
+                container, name = self._split(path)
+                if not name:
+                    with server.lock:
+                        if container in server.containers:
+                            return self._reply(202)
+                        server.containers[container] = {}
+                    return self._reply(201)
+                if container not in server.containers:
+                    return self._reply(404)
+                headers = {k.lower(): v for k, v in self.headers.items()}
+                copy_from = headers.get('x-copy-from')
+                if copy_from is not None:
+                    c, _, o = unquote(copy_from).lstrip('/').partition('/')
+                    src = server.containers.get(c, {}).get(o)
+                    if src is None:
+                        return self._reply(404)
+                    new = _Object(self._object_body(src), headers)
+                    if not new.metadata and headers.get('x-fresh-metadata') != 'true':
+                        new.metadata = dict(src.metadata)
+                    new.content_type = src.content_type
+                elif self.query.get('multipart-manifest') == 'put':
+                    manifest = []
+                    for seg in json.loads(body):
+                        c, _, o = seg['path'].lstrip('/').partition('/')
+                        s = server.containers.get(c, {}).get(o)
+                        if s is None or (seg.get('etag') and seg['etag'] != s.etag):
+                            return self._reply(400, b'Invalid SLO manifest')
+                        manifest.append({'name': seg['path'], 'hash': s.etag, 'bytes': len(s.data)})
+                    new = _Object(b'', headers, manifest)
+                else:
+                    if headers.get('etag') and headers['etag'].strip('"') != hashlib.md5(body).hexdigest():
+                        return self._reply(422)
+                    new = _Object(body, headers)
+                with server.lock:
+                    server.containers[container][name] = new
+                self._reply(201, headers={'Etag': new.etag})
+
+            def do_COPY(self):
+                path = self._route()
+                if not self._authorized():
+                    return
+                container, name = self._split(path)
+                src = server.containers.get(container, {}).get(name)
+                if src is None:
+                    return self._reply(404)
+                c, _, o = unquote(self.headers.get('Destination')).lstrip('/').partition('/')
+                if c not in server.containers:
+                    return self._reply(404)
+                headers = {k.lower(): v for k, v in self.headers.items()}
+                new = _Object(self._object_body(src), headers)
+                if headers.get('x-fresh-metadata') != 'true':
+                    new.metadata = {**src.metadata, **new.metadata}
+                new.content_type = src.content_type
+                with server.lock:
+                    server.containers[c][o] = new
+                self._reply(201)
+
+            def do_DELETE(self):
+                path = self._route()
+                if not self._authorized():
+                    return
+                container, name = self._split(path)
+                with server.lock:
+                    if not name:
+                        if container not in server.containers:
+                            return self._reply(404)
+                        if server.containers[container]:
+                            return self._reply(409)
+                        del server.containers[container]
+                        return self._reply(204)
+                    obj = server.containers.get(container, {}).get(name)
+                    if obj is None:
+                        return self._reply(404)
+                    if self.query.get('multipart-manifest') == 'delete':
+                        for seg in obj.manifest or []:
+                            c, _, o = seg['name'].lstrip('/').partition('/')
+                            server.containers.get(c, {}).pop(o, None)
+                        del server.containers[container][name]
+                        return self._json(200, {'Response Status': '200 OK', 'Number Deleted': len(obj.manifest or []) + 1, 'Number Not Found': 0, 'Errors': []})
+                    del server.containers[container][name]
+                self._reply(204)
+
+        return Handler
+
+
+if __name__ == '__main__':
+    import sys
+    server = FakeSwiftServer(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8088).start()
+    print(f'Fake Swift listening on {server.url}')
+    server.thread.join()
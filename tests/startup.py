@@ -0,0 +1,41 @@
+import os, sys, subprocess, statistics, time, unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ['boto3', 'botocore', 'requests', 'aiohttp', 'aiobotocore']
+
+def loaded_modules(code: str) -> set:
+    """Run `code` in a new python process and return the names of the modules in `sys.modules` when it exits"""
+    script = f"import atexit, sys\natexit.register(lambda: print(*(f'module:{{m}}' for m in sys.modules), sep='\\n'))\n{code}"
+    res = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True, check=True)
+    return {line.removeprefix('module:') for line in res.stdout.splitlines() if line.startswith('module:')}
+
+class StartupTests(unittest.TestCase):
+    """Check that the backend dependencies are only imported when a client is created"""
+
+    def test_library_import(self):
+        modules = loaded_modules('import src')
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, modules, f"importing the package should not import {module}")
+
+    def test_cli_version(self):
+        modules = loaded_modules("import runpy; sys.argv = ['obs_client', 'version']; runpy.run_module('src', run_name='__main__', alter_sys=True)")
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, modules, f"`version` should not import {module}")
+
+    def test_lazy_attributes(self):
+        modules = loaded_modules('import src; src.S3Client')
+        self.assertIn('boto3', modules)
+        self.assertNotIn('requests', modules, "creating an S3 client should not import the Swift dependencies")
+
+
+if __name__ == "__main__":
+    # Benchmark: python -m tests.startup [runs]
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    for command in [['-m', 'src', 'version'], ['-c', 'import src'], ['-c', 'import src; src.S3Client'], ['-c', 'import src; src.SwiftClient']]:
+        durations = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, *command], cwd=ROOT, capture_output=True, check=True)
+            durations.append(time.perf_counter() - start)
+        print(f"{' '.join(command):40} median {statistics.median(durations)*1000:7.1f} ms   min {min(durations)*1000:7.1f} ms")
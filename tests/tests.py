@@ -1,8 +1,10 @@
-import sys, unittest, os, io, random, string, warnings, time
+import sys, unittest, asyncio, os, io, random, string, shutil, warnings, time
 
-from src.ObjectStorageClient import ContainerInfo, ContainerNotSpecified, ObjectInfo, ObjectStorageClient, SubdirInfo
+from src.ObjectStorageClient import NOT_MODIFIED, ContainerInfo, ContainerNotSpecified, ObjectInfo, ObjectStorageClient, SubdirInfo
+from src.ETagHasher import ETagHasher
 from src.S3Client import S3Client
 from src.SwiftClient import SwiftClient
+from src.CachedClient import CachedClient
 
 def random_string(size: int = 10):
     return ''.join(random.choice(string.ascii_lowercase + string.digits) for _ in range(size))
@@ -92,6 +94,20 @@ class TestCases(unittest.TestCase):
         res = client.object_list(fetch_metadata=True, prefix=object_name)
 
         self.assertEqual(info, res[0])
+        self.assertEqual(list(client.object_info_many([random_string(20), object_name])), [None, info], 'object_info_many() should return the ObjectInfo (or None) of each object in the input order')
+
+        # Metadata cache
+        cache = client.enable_cache()
+        self.assertEqual(client.object_info(object_name), info)
+        self.assertEqual(client.object_info(object_name), info, 'object_info() should return the cached ObjectInfo when the cache is enabled')
+        self.assertEqual(cache.stats()['hits'], 1, 'object_info() should only HEAD the object once when the cache is enabled')
+        missing_name = random_string(20)
+        self.assertIsNone(client.object_info(missing_name))
+        self.assertIsNone(client.object_info(missing_name))
+        self.assertEqual(cache.stats()['hits'], 2, 'object_info() should cache that an object does not exist')
+        self.assertTrue(client.object_set_metadata(object_name, 'Key4', 'Value4'))
+        self.assertDictEqual(client.object_info(object_name).metadata, { 'key1': 'Value1', 'key4': 'Value4' }, 'updating the metadata should invalidate the cached ObjectInfo')
+        client.disable_cache()
 
         # play with metadata
         print(f'Updating metadata')
@@ -108,6 +124,33 @@ class TestCases(unittest.TestCase):
         self.assertTrue(client.object_delete_metadata(object_name, 'key2'), 'object_delete_metadata() should return true on success')
         self.assertDictEqual(client.object_info(object_name).metadata, { 'key3': 'Value3' }, 'object_delete_metadata() should properly delete the specified key without changing the other metadata values')
 
+        # File object
+        print(f'Reading through object_open()')
+        content = os.urandom(100000)
+        self.assertTrue(client.object_upload(io.BytesIO(content), 'open-object'))
+        with client.object_open('open-object', block_size=4096, readahead=8192) as f:
+            f.seek(50000)
+            self.assertEqual(f.read(100), content[50000:50100], 'object_open() should read at the seek position')
+            self.assertLessEqual(f.raw.bytes_fetched, 3 * 4096, 'object_open() should only download the blocks that are read (and buffered)')
+            f.seek(-10, os.SEEK_END)
+            self.assertEqual(f.read(), content[-10:])
+            f.seek(0)
+            self.assertEqual(f.read(), content, 'object_open() should read the whole object')
+        self.assertRaises(FileNotFoundError, client.object_open, random_string(20))
+        self.assertTrue(client.object_delete('open-object'))
+
+        # Conditional requests
+        print(f'Sending conditional requests')
+        info = client.object_info(object_name)
+        self.assertIs(client.object_info(object_name, if_none_match=info.hash), NOT_MODIFIED, 'object_info(if_none_match=...) should return NOT_MODIFIED if the ETag matches')
+        self.assertIsInstance(client.object_info(object_name, if_none_match=random_string(32)), ObjectInfo, 'object_info(if_none_match=...) should return the info if the ETag changed')
+        self.assertIs(client.object_info(object_name, if_modified_since=info.last_modified + 1), NOT_MODIFIED, 'object_info(if_modified_since=...) should return NOT_MODIFIED if the object was not modified')
+        stream = io.BytesIO()
+        self.assertIs(client.object_download(object_name, stream, if_none_match=info.hash), NOT_MODIFIED, 'object_download(if_none_match=...) should return NOT_MODIFIED if the ETag matches')
+        self.assertEqual(stream.getvalue(), b'', 'object_download() should not write anything when the object was not modified')
+        self.assertTrue(client.object_download(object_name, stream, if_modified_since=info.last_modified - 3600), 'object_download(if_modified_since=...) should download a modified object')
+        self.assertGreater(len(stream.getvalue()), 0)
+
         # Upload more objects
         print(f'Uploading more objects')
         client.object_upload(stream=io.BytesIO(os.urandom(100)), object_name='dir1/' + random_string())
@@ -117,6 +160,9 @@ class TestCases(unittest.TestCase):
         self.assertEqual(client.object_list(delimiter='/'), [SubdirInfo('dir1/')], 'object_list() with delimiter="/" should return a subdir')
         objects = client.object_list(prefix='dir1/', delimiter='/')
         self.assertIn(SubdirInfo(subdir='dir1/subdir2/'), objects, 'object_list() with delimiter and prefix should return the subdirs')
+        objects = client.object_list()
+        self.assertEqual(list(client.object_iter(page_size=1)), objects, 'object_iter() should go through all the pages of the listing')
+        self.assertEqual(list(client.object_iter(start_after=objects[0].name)), objects[1:], 'object_iter(start_after=<name>) should only return the objects after <name>')
 
         # Download an object
         print(f'Downloading objects')
@@ -125,33 +171,202 @@ class TestCases(unittest.TestCase):
         self.assertTrue(client.object_download(object_name, downloaded_data), 'object_download() should return true on success')
         self.assertEqual(downloaded_data.getvalue(), data.getvalue(), 'object_download() should download the same data that was uploaded with object_upload()')
 
+        # Multipart upload
+        print(f'Uploading object in parts')
+        client.multipart_threshold, client.multipart_part_size = 0, 5 * 1024 * 1024
+        multipart_data = os.urandom(11 * 1024 * 1024)
+        self.assertTrue(client.object_upload(io.BytesIO(multipart_data), 'multipart-object', metadata={'key1': 'Value1'}), 'object_upload() should return true on success when uploading in parts')
+        downloaded_data = io.BytesIO()
+        self.assertTrue(client.object_download('multipart-object', downloaded_data))
+        self.assertEqual(downloaded_data.getvalue(), multipart_data, 'object_upload() should upload all the parts in order')
+        self.assertDictEqual(client.object_info('multipart-object').metadata, { 'key1': 'Value1' }, 'object_upload() should set the specified metadata when uploading in parts')
+        hasher = ETagHasher([5 * 1024 * 1024] * 3, composite='swift' if isinstance(client, SwiftClient) else 's3')
+        hasher.update(multipart_data)
+        self.assertTrue(hasher.matches(client.object_info('multipart-object').hash), 'ETagHasher should compute the ETag of objects uploaded in parts')
+        self.assertTrue(client.object_delete('multipart-object'))
+
+        print(f'Writing through object_open()')
+        with client.object_open('written-object', mode='wb', metadata={'key1': 'Value1'}) as f:
+            for i in range(0, len(multipart_data), 1000000):
+                f.write(multipart_data[i:i + 1000000])
+        downloaded_data = io.BytesIO()
+        self.assertTrue(client.object_download('written-object', downloaded_data))
+        self.assertEqual(downloaded_data.getvalue(), multipart_data, 'object_open(mode="wb") should upload everything that was written')
+        self.assertDictEqual(client.object_info('written-object').metadata, { 'key1': 'Value1' })
+        cache = client.enable_cache()
+        self.assertIsNone(client.object_info('cached-written-object'))
+        with client.object_open('cached-written-object', mode='wb') as f:
+            f.write(multipart_data)
+        self.assertIsNotNone(client.object_info('cached-written-object'), 'object_open(mode="wb") should invalidate the cached info of the object')
+        client.disable_cache()
+        self.assertTrue(client.object_delete('cached-written-object'))
+        with client.object_open('written-object', mode='wb') as f:
+            f.write(b'small')
+        self.assertEqual(client.object_info('written-object').bytes, 5, 'object_open(mode="wb") should replace the object on close')
+        with self.assertRaises(ZeroDivisionError):
+            with client.object_open('aborted-object', mode='wb') as f:
+                f.write(multipart_data)
+                1 / 0
+        self.assertIsNone(client.object_info('aborted-object'), 'object_open(mode="wb") should not create the object if the upload is aborted')
+        self.assertTrue(client.object_delete('written-object'))
+        client.multipart_threshold, client.multipart_part_size = ObjectStorageClient.multipart_threshold, ObjectStorageClient.multipart_part_size
+
+        # Compressed upload
+        print(f'Uploading compressed object')
+        text = b''.join(f'{{"line": {i}, "message": "compressible"}}\n'.encode() for i in range(100000))
+        client.compression = 'gzip'
+        self.assertTrue(client.object_upload(io.BytesIO(text), 'compressed-object'), 'object_upload() should return true on success when compressing')
+        client.compression = None
+        info = client.object_info('compressed-object')
+        self.assertLess(info.bytes, len(text) / 10, 'object_upload() should compress the data when compression is set')
+        self.assertEqual(info.metadata.get('obs-codec'), 'gzip', 'object_upload() should record the codec in the metadata')
+        downloaded_data = io.BytesIO()
+        self.assertTrue(client.object_download('compressed-object', downloaded_data))
+        self.assertEqual(downloaded_data.getvalue(), text, 'object_download() should decode the compressed objects')
+        self.assertTrue(client.object_delete('compressed-object'))
+
         # Upload a file
         print(f'Uploading file')
         filename = random_string() + '.txt'
+        file_content = random_string(100)
         with open(filename, 'w') as f:
-            f.write(random_string(100))
+            f.write(file_content)
         
         self.assertTrue(client.upload_file(localFilePath=filename, object_name=filename))
         self.assertIsNotNone(client.object_info(filename))
+        if isinstance(client, SwiftClient):
+            print(f'Uploading file with an expired token (asyncio)')
+            from src.AsyncSwiftClient import AsyncSwiftClient
+            async def upload_with_expired_token():
+                async_client = AsyncSwiftClient(self.storage['region'], token_cache=None)
+                try:
+                    await async_client.container_info(container_name)
+                    async_client.OS_AUTH_TOKEN = 'expired'
+                    with open(filename, 'rb') as f:
+                        return await async_client.object_upload(f, 'async-object', container_name=container_name)
+                finally:
+                    await async_client.close()
+            self.assertTrue(asyncio.run(upload_with_expired_token()), 'AsyncSwiftClient should renew an expired token during an upload')
+            downloaded_data = io.BytesIO()
+            self.assertTrue(client.object_download('async-object', downloaded_data))
+            self.assertEqual(downloaded_data.getvalue(), file_content.encode(), 'AsyncSwiftClient should send the file again from its start after renewing the token')
+            self.assertTrue(client.object_delete('async-object'))
         os.remove(filename)
 
         # Download a file
         print(f'Downloading file')
         self.assertTrue(client.download_file(outputFilePath=filename, object_name=filename))
         os.remove(filename)
+        self.assertTrue(client.download_file(outputFilePath=filename, object_name=filename, parallel=True, parts=3), 'download_file(parallel=True) should return true on success')
+        with open(filename) as f:
+            self.assertEqual(f.read(), file_content, 'download_file(parallel=True) should write every range at its offset')
+        os.remove(filename)
+
+        # Synchronize a directory
+        print(f'Synchronizing directory')
+        directory = random_string()
+        os.makedirs(os.path.join(directory, 'sub'))
+        for path in ['a.txt', os.path.join('sub', 'b.txt')]:
+            with open(os.path.join(directory, path), 'w') as f:
+                f.write(random_string(100))
+        res = client.sync_upload(directory, 'sync')
+        self.assertEqual((res.transferred, res.skipped, res.failed), (2, 0, []), 'sync_upload() should upload the new files')
+        self.assertIsNotNone(client.object_info('sync/sub/b.txt'), 'sync_upload() should name the objects after the relative file paths')
+        res = client.sync_upload(directory, 'sync')
+        self.assertEqual((res.transferred, res.skipped), (0, 2), 'sync_upload() should skip the unchanged files')
+        os.remove(os.path.join(directory, 'a.txt'))
+        res = client.sync_download(directory, 'sync')
+        self.assertEqual((res.transferred, res.skipped), (1, 1), 'sync_download() should only download the missing files')
+        os.remove(os.path.join(directory, 'a.txt'))
+        res = client.sync_upload(directory, 'sync', delete=True)
+        self.assertEqual(res.deleted, 1, 'sync_upload(delete=True) should delete the objects without a local file')
+        self.assertIsNone(client.object_info('sync/a.txt'))
+        self.assertTrue(client.object_upload(io.BytesIO(b'outside'), f'sync/../{directory}-escaped.txt'))
+        res = client.sync_download(directory, 'sync')
+        client.download_directory(directory, 'sync')
+        self.assertFalse(os.path.exists(f'{directory}-escaped.txt'), 'sync_download() should not write files outside of the directory')
+        self.assertTrue(client.object_delete(f'sync/../{directory}-escaped.txt'))
+        res = client.upload_directory(directory, 'uploaded', metadata={'Key1': 'Value1'})
+        self.assertEqual(res.transferred, 1, 'upload_directory() should upload every file')
+        self.assertDictEqual(client.object_info('uploaded/sub/b.txt').metadata, {'key1': 'Value1'}, 'upload_directory() should set the specified metadata')
+        self.assertTrue(client.object_delete('uploaded/sub/b.txt'))
+        client.compression = 'gzip'
+        with open(os.path.join(directory, 'c.txt'), 'w') as f:
+            f.write('compressed ' * 100)
+        res = client.sync_upload(directory, 'sync')
+        self.assertEqual((res.transferred, res.skipped), (1, 1))
+        res = client.sync_upload(directory, 'sync')
+        self.assertEqual((res.transferred, res.skipped), (0, 2), 'sync_upload() should skip the unchanged files uploaded compressed')
+        res = client.sync_download(directory, 'sync')
+        self.assertEqual((res.transferred, res.skipped), (0, 2), 'sync_download() should skip the unchanged files of the compressed objects')
+        with open(os.path.join(directory, 'c.txt'), 'a') as f:
+            f.write('changed')
+        res = client.sync_upload(directory, 'sync')
+        self.assertEqual((res.transferred, res.skipped), (1, 1), 'sync_upload() should upload the changed files uploaded compressed')
+        client.compression = None
+        self.assertTrue(client.object_delete('sync/c.txt'))
+        shutil.rmtree(directory)
+
+        # Server-side copies
+        print(f'Copying objects')
+        self.assertTrue(client.object_upload(io.BytesIO(b'copied content'), 'copy/a.txt', metadata={'Key1': 'Value1'}))
+        self.assertTrue(client.object_copy('copy/a.txt', 'copy/b.txt'), 'object_copy() should return true on success')
+        self.assertDictEqual(client.object_info('copy/b.txt').metadata, {'key1': 'Value1'}, 'object_copy() should keep the source metadata')
+        self.assertTrue(client.object_copy('copy/a.txt', 'copy/c.txt', metadata={'Key2': 'Value2'}))
+        self.assertDictEqual(client.object_info('copy/c.txt').metadata, {'key2': 'Value2'}, 'object_copy(metadata=...) should replace the metadata')
+        self.assertFalse(client.object_copy(random_string(20), 'copy/d.txt'), 'object_copy() should return false if the source does not exist')
+        self.assertTrue(client.object_move('copy/c.txt', 'copy/d.txt'), 'object_move() should return true on success')
+        self.assertIsNone(client.object_info('copy/c.txt'), 'object_move() should delete the source')
+        res = client.object_copy_prefix('copy/', 'moved/', move=True)
+        self.assertEqual((res.transferred, res.failed), (3, []), 'object_copy_prefix() should copy all the objects with the prefix')
+        stream = io.BytesIO()
+        self.assertTrue(client.object_download('moved/b.txt', stream))
+        self.assertEqual(stream.getvalue(), b'copied content', 'object_copy_prefix() should name the copies after the destination prefix')
+        self.assertEqual(len(client.object_list(prefix='copy/')), 0, 'object_copy_prefix(move=True) should delete the sources')
+        client.object_delete_many([o.name for o in client.object_list(prefix='moved/')])
+
+        # CachedClient
+        print(f'Downloading through the disk cache')
+        directory = random_string()
+        cached = CachedClient(client, directory)
+        self.assertTrue(client.object_upload(io.BytesIO(b'cached content'), 'cached-object'))
+        for _ in range(2):
+            stream = io.BytesIO()
+            self.assertTrue(cached.object_download('cached-object', stream))
+            self.assertEqual(stream.getvalue(), b'cached content', 'CachedClient.object_download() should return the object content')
+        self.assertEqual(cached.cache_stats()['hits'], 1, 'CachedClient should serve the second download from the cache')
+        self.assertTrue(client.object_upload(io.BytesIO(b'new content'), 'cached-object'))
+        self.assertTrue(cached.download_file('cached-object', filename))
+        with open(filename, 'rb') as f:
+            self.assertEqual(f.read(), b'new content', 'CachedClient should download an object changed by another client again')
+        os.remove(filename)
+        with cached.object_open('cached-object') as f:
+            f.seek(4)
+            self.assertEqual(f.read(), b'content', 'CachedClient.object_open() should read the cached object')
+        self.assertEqual(cached.cache_stats()['hits'], 2, 'CachedClient.object_open() should read the object from the cache')
+        self.assertEqual(cached.multipart_max_parts, client.multipart_max_parts, 'CachedClient should forward the settings of the wrapped client')
+        self.assertIs(cached.executor, client.executor, 'CachedClient should share the worker pool of the wrapped client')
+        self.assertRaises(AttributeError, setattr, cached, 'executor', None)
+        self.assertTrue(cached.object_delete('cached-object'))
+        shutil.rmtree(directory)
 
         # Delete container
         self.assertFalse(client.container_delete(container_name), 'container_delete() should not delete a container that is not empty')
 
         # Delete objects
         print('Deleting objects')
+        client.multipart_threshold, client.multipart_part_size = 0, 5 * 1024 * 1024
+        self.assertTrue(client.object_upload(io.BytesIO(os.urandom(6 * 1024 * 1024)), 'multipart/object'))
+        client.multipart_threshold, client.multipart_part_size = ObjectStorageClient.multipart_threshold, ObjectStorageClient.multipart_part_size
         objects = client.object_list()
 
         self.assertTrue(client.object_delete(objects[0].name), 'object_delete() should return true on success')
         self.assertTrue(client.object_delete(objects[0].name + '123'), 'object_delete() should return true if the file does not exist')
 
-        for o in objects:
-            client.object_delete(o.name)
+        results = client.object_delete_many([o.name for o in objects])
+        self.assertDictEqual(results, { o.name: True for o in objects }, 'object_delete_many() should return true for each deleted (or missing) object')
+        if isinstance(client, SwiftClient):
+            self.assertListEqual(client.object_list(prefix='multipart/object/', container_name=f'{container_name}_segments'), [], 'object_delete_many() should delete the segments of the objects uploaded in parts')
 
         self.assertTrue(len(client.object_list(container_name=container_name)) == 0, 'object_delete() should properly remove objects')
 
@@ -164,10 +379,15 @@ class TestCases(unittest.TestCase):
         self.assertTrue(client.use_container(container_name, create=True), 'use_container(create=true) should return true on success')
         self.assertIsNotNone(client.container_info(container_name), 'use_container(create=true) should create the container if it does not exist')
         client.object_upload(stream=io.BytesIO(os.urandom(100)), object_name=random_string())
+        client.multipart_threshold, client.multipart_part_size = 0, 5 * 1024 * 1024
+        client.object_upload(stream=io.BytesIO(os.urandom(6 * 1024 * 1024)), object_name=random_string())
+        client.multipart_threshold, client.multipart_part_size = ObjectStorageClient.multipart_threshold, ObjectStorageClient.multipart_part_size
 
         # container_delete(force=True)
         self.assertTrue(client.container_delete(container_name, force=True), 'container_delete(force=True) should return true on success')
         self.assertIsNone(client.container_info(container_name), 'container_delete(force=True) should be able to delete a non-empty container')
+        if isinstance(client, SwiftClient):
+            self.assertIsNone(client.container_info(f'{container_name}_segments'), 'container_delete(force=True) should delete the segments of the objects uploaded in parts')
 
         # object_*() should raise exception if container is not set
         print('Rasing exceptions')